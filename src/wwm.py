@@ -1,14 +1,34 @@
+import argparse
 import html
+import math
+import time
 import tkinter as tk
 import tkinter.font as font
 
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from wwm_calibrate import DifficultyTable
 
-from PIL import ImageTk
+from wwm_export import GameExporter
 
 from wwm_gamelogic import Quiz
 
+from wwm_ladders import LadderVariants
+
+from wwm_leaderboard import Leaderboard, game_record
+
+from wwm_practice import PracticeDeck
+
+from wwm_seen import SeenIndex
+
+from wwm_sources import FailoverSource, OpentdbSource
+
+from wwm_stats import AnswerStats
+
+from wwm_store import QuestionStore
+
+from wwm_tasks import TaskRunner
+
+from wwm_timers import TimerDriver
+
 import wwm_ui
 
 
@@ -27,39 +47,192 @@ class QuizApp(tk.Tk):
     code flow according to the inputs (which buttons were pressed) from the
     user.
     """
-    def __init__(self):
+    def __init__(self, source=None, leaderboard=None, player="Player",
+                 exporter=None, ladders=None, sprite_data=None,
+                 **quiz_options):
         """
         This method initializes a new tkinter window, sets its properties,
-        retrieves all images for the jokers and switches to the starting page.
+        starts retrieving all images for the jokers and switches to the
+        starting page. The questions of each game are retrieved from the given
+        source (by default the opentdb.com api). If a Leaderboard is given the
+        result of each game is recorded for the given player. If a
+        GameExporter is given each game is exported with the history of its
+        rounds. If LadderVariants are given each game is played with the
+        ladder of the variant of the player and its result is added to the
+        results of the variant. If the sprite sheet was already read (see
+        wwm_ui.read_sprite_sheet) its data can be given so that the images
+        are created immediately. All other keyword arguments are passed to
+        each new Quiz object.
         """
         # Initializes the tkinter window.
         tk.Tk.__init__(self)
+        self.source = source
+        self.leaderboard = leaderboard
+        self.player = player
+        self.exporter = exporter
+        self.ladders = ladders
+        self.quiz_options = quiz_options
+        # All widgets share the same font objects for each font size so that
+        # no new fonts need to be created when a page is displayed.
+        self.fonts = {size: font.Font(family="Helvetica", size=size)
+                      for size in (12, 13, 16, 18, 20)}
+        # This variable stores the buttons of the current page so that a
+        # program can find and click them (e.g. to play automatically).
+        self.controls = {}
+        # This variable stores the game page of the next question which is
+        # prepared while the player thinks about the current question.
+        self.next_page = None
         # Sets the tkinter window properties.
         wwm_ui.setup_window_properties(self)
 
-        # Retrieves the images for the jokers.
-        files = wwm_ui.store_images()
-        # The images need to be stored as global variables because pythons
-        # garbage collecting creates a bug when trying to display an image
-        # in a tkinter window. See: https://stackoverflow.com/questions/
-        # 16424091/why-does-tkinter-image-not-show-up-if-created-in-a-function
-        for key, value in files.items():
-            # A unique name is used so it does not overwrite another variable
-            # that were already used in the code.
-            globals()["initialized__file__" + key] = ImageTk.PhotoImage(value)
+        # Blocking work (retrieving questions, processing images and rendering
+        # plots) is executed on worker threads so that the window stays
+        # responsive. The tasks started by the current page are tracked so
+        # that they can be cancelled when the page changes.
+        self.tasks = TaskRunner(self)
+        self.page_tasks = []
+        # The time limits of the questions are tracked by one timer wheel which
+        # is advanced with a single pending after call. The timers of the
+        # current page are cancelled when the page changes.
+        self.timers = TimerDriver(self)
+        self.page_timers = []
+        # Ensures that the worker threads are stopped when the window closes.
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        # The images for the jokers are retrieved from the cached sprite sheet.
+        # They need to be referenced for as long as the window exists because
+        # pythons garbage collecting creates a bug when trying to display an
+        # image in a tkinter window otherwise. See:
+        # https://stackoverflow.com/questions/16424091/why-does-tkinter-image-
+        # not-show-up-if-created-in-a-function
+        # Therefore they are stored in an instance attribute and created only
+        # once for the whole lifetime of the window.
+        self.images = {}
+        # Creates the sidebars with the joker images and the winnings once.
+        # They stay in the window for all pages and are only updated.
+        self.sidebar = wwm_ui.Sidebar(self, self.images)
+        # The sprite sheet might need to be built first which is done on a
+        # worker thread. The images are then loaded in the mainloop.
+        if sprite_data is not None:
+            self.load_images(data=sprite_data)
+        else:
+            self.tasks.submit(wwm_ui.prepare_sprite_sheet,
+                              on_done=self.load_images)
 
         # Uses the change_page function to switch to the "start" page.
         self.change_page("start")
 
+    def close(self):
+        """
+        This method cancels all tasks, stops the worker threads and closes
+        the window.
+        """
+        for task in self.page_tasks:
+            task.cancel()
+        self.tasks.shutdown()
+        self.timers.stop()
+        self.destroy()
+
+    def load_images(self, path=None, data=None):
+        """
+        This method creates the tkinter images for the jokers from the sprite
+        sheet under the given path (or from its data) and displays them in
+        the sidebar.
+        """
+        self.images.update(wwm_ui.store_images(self, path, data))
+        self.sidebar.refresh()
+
+    def load_quiz(self, button):
+        """
+        This method initializes a new Quiz object on a worker thread to start
+        a new game. While the questions are retrieved the given start button
+        is disabled and indicates that the game is loading.
+        """
+        self.quiz = None
+        button.configure(text="Loading Questions ...", state="disabled")
+        options = dict(self.quiz_options)
+        if self.ladders is not None:
+            options["ladder"] = self.ladders.assign(self.player)
+        self.page_tasks.append(self.tasks.submit(
+            lambda: Quiz(self.source, **options),
+            on_done=lambda quiz: self.quiz_loaded(quiz, button),
+            # If the questions could not be retrieved (e.g. no internet
+            # connection) the button can be used to try again.
+            on_error=lambda error: button.configure(
+                text="Loading Failed - Try Again", state="normal",
+                command=lambda: self.load_quiz(button))))
+
+    def quiz_loaded(self, quiz, button):
+        """
+        This method stores the new Quiz object once it was initialized,
+        displays its status and enables the given start button.
+        """
+        self.quiz = quiz
+        # The round is not accentuated because the game has not started yet.
+        self.sidebar.update(quiz.status(), show_round=False)
+        # The time the game starts is stored to know its duration.
+        button.configure(text="Start New Game", state="normal",
+                         command=lambda: [
+                             setattr(self, "started_at", time.monotonic()),
+                             self.change_page("game")])
+
+    def show_tip(self, frame, tip, answers):
+        """
+        This method displays the tip of an audience or phone joker in the
+        given frame. The plot of an audience joker is rendered on a worker
+        thread and a placeholder is shown until it is finished.
+        """
+        # If the tip comes from an audience joker it is a list and therefore
+        # this code is executed.
+        if isinstance(tip, list):
+            label = tk.Label(
+                frame, wraplength=250, text="The audience is voting ...",
+                font=self.fonts[13])
+            label.grid(row=0, column=0)
+            # Once the plot is rendered the placeholder text is replaced by the
+            # plot. The image is stored as attribute of the label so that it
+            # is not removed by pythons garbage collecting.
+            self.page_tasks.append(self.tasks.submit(
+                wwm_ui.render_audience, tip, answers,
+                on_done=lambda data: [
+                    setattr(label, "image",
+                            tk.PhotoImage(master=self, data=data)),
+                    label.configure(image=label.image)]))
+        # If the tip comes from a phone joker it is not a list and therefore
+        # this code is executed.
+        else:
+            tk.Label(
+                frame, wraplength=250,
+                text="I think it is: " + html.unescape(tip) + "!",
+                font=self.fonts[13]
+            ).grid(row=0, column=0)
+
     def change_page(self, page):
         """
         This method handles switching to other pages. It deletes all existing
-        widgets (frames, labels, buttons, ...) in order to display the page it
-        switches to properly.
+        widgets (frames, labels, buttons, ...) except the sidebars in order to
+        display the page it switches to properly.
         """
-        # Destroys all existing widgets (frames, labels, buttons, ...).
+        # Cancels the tasks of the previous page because the widgets they
+        # would update are destroyed.
+        for task in self.page_tasks:
+            task.cancel()
+        self.page_tasks = []
+        for timer in self.page_timers:
+            timer.cancel()
+        self.page_timers = []
+        self.controls = {}
+        # The prepared game page is only kept if the next question is shown.
+        keep = []
+        if page == "game" and self.next_page is not None:
+            keep.append(self.next_page["main"])
+        else:
+            self.next_page = None
+        # Destroys all existing widgets (frames, labels, buttons, ...) that
+        # are not part of the sidebars.
         for widget in self.winfo_children():
-            widget.destroy()
+            if widget not in self.sidebar.frames() and widget not in keep:
+                widget.destroy()
         # Dictionary to track what function corresponds to the parameter
         # "page".
         pages = {
@@ -77,14 +250,9 @@ class QuizApp(tk.Tk):
         This method starts a new game and displays a starting page with some
         information about the game.
         """
-        # Initializes a new Quiz object to start a new game and queries for its
-        # status.
-        self.quiz = Quiz()
-        status = self.quiz.status()
-
         # Creates the tkinter layout for the starting page.
-        main_top_1, main_top_2, main_top_3, main_bottom, sidebar_jokers,\
-            sidebar_winnings = wwm_ui.page_layout(self, "start")
+        main_top_1, main_top_2, main_top_3, main_bottom = \
+            wwm_ui.page_layout(self, "start")
 
         #######################################################################
         # MAIN TOP:
@@ -96,7 +264,7 @@ class QuizApp(tk.Tk):
         tk.Label(
             main_top_1,
             text=display_text, wraplength=600,
-            font=font.Font(family="Helvetica", size=20)
+            font=self.fonts[20]
         ).grid(row=0, column=0)
         display_text = "".join([
             "Each question you answer correctly lets you ",
@@ -109,568 +277,294 @@ class QuizApp(tk.Tk):
         tk.Label(
             main_top_2,
             text=display_text, wraplength=600,
-            font=font.Font(family="Helvetica", size=16)
+            font=self.fonts[16]
         ).grid(row=0, column=0)
         display_text = "Good Luck!"
         tk.Label(
             main_top_3,
             text=display_text, wraplength=600,
-            font=font.Font(family="Helvetica", size=20)
+            font=self.fonts[20]
         ).grid(row=0, column=0)
 
         #######################################################################
         # MAIN BOTTOM:
         # Displays the button to start a new game.
         #######################################################################
-        tk.Button(
-            main_bottom, text="Start New Game", width=40,
-            font=font.Font(family="Helvetica", size=20),
-            command=lambda: self.change_page("game")
-        ).grid(row=0, column=0)
+        start_button = tk.Button(
+            main_bottom, width=40,
+            font=self.fonts[20])
+        start_button.grid(row=0, column=0)
+        self.controls = {"start": start_button}
+        # Initializes a new Quiz object to start a new game. The button is
+        # enabled as soon as the questions are retrieved and then displays the
+        # joker pictures and all possible winnings of the new game.
+        self.load_quiz(start_button)
 
+    def gamePage(self):
+        """
+        This method displays a new question and the possible answers and
+        connects all buttons to the answer method so that the player can
+        interact with the game. If the page for the question was already
+        prepared it is only displayed.
+        """
+        # Queries the Quiz object for its status.
+        status = self.quiz.status()
+        state = status["state"]
+
+        # Checks the current state of the game and changes to the result page
+        # if the game is over.
+        if state != "playing":
+            self.change_page("result")
+            return
+
+        # Retrieve a new question. The values are stored because they are
+        # needed to evaluate the answer of the player.
+        question = self.quiz.ask_question()
+        self.questionobj, _, self.answers, tips = question
+        # Uses the prepared page if it shows the same question. Otherwise (the
+        # planned question was replaced or there was no time to prepare it)
+        # the page is created now.
+        page, self.next_page = self.next_page, None
+        if page is not None and page["question"] == question[:2]:
+            wwm_ui.show_page(page["main"])
+        else:
+            if page is not None:
+                page["main"].destroy()
+            page = self.build_game_page(question)
+        # The frames for the tips of the jokers are needed when a joker is
+        # used.
+        self.tip_frames = page["tip_frames"]
+        # Stores the buttons of the game page.
+        self.controls = page["controls"]
+        # The surrender button shows the payout from the last question the
+        # player answered correctly.
+        self.controls["surrender"]["text"] = \
+            "Surrender and take: " + \
+            status["ladder"].label(status["current_payout"])
+
+        # Stores all tips from the jokers so that multiple jokers can be used
+        # for one question.
+        self.previous_tips = []
+
+        # Displays the parts of the page that change during one question.
+        self.update_game_page(tips)
+
+        # If the time to answer is limited the remaining seconds are shown and
+        # the game ends when the time is up.
+        deadline = self.quiz.deadline()
+        if deadline is not None:
+            self.page_timers.append(
+                self.timers.schedule(deadline, self.time_up))
+            self.show_countdown(page["countdown"], deadline)
+
+        # The page of the next question is prepared as soon as tkinter has
+        # displayed this page.
+        self.after_idle(self.prepare_next_page)
+
+    def prepare_next_page(self):
+        """
+        This method creates the hidden game page of the next planned question
+        so that only a swap is needed once the current question is answered.
+        """
+        # Nothing is prepared if the game page is not shown anymore.
+        if "answers" not in self.controls:
+            return
+        question = self.quiz.peek_question()
+        if question is None:
+            return
+        if self.next_page is not None:
+            if self.next_page["question"] == question[:2]:
+                return
+            self.next_page["main"].destroy()
+        self.next_page = self.build_game_page(question, hidden=True)
+
+    def build_game_page(self, question, hidden=False):
+        """
+        This method creates the widgets of the game page for the given
+        question (in the format returned by ask_question) and returns them in
+        a dictionary. If hidden is True the page is not displayed until
+        wwm_ui.show_page is called with its main frame.
+        """
         #######################################################################
-        # SIDEBAR JOKERS:
-        # Displays the joker pictures.
+        # STATIC PART OF THE CODE (does not change during one question)
         #######################################################################
-        # Sets the default names for each not crossed picture.
-        files = ["initialized__file__5050",
-                 "initialized__file__audience",
-                 "initialized__file__phone"]
-        # If the joker has already been used the crossed picture of this joker
-        # is used.
-        if "50:50 Joker" not in status["jokers"]:
-            files[0] += "_crossed"
-        if "Audience Joker" not in status["jokers"]:
-            files[1] += "_crossed"
-        if "Phone Joker" not in status["jokers"]:
-            files[2] += "_crossed"
-        # Due to the garbage collecting bug (explained in the init method) the
-        # correct image is retrieved from the global variables and displayed.
-        for index, file in enumerate(files):
-            img = globals()[file]
-            if index == 0:
-                tk.Label(sidebar_jokers, image=img).grid(row=1, column=0)
-            elif index == 1:
-                tk.Label(sidebar_jokers, image=img).grid(row=0, columnspan=2)
-            else:
-                tk.Label(sidebar_jokers, image=img).grid(row=1, column=1)
+
+        # Creates the tkinter layout for the game page.
+        main_top, main_top_1, main_graph_l, main_graph_2, main_top_3, \
+            main_top_4, main_bottom_1, main_bottom_2 = \
+            wwm_ui.page_layout(self, "game", hidden)
 
         #######################################################################
-        # SIDEBAR WINNINGS:
-        # Displays all possible winnings.
+        # MAIN TOP - STATIC:
+        # Displays the question.
         #######################################################################
-        # Retrieves all winnings and stores them in a new list.
-        winnings = status["winnings"][:]
-        # Ensures that the winnings are always centered and big enough to
-        # make borders around each label look good.
-        modified_winnings = []
-        for win in winnings:
-            modified_winnings.append(" " * ((30 - len(win))//2) + win +
-                                     " " * ((30 - len(win))//2))
-        # Placeholder label to position the winnings labels properly.
+        # Display the question without html escape characters.
         tk.Label(
-            sidebar_winnings, text=" "*30, borderwidth=2,
-            font=font.Font(family="Helvetica", size=14)
+            main_top_1, text=html.unescape(question[1]), wraplength=600,
+            font=self.fonts[18]
         ).grid(row=0, column=0)
-        # Displays each winning amount.
-        for index, winning in enumerate(modified_winnings):
-            tk.Label(
-                sidebar_winnings, text=winning, borderwidth=2,
-                font=font.Font(family="Helvetica", size=14)
-            ).grid(row=index+1, column=0)
 
-    def gamePage(self):
+        #######################################################################
+        # MAIN BOTTOM - STATIC:
+        # Displays all buttons that are used to play the game (give an answer
+        # / use a joker / surrender). The answer and joker buttons are
+        # modified later on to disable them. Each button passes the player's
+        # input to the answer method.
+        #######################################################################
+        # Displays the surrender button so a player can surrender and take the
+        # payout from the last question he answered correctly. Its text is set
+        # when the page is displayed.
+        button_surrender = tk.Button(
+            main_bottom_2, width=25, height=2, wraplength=190,
+            font=self.fonts[12],
+            command=lambda: self.answer("__surrender"))
+        button_surrender.grid(row=0, column=0)
+        # Displays the remaining time if the time to answer is limited. Its
+        # text is set when the page is displayed.
+        label_countdown = tk.Label(main_bottom_2, font=self.fonts[12])
+        label_countdown.grid(row=1, column=0)
+
+        # Displays the joker buttons so that a player can use a joker and
+        # positions them.
+        buttons_jokers = []
+        for text, given_input, position in (
+                ("50:50 Joker", "__joker_50:50", {"row": 1, "column": 0}),
+                ("Audience Joker", "__joker_audience",
+                 {"row": 0, "columnspan": 2}),
+                ("Phone Joker", "__joker_phone", {"row": 1, "column": 1})):
+            button = tk.Button(
+                main_bottom_1, width=15, height=1, text=text,
+                font=self.fonts[12],
+                command=lambda given_input=given_input: self.answer(
+                    given_input))
+            button.grid(**position)
+            buttons_jokers.append(button)
+
+        # Displays the answer buttons so that a player can select his answers
+        # and positions them. Their texts are set in the dynamic part.
+        buttons_answers = []
+        for index, frame in enumerate(
+                (main_top_3, main_top_4, main_top_3, main_top_4)):
+            button = tk.Button(
+                frame, width=25, height=3, wraplength=200,
+                font=self.fonts[12],
+                # The answer is looked up when the button is clicked because
+                # the answers change when the fifty-fifty joker is used.
+                command=lambda index=index: self.answer(self.answers[index]))
+            button.grid(row=index // 2, column=0)
+            buttons_answers.append(button)
+
+        # The question identifies for which question the page was created.
+        return {"question": question[:2],
+                "main": main_top.master,
+                "tip_frames": (main_graph_l, main_graph_2),
+                "countdown": label_countdown,
+                "controls": {"answers": buttons_answers,
+                             "jokers": buttons_jokers,
+                             "surrender": button_surrender}}
+
+    def update_game_page(self, tips):
         """
-        This method displays a new question and the possible answers and
-        contains all ui logic for a question so that the player can interact
-        with the game.
+        This method updates the parts of the game page that change during one
+        question: It disables the used jokers, shows the answers and displays
+        the tips of the jokers.
         """
         # Queries the Quiz object for its status.
         status = self.quiz.status()
-        state = status["state"]
 
-        # Checks the current state of the game and either changes to the result
-        # page (if path) or executes the game logic (else path).
-        if state != "playing":
-            self.change_page("result")
-        else:
-            ###################################################################
-            # STATIC PART OF THE CODE (does not change during one question)
-            ###################################################################
-
-            # Creates the tkinter layout for the game page.
-            main_top, sidebar_jokers, sidebar_winnings, main_top_1, \
-                main_graph_l, main_graph_2, main_top_3, main_top_4, \
-                main_bottom_1, main_bottom_2 = wwm_ui.page_layout(self, "game")
-
-            ###################################################################
-            # MAIN TOP - STATIC:
-            # Retrieves a new question and displays it.
-            ###################################################################
-            # Retrieve a new question.
-            questionobj, question, answers, tips = self.quiz.ask_question()
-            # Display the question without html escape characters.
-            tk.Label(
-                main_top_1, text=html.unescape(question), wraplength=600,
-                font=font.Font(family="Helvetica", size=18)
-            ).grid(row=0, column=0)
+        #######################################################################
+        # MAIN BOTTOM - DYNAMIC:
+        # If a joker has already been used in this game, its button gets
+        # disabled meaning it can not be clicked anymore.
+        #######################################################################
+        for button in self.controls["jokers"]:
+            if button["text"] not in status["jokers"]:
+                button["state"] = "disabled"
 
-            ###################################################################
-            # MAIN BOTTOM - STATIC:
-            # Displays all buttons that are used to play the game (give an
-            # answer / use a joker / surrender). The answer and joker buttons
-            # can be modified dynamically later on to disable them.
-            ###################################################################
-            # Displays the surrender button so a player can surrender and take
-            # the payout from the last question he answered correctly.
-            tk.Button(
-                main_bottom_2, width=25, height=2, wraplength=190,
-                text=f"Surrender and take: {status['current_payout']}",
-                font=font.Font(family="Helvetica", size=12),
-                # The variable control_var makes the code wait with
-                # execution (after creating and displaying all labels)
-                # until it is set by clicking e.g. this button. setattr()
-                # then sets a new instance attribute to store the
-                # answer in.
-                command=lambda: [
-                    control_var.set(True),
-                    setattr(
-                        self, "evaluation",
-                        self.quiz.evaluate_answer(
-                            questionobj, "__surrender"))]
-            ).grid(row=0, column=0)
+        #######################################################################
+        # SIDEBARS - DYNAMIC:
+        # Displays all possible winnings and either the normal or the crossed
+        # out image for the joker depending on whether the joker has already
+        # been used in this game or not. The sidebar only updates the labels
+        # that changed since the last call.
+        #######################################################################
+        self.sidebar.update(status)
 
-            # Stores all joker buttons so they can be modified in the dynamic
-            # part of the code.
-            buttons_jokers = []
-            # Displays the joker buttons so that a player can use a joker.
-            buttons_jokers.append(tk.Button(
-                main_bottom_1, width=15, height=1,
-                text="50:50 Joker",
-                font=font.Font(family="Helvetica", size=12),
-                # The variable control_var makes the code wait with
-                # execution (after creating and displaying all labels)
-                # until it is set by clicking e.g. this button. setattr()
-                # then sets a new instance attribute to store the
-                # answer in.
-                command=lambda: [
-                    control_var.set(True),
-                    setattr(
-                        self, "evaluation",
-                        self.quiz.evaluate_answer(
-                            questionobj, "__joker_50:50"))]))
-            buttons_jokers.append(tk.Button(
-                main_bottom_1, width=15, height=1,
-                text="Audience Joker",
-                font=font.Font(family="Helvetica", size=12),
-                command=lambda: [
-                    control_var.set(True),
-                    setattr(
-                        self, "evaluation",
-                        self.quiz.evaluate_answer(
-                            questionobj, "__joker_audience"))]))
-            buttons_jokers.append(tk.Button(
-                main_bottom_1, width=15, height=1,
-                text="Phone Joker",
-                font=font.Font(family="Helvetica", size=12),
-                command=lambda: [
-                    control_var.set(True),
-                    setattr(
-                        self, "evaluation",
-                        self.quiz.evaluate_answer(
-                            questionobj, "__joker_phone"))]))
-            # Positions the buttons.
-            for index, button in enumerate(buttons_jokers):
-                if index == 0:
-                    button.grid(row=1, column=0)
-                elif index == 1:
-                    button.grid(row=0, columnspan=2)
-                else:
-                    button.grid(row=1, column=1)
-
-            # Stores all answer buttons so they can be modified in the dynamic
-            # part of the code.
-            buttons_answers = []
-            # Displays the answer buttons without html escape characters so
-            # that a player can select his answers.
-            buttons_answers.append(tk.Button(
-                main_top_3, width=25, height=3,
-                text="A: " + html.unescape(answers[0]), wraplength=200,
-                font=font.Font(family="Helvetica", size=12),
-                # The variable control_var makes the code wait with
-                # execution (after creating and displaying all labels)
-                # until it is set by clicking e.g. this button. setattr()
-                # then sets a new instance attribute to store the
-                # answer in.
-                command=lambda: [
-                    control_var.set(True),
-                    setattr(
-                        self, "evaluation",
-                        self.quiz.evaluate_answer(
-                            questionobj, answers[0]))]))
-            buttons_answers.append(tk.Button(
-                main_top_4, width=25, height=3,
-                text="B: " + html.unescape(answers[1]), wraplength=200,
-                font=font.Font(family="Helvetica", size=12),
-                command=lambda: [
-                    control_var.set(True),
-                    setattr(
-                        self, "evaluation",
-                        self.quiz.evaluate_answer(
-                            questionobj, answers[1]))]))
-            buttons_answers.append(tk.Button(
-                main_top_3, width=25, height=3,
-                text="C: " + html.unescape(answers[2]), wraplength=200,
-                font=font.Font(family="Helvetica", size=12),
-                command=lambda: [
-                    control_var.set(True),
-                    setattr(
-                        self, "evaluation",
-                        self.quiz.evaluate_answer(
-                            questionobj, answers[2]))]))
-            buttons_answers.append(tk.Button(
-                main_top_4, width=25, height=3,
-                text="D: " + html.unescape(answers[3]), wraplength=200,
-                font=font.Font(family="Helvetica", size=12),
-                command=lambda: [
-                    control_var.set(True),
-                    setattr(
-                        self, "evaluation",
-                        self.quiz.evaluate_answer(
-                            questionobj, answers[3]))]))
-            # Positions the buttons.
-            for index, button in enumerate(buttons_answers):
-                if index in (0, 1):
-                    r = 0
-                else:
-                    r = 1
-                button.grid(row=r, column=0)
-
-            ###################################################################
-            # SIDEBAR WINNINGS - STATIC:
-            # Displays all possible winnings.
-            ###################################################################
-            # Retrieves all winnings and stores them in a new list.
-            winnings = status["winnings"][:]
-            # Ensures that the winnings are always centered and big enough to
-            # make borders around each label look good.
-            modified_winnings = []
-            for win in winnings:
-                modified_winnings.append(" " * ((30 - len(win))//2) + win +
-                                         " " * ((30 - len(win))//2))
-            # Placeholder label to position the winnings labels properly.
-            tk.Label(
-                sidebar_winnings, text=" "*30, borderwidth=2,
-                font=font.Font(family="Helvetica", size=14)
-            ).grid(row=0, column=0)
-            # Displays each winning amount.
-            for index, winning in enumerate(modified_winnings):
-                label = tk.Label(
-                    sidebar_winnings, text=winning, borderwidth=2,
-                    font=font.Font(family="Helvetica", size=14))
-                label.grid(row=index+1, column=0)
-                # Queries the current round
-                c_round = status["round"]
-                # Accentuates for which winning the player was playing.
-                if c_round-1 == index:
-                    label["relief"] = "ridge"
-                # Accentuates the safety nets in the winnings that the player
-                # reached.
-                if c_round > 10 and index == 9:
-                    label["fg"] = "green"
-                elif c_round > 5 and c_round <= 10 and index == 4:
-                    label["fg"] = "green"
-
-            ###################################################################
-            # DYNAMIC PART OF THE CODE (changes during one question)
-            ###################################################################
-
-            # Stores all tips from the jokers so that multiple jokers can be
-            # used for one question.
-            previous_tips = []
-
-            # This loop makes the player stay on the same game page until an
-            # answer (answer / joker / surrender) was given for this question.
-            while True:
-                # Queries the Quiz object for its status.
-                status = self.quiz.status()
-
-                ###############################################################
-                # MAIN BOTTOM - DYNAMIC:
-                # If a joker that was created in the "MAIN BOTTOM - STATIC"
-                # part has already been used in this game, its button gets
-                # disabled meaning it can not be clicked anymore.
-                ###############################################################
-                for button in buttons_jokers:
-                    if button["text"] not in status["jokers"]:
-                        button["state"] = "disabled"
-
-                ###############################################################
-                # SIDEBAR JOKERS - DYNAMIC:
-                # Displays either the normal or the crossed out image for the
-                # joker depending on whether the joker has already been used
-                # in this game or not.
-                ###############################################################
-                # Tracks all joker images to be able to delete and reinitialize
-                # them after a joker has been used for this question. This is
-                # necessary because tkinter can not overwrite the images which
-                # would result in unintended displaying issues.
-                joker_labels = []
-                # Sets the default names for each not crossed picture.
-                files = ["initialized__file__5050",
-                         "initialized__file__audience",
-                         "initialized__file__phone"]
-                # If the joker has already been used the crossed picture of
-                # this joker is used.
-                if "50:50 Joker" not in status["jokers"]:
-                    files[0] += "_crossed"
-                if "Audience Joker" not in status["jokers"]:
-                    files[1] += "_crossed"
-                if "Phone Joker" not in status["jokers"]:
-                    files[2] += "_crossed"
-                #  Due to the garbage collecting bug (explained in the init
-                # method) the correct image is retrieved from the global
-                # variables and displayed.
-                for index, file in enumerate(files):
-                    img = globals()[file]
-                    if index == 0:
-                        label = tk.Label(sidebar_jokers, image=img)
-                        label.grid(row=1, column=0)
-                    elif index == 1:
-                        label = tk.Label(sidebar_jokers, image=img)
-                        label.grid(row=0, columnspan=2)
-                    else:
-                        label = tk.Label(sidebar_jokers, image=img)
-                        label.grid(row=1, column=1)
-                    joker_labels.append(label)
-
-                ###############################################################
-                # ANSWER PARSING
-                ###############################################################
-                # Tracks the fifty-fifty joker because this joker only disables
-                # buttons and does not update the other possibly shown tips.
-                fifty_fifty = False
-
-                # This code is executed when the fifty-fifty joker is chosen.
-                if tips == "fifty-fifty":
-                    # Setting the tracking variable to True ensures that
-                    # (possible) previous tips are not updated.
-                    fifty_fifty = True
-                    # Deletes all already existing answer buttons. This is
-                    # necessary because tkinter can not overwrite the labels
-                    # which would result in unintended displaying issues.
-                    for button in buttons_answers:
-                        button.destroy()
-                    # Then the buttons are displayed again. This is done
-                    # because the fifty-fifty joker changes the answer values
-                    # and therefore the new values need to be fetched from the
-                    # new quiz status. To make positioning easier they are
-                    # stored in a new list.
-                    buttons_answers = []
-                    # Displays the answer buttons without html escape
-                    # characters so that a player can select his answers.
-                    buttons_answers.append(tk.Button(
-                        main_top_3, width=25, height=3, wraplength=200,
-                        text="A: " + html.unescape(answers[0]),
-                        font=font.Font(family="Helvetica", size=12),
-                        # The variable control_var makes the code wait with
-                        # execution (after creating and displaying all labels)
-                        # until it is set by clicking e.g. this button.
-                        # setattr() then sets a new instance attribute to store
-                        # the answer in.
-                        command=lambda: [
-                            control_var.set(True),
-                            setattr(
-                                self, "evaluation",
-                                self.quiz.evaluate_answer(
-                                    questionobj, answers[0]))]))
-                    buttons_answers.append(tk.Button(
-                        main_top_4, width=25, height=3, wraplength=200,
-                        text="B: " + html.unescape(answers[1]),
-                        font=font.Font(family="Helvetica", size=12),
-                        command=lambda: [
-                            control_var.set(True),
-                            setattr(
-                                self, "evaluation",
-                                self.quiz.evaluate_answer(
-                                    questionobj, answers[1]))]))
-                    buttons_answers.append(tk.Button(
-                        main_top_3, width=25, height=3, wraplength=200,
-                        text="C: " + html.unescape(answers[2]),
-                        font=font.Font(family="Helvetica", size=12),
-                        command=lambda: [
-                            control_var.set(True),
-                            setattr(
-                                self, "evaluation",
-                                self.quiz.evaluate_answer(
-                                    questionobj, answers[2]))]))
-                    buttons_answers.append(tk.Button(
-                        main_top_4, width=25, height=3, wraplength=200,
-                        text="D: " + html.unescape(answers[3]),
-                        font=font.Font(family="Helvetica", size=12),
-                        command=lambda: [
-                            control_var.set(True),
-                            setattr(
-                                self, "evaluation",
-                                self.quiz.evaluate_answer(
-                                    questionobj, answers[3]))]))
-                    # Positions the buttons and disables them if the
-                    # fifty-fifty joker deletes the answer corresponding to
-                    # this button.
-                    for index, button in enumerate(buttons_answers):
-                        if index in (0, 1):
-                            r = 0
-                        else:
-                            r = 1
-                        button.grid(row=r, column=0)
-                        if "DELETED" in button["text"]:
-                            button["state"] = "disabled"
-                            button["text"] = button["text"][:3] +\
-                                button["text"][10:]
-
-                # This code is executed when the audience or phone joker has
-                # already been used in this round and the respective other one
-                # is also used. This ensures that previous tips are moved to
-                # another position to display the new tip from the joker if
-                # the newly used joker is not the fifty-fifty one.
-                if len(previous_tips) > 0 and not fifty_fifty:
-                    # Depending on the previously used joker there is either
-                    # canvas1 or label_tips that needs to be deleted. This is
-                    # necessary because tkinter can not overwrite already
-                    # used space which would result in unintended displaying
-                    # issues.
-                    try:
-                        canvas1.get_tk_widget().destroy()
-                    except NameError:
-                        label_tips.destroy()
-                    # If the previous tip was an audience joker it was stored
-                    # as a list and therefore this code is executed.
-                    if isinstance(previous_tips[0], list):
-                        # Creates a new plot and sets its properties.
-                        fig, axes = plt.subplots(
-                            nrows=1, ncols=1, figsize=(3, 3), dpi=100)
-                        plt.title('Audience Vote')
-                        plt.subplots_adjust(bottom=0.2, top=0.8)
-                        # Retrieves the data to be plotted.
-                        answer = [x[0] for x in previous_tips[0]]
-                        percentage = [x[1] for x in previous_tips[0]]
-                        # Plots the data.
-                        axes.bar(answer, percentage, align='center')
-                        # Displays only the character instead of the whole
-                        # answer on the plot.
-                        axes.set_xticks(axes.get_xticks())
-                        if len(axes.get_xticks()) == 4:
-                            xticklabels = ["A", "B", "C", "D"]
-                        else:
-                            xticklabels = []
-                            for a in answer:
-                                if a in answers[0]:
-                                    xticklabels.append("A")
-                                elif a in answers[1]:
-                                    xticklabels.append("B")
-                                elif a in answers[2]:
-                                    xticklabels.append("C")
-                                else:
-                                    xticklabels.append("D")
-                        axes.set_xticklabels(xticklabels)
-                        # Displays and positions the plot in the tkinter frame.
-                        canvas2 = FigureCanvasTkAgg(fig, master=main_graph_2)
-                        canvas2.draw()
-                        main_top["highlightcolor"] = "white"
-                        canvas2.get_tk_widget().pack()
-                    # If the previous tip was a phone joker it was not
-                    # stored as a list and therefore this code is executed.
-                    else:
-                        # Displays and positions the joker's tip.
-                        label_previous_tips = tk.Label(
-                            main_graph_2, wraplength=250,
-                            text="I think it is: " + html.unescape(
-                                previous_tips[0]) + "!",
-                            font=font.Font(family="Helvetica", size=13))
-                        label_previous_tips .grid(row=0, column=0)
-
-                # This code is executed when the audience or phone joker is
-                # used.
-                if tips and not fifty_fifty:
-                    # If the tip comes from an audience joker it is a list
-                    # and therefore this code is executed.
-                    if isinstance(tips, list):
-                        # Creates a new plot and sets its properties.
-                        fig, axes = plt.subplots(
-                            nrows=1, ncols=1, figsize=(3, 3), dpi=100)
-                        plt.title('Audience Vote')
-                        plt.subplots_adjust(bottom=0.2, top=0.8)
-                        # Retrieves the data to be plotted.
-                        answer = [x[0] for x in tips]
-                        percentage = [x[1] for x in tips]
-                        # Plots the data.
-                        axes.bar(answer, percentage, align='center')
-                        # Displays only the character instead of the whole
-                        # answer on the plot.
-                        axes.set_xticks(axes.get_xticks())
-                        if len(axes.get_xticks()) == 4:
-                            xticklabels = ["A", "B", "C", "D"]
-                        else:
-                            xticklabels = []
-                            for a in answer:
-                                if a in answers[0]:
-                                    xticklabels.append("A")
-                                elif a in answers[1]:
-                                    xticklabels.append("B")
-                                elif a in answers[2]:
-                                    xticklabels.append("C")
-                                else:
-                                    xticklabels.append("D")
-                        axes.set_xticklabels(xticklabels)
-                        # Displays and positions the plot in the tkinter frame.
-                        canvas1 = FigureCanvasTkAgg(fig, master=main_graph_l)
-                        canvas1.draw()
-                        main_top["highlightcolor"] = "white"
-                        canvas1.get_tk_widget().pack()
-                    # If the tip comes from a phone joker it is not a list and
-                    # therefore this code is executed.
-                    else:
-                        # Displays and positions the joker's tip.
-                        label_tips = tk.Label(
-                            main_graph_l, wraplength=250,
-                            text="I think it is: " + html.unescape(tips) + "!",
-                            font=font.Font(family="Helvetica", size=13))
-                        label_tips.grid(row=0, column=0)
-                    # Stores the tip to be able to retrieve it when another
-                    # joker's tip get also displayed.
-                    previous_tips.append(tips)
-
-                ###############################################################
-                # ANSWER EVALUATION
-                ###############################################################
-                # These two lines create a control variable that stops the code
-                # flow until the control variable is updated. Each button is
-                # coded to update this variable when the button is pressed.
-                control_var = tk.BooleanVar()
-                self.wait_variable(control_var)
-                # If the player's answer returns None the loop breaks:
-                # Surrendering or answering the question correct/wrong
-                # returns None.
-                if self.evaluation is None:
-                    # The instance attribute is deleted so it can be filled
-                    # with the next evaluation.
-                    del self.evaluation
-                    break
-                # If the player's answer returns something the variables are
-                # updated and the while loop continues with its next iteration:
-                # Using a joker returns something.
-                else:
-                    questionobj, question, answers, tips = self.evaluation
-                    # The instance attribute is deleted so it can be filled
-                    # with the next evaluation.
-                    del self.evaluation
-                    # Deletes all joker images to be able to update the shown
-                    # image after using a joker. This is necessary because
-                    #  tkinter can not overwrite the images which would result
-                    # in unintended displaying issues.
-                    for label in joker_labels:
-                        label.destroy()
+        #######################################################################
+        # MAIN TOP - DYNAMIC:
+        # Displays the answers without html escape characters and the tips of
+        # the jokers.
+        #######################################################################
+        # Updates the answer buttons. This is also necessary after the
+        # fifty-fifty joker because it changes the answer values. If the
+        # fifty-fifty joker deleted an answer its button is disabled and the
+        # string "DELETED" is removed from its text.
+        for letter, button, answer in zip(
+                "ABCD", self.controls["answers"], self.answers):
+            if answer.startswith("DELETED"):
+                button["state"] = "disabled"
+                answer = answer[7:]
+            button["text"] = f"{letter}: " + html.unescape(answer)
+
+        # The fifty-fifty joker only disables buttons and does not update the
+        # other possibly shown tips.
+        if tips and tips != "fifty-fifty":
+            # This code is executed when the audience or phone joker has
+            # already been used in this round and the respective other one is
+            # also used. This ensures that the previous tip is moved to another
+            # position to display the new tip.
+            if len(self.previous_tips) > 0:
+                # The previous tip is deleted from the first position. This is
+                # necessary because tkinter can not overwrite already used
+                # space which would result in unintended displaying issues.
+                for widget in self.tip_frames[0].winfo_children():
+                    widget.destroy()
+                # Displays the previous tip at the second position.
+                self.show_tip(self.tip_frames[1], self.previous_tips[0],
+                              self.answers)
+            # Displays the joker's tip at the first position.
+            self.show_tip(self.tip_frames[0], tips, self.answers)
+            # Stores the tip to be able to retrieve it when another joker's
+            # tip get also displayed.
+            self.previous_tips.append(tips)
+
+    def answer(self, given_input):
+        """
+        This method is called when the player clicks a button on the game
+        page. It passes the player's input to the Quiz object and either
+        updates the game page (after using a joker) or shows the next page
+        (after surrendering or answering the question correct/wrong).
+        """
+        evaluation = self.quiz.evaluate_answer(self.questionobj, given_input)
+        # Surrendering or answering the question returns None and the next
+        # question or the result page is shown.
+        if evaluation is None:
+            self.change_page("game")
+        # Using a joker returns the updated values of the question.
+        else:
+            self.questionobj, _, self.answers, tips = evaluation
+            self.update_game_page(tips)
 
+    def show_countdown(self, label, deadline):
+        """
+        This method displays the seconds left until the given deadline in the
+        given label and updates it whenever the next second has passed.
+        """
+        left = max(deadline - self.timers.wheel.now(), 0)
+        label["text"] = f"{math.ceil(left)} seconds left"
+        if left > 1:
+            # The label is updated when the displayed number changes which is
+            # always a whole number of seconds before the deadline.
+            self.page_timers.append(self.timers.schedule(
+                deadline - (math.ceil(left) - 1),
+                lambda: self.show_countdown(label, deadline)))
+
+    def time_up(self):
+        """
+        This method is called when the time to answer the current question is
+        up. It ends the game and shows the result page.
+        """
+        if self.quiz.expire():
             self.change_page("game")
 
     def resultPage(self):
@@ -682,7 +576,7 @@ class QuizApp(tk.Tk):
         status = self.quiz.status()
 
         # Creates the tkinter layout for the result page.
-        main_top_1, main_top_2, main_bottom, sidebar_jokers, sidebar_winnings = \
+        main_top_1, main_top_2, main_bottom = \
             wwm_ui.page_layout(self, "result")
 
         #######################################################################
@@ -696,97 +590,156 @@ class QuizApp(tk.Tk):
         # and the round different messages and winnings amounts are defined.
         if state == "surrendered":
             print_state = f"You surrendered in Round {status['round']}!"
-            print_amount = \
-                f"You will therefore take home: {status['current_payout']}"
         elif state == "lost":
             print_state = f"You lost in Round {status['round']}!"
-            print_amount = \
-                f"You will therefore take home: {status['secured_payout']}"
         else:
             print_state = "You answered all 15 questions correct!"
-            print_amount = \
-                f"You will therefore take home: {status['current_payout']}"
+        print_amount = "You will therefore take home: " + \
+            status["ladder"].label(status["payout"])
+        # Records and exports the result of the game. This returns
+        # immediately because the leaderboard and the exporter write it in
+        # the background. The results of the ladder variants are only
+        # updated.
+        record = game_record(status, self.player,
+                             time.monotonic() - self.started_at)
+        if self.leaderboard is not None:
+            self.leaderboard.add(record)
+        if self.exporter is not None:
+            self.exporter.add(dict(record, rounds=self.quiz.history()))
+        if self.ladders is not None:
+            self.ladders.record(status)
         # Displays the labels showing those messages and winnings amount.
         tk.Label(main_top_1, text=print_state,
-                 font=font.Font(family="Helvetica", size=20)
+                 font=self.fonts[20]
                  ).grid(row=0, column=0)
         tk.Label(main_top_2, text=print_amount,
-                 font=font.Font(family="Helvetica", size=20)
+                 font=self.fonts[20]
                  ).grid(row=0, column=0)
 
         #######################################################################
         # MAIN BOTTOM:
         # Displays the button to go back to the starting page.
         #######################################################################
-        tk.Button(main_bottom, text="Back To Start", width=40,
-                  font=font.Font(family="Helvetica", size=20),
-                  command=lambda: self.change_page("start")
-                  ).grid()
+        button_back = tk.Button(
+            main_bottom, text="Back To Start", width=40,
+            font=self.fonts[20],
+            command=lambda: self.change_page("start"))
+        button_back.grid()
+        self.controls = {"back": button_back}
 
         #######################################################################
-        # SIDEBAR JOKERS:
-        # Displays the joker pictures.
+        # SIDEBARS:
+        # Displays the joker pictures and all possible winnings.
         #######################################################################
-        # Sets the default names for each not crossed picture.
-        files = ["initialized__file__5050",
-                 "initialized__file__audience",
-                 "initialized__file__phone"]
-        # If the joker has already been used the crossed picture of this joker
-        # is used.
-        if "50:50 Joker" not in status["jokers"]:
-            files[0] += "_crossed"
-        if "Audience Joker" not in status["jokers"]:
-            files[1] += "_crossed"
-        if "Phone Joker" not in status["jokers"]:
-            files[2] += "_crossed"
-        # Due to the garbage collecting bug (explained in the init method) the
-        # correct image is retrieved from the global variables and displayed.
-        for index, file in enumerate(files):
-            img = globals()[file]
-            if index == 0:
-                tk.Label(sidebar_jokers, image=img).grid(row=1, column=0)
-            elif index == 1:
-                tk.Label(sidebar_jokers, image=img).grid(row=0, columnspan=2)
-            else:
-                tk.Label(sidebar_jokers, image=img).grid(row=1, column=1)
-
-        #######################################################################
-        # SIDEBAR WINNINGS:
-        # Displays all possible winnings.
-        #######################################################################
-        # Retrieves all winnings and stores them in a new list.
-        winnings = status["winnings"][:]
-        # Ensures that the winnings are always centered and big enough to
-        # make borders around each label look good.
-        modified_winnings = []
-        for win in winnings:
-            modified_winnings.append(" " * ((30 - len(win))//2) + win +
-                                     " " * ((30 - len(win))//2))
-        # Placeholder label to position the winnings labels properly.
-        tk.Label(sidebar_winnings, text=" "*30, borderwidth=2,
-                 font=font.Font(family="Helvetica", size=14)
-                 ).grid(row=0, column=0)
-        # Displays each winning amount.
-        for index, winning in enumerate(modified_winnings):
-            label = tk.Label(sidebar_winnings, text=winning, borderwidth=2,
-                             font=font.Font(family="Helvetica", size=14))
-            label.grid(row=index+1, column=0)
-            # Queries the current round
-            c_round = status["round"]
-            # Accentuates for which winning the player was playing.
-            if c_round-1 == index:
-                label["relief"] = "ridge"
-            # Accentuates the safety nets in the winnings that the player
-            # reached.
-            if c_round > 10 and index == 9:
-                label["fg"] = "green"
-            elif c_round > 5 and c_round <= 10 and index == 4:
-                label["fg"] = "green"
+        self.sidebar.update(status)
 
 
 # This calls the following functions when the file gets executed by the python
-# interpreter. It then creates a new QuizApp object and uses the mainloop
-# method which is needed to display a tkinter window.
+# interpreter. It parses the command line arguments, then creates a new QuizApp
+# object and uses the mainloop method which is needed to display a tkinter
+# window.
 if __name__ == '__main__':
-    app = QuizApp()
+    parser = argparse.ArgumentParser(
+        description="Who wants to be a millionaire?")
+    parser.add_argument("--store",
+                        help="directory of a question store created with "
+                             "wwm_store.py to use instead of the opentdb.com "
+                             "api")
+    parser.add_argument("--fallback-store", metavar="STORE",
+                        help="directory of a question store that is used "
+                             "while the opentdb.com api is not reachable")
+    parser.add_argument("--difficulties", metavar="FILE",
+                        help="difficulty table created with "
+                             "wwm_calibrate.py to ask the questions of a "
+                             "game from the easiest to the hardest")
+    parser.add_argument("--time-budget", type=float, default=20,
+                        metavar="SECONDS",
+                        help="maximum time to retrieve the questions of one "
+                             "game (default 20)")
+    parser.add_argument("--round-seconds", type=float, metavar="SECONDS",
+                        help="time to answer each question (default: no "
+                             "limit)")
+    parser.add_argument("--timeout-state", choices=("lost", "surrendered"),
+                        default="lost",
+                        help="whether running out of time counts as a wrong "
+                             "answer (lost) or as surrendering")
+    parser.add_argument("--category", action="append", default=[],
+                        metavar="CATEGORY[:WEIGHT]",
+                        help="draw questions from this category with the "
+                             "given weight (default 1), can be repeated")
+    parser.add_argument("--seen", metavar="FILE",
+                        help="file that stores which questions were recently "
+                             "asked so that they are also skipped after a "
+                             "restart")
+    parser.add_argument("--stats", metavar="FILE",
+                        help="database that collects how players answer each "
+                             "question, used by the audience joker")
+    parser.add_argument("--leaderboard", metavar="FILE",
+                        help="database that records the result of each game")
+    parser.add_argument("--player", default="Player",
+                        help="name of the player in the leaderboard")
+    parser.add_argument("--practice", metavar="FILE",
+                        help="file that stores the missed questions of each "
+                             "player to practice them in the terminal "
+                             "(wwm_tui.py)")
+    parser.add_argument("--ladders", metavar="FILE",
+                        help="json file with payout ladders to assign the "
+                             "players to (see wwm_ladders.py)")
+    parser.add_argument("--ladder-results", metavar="FILE",
+                        help="file that stores the results of the games of "
+                             "each ladder")
+    parser.add_argument("--export", metavar="DIRECTORY",
+                        help="directory to export each game with the "
+                             "history of its rounds to")
+    args = parser.parse_args()
+    # Each category is given as "category:weight" and opentdb categories are
+    # numbers.
+    categories = {}
+    for argument in args.category:
+        category, _, weight = argument.partition(":")
+        categories[int(category) if category.isdigit() else category] = \
+            float(weight or 1)
+    # Remembers the recently asked questions of all games so that they are
+    # not asked again too soon.
+    seen = SeenIndex(path=args.seen)
+    # Collects the answers of all players if a database is given.
+    stats = AnswerStats(args.stats) if args.stats else None
+    # Records the result of each game if a database is given.
+    leaderboard = Leaderboard(args.leaderboard) if args.leaderboard else None
+    # Stores the missed questions of the player if a file is given.
+    deck = PracticeDeck(args.practice) if args.practice else None
+    # Assigns the players to the ladders if a file with ladders is given.
+    ladders = None
+    if args.ladders:
+        ladders = LadderVariants.from_file(args.ladders, args.ladder_results)
+    # Exports each game for analyses if a directory is given.
+    exporter = GameExporter(args.export) if args.export else None
+    # The questions come from the store or from the api. If the api fails
+    # repeatedly the questions come from the fallback store for a while.
+    if args.store:
+        source = QuestionStore(args.store)
+    else:
+        source = OpentdbSource()
+        if args.fallback_store:
+            source = FailoverSource(source, QuestionStore(args.fallback_store))
+    app = QuizApp(source, leaderboard=leaderboard, player=args.player,
+                  exporter=exporter, ladders=ladders,
+                  categories=categories or None,
+                  seen=seen, stats=stats, time_budget=args.time_budget,
+                  practice=deck.player(args.player) if deck else None,
+                  round_seconds=args.round_seconds,
+                  timeout_state=args.timeout_state,
+                  difficulties=DifficultyTable.load(args.difficulties)
+                  if args.difficulties else None)
     app.mainloop()
+    seen.save()
+    if stats is not None:
+        stats.close()
+    if leaderboard is not None:
+        leaderboard.close()
+    if exporter is not None:
+        exporter.close()
+    if deck is not None:
+        deck.save()
+    if ladders is not None:
+        ladders.save()
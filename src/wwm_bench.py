@@ -0,0 +1,453 @@
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tkinter.font as font
+import tracemalloc
+
+from wwm import QuizApp
+
+from wwm_sources import FixtureSource
+
+
+###############################################################################
+# This code plays complete games in the tkinter window automatically to
+# measure how fast the user interface reacts. It starts a QuizApp with
+# generated questions (optionally on a virtual display so that it can run on a
+# headless linux machine), clicks the same buttons a player would click and
+# records the time each click takes until the window is idle again together
+# with the number of widgets and the memory usage of the process.
+#
+# In the soak mode it plays thousands of games back to back and checks that
+# the memory usage and the number of tkinter objects do not grow from game to
+# game.
+###############################################################################
+# Each scenario defines which jokers are used in which round, in which round
+# the game ends and how it ends (answering correctly in round 15 wins the
+# game).
+SCENARIOS = {
+    "answers": ({}, 15, "correct"),
+    "jokers": ({2: ["50:50"], 4: ["audience"], 6: ["phone"]}, 15, "correct"),
+    "combined": ({3: ["50:50", "audience"], 7: ["phone"]}, 12, "wrong"),
+    "surrender": ({}, 9, "surrender"),
+}
+
+
+def start_xvfb():
+    """
+    This function starts a virtual display with Xvfb, sets the DISPLAY
+    environment variable so that tkinter uses it and returns the process.
+    """
+    # Xvfb chooses a free display number itself and writes it to the pipe.
+    read_fd, write_fd = os.pipe()
+    process = subprocess.Popen(
+        ["Xvfb", "-displayfd", str(write_fd), "-screen", "0", "1280x800x24",
+         "-nolisten", "tcp"],
+        pass_fds=(write_fd,))
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        os.environ["DISPLAY"] = ":" + pipe.readline().strip()
+    return process
+
+
+def rss_kb():
+    """
+    This function returns the resident memory of this process in kilobytes.
+    """
+    # On linux the current value can be read from the proc file system.
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    # Other OS only provide the maximum value that was ever reached.
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def count_widgets(widget):
+    """
+    This function returns the number of widgets below the given widget
+    (including itself).
+    """
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def count_figures():
+    """
+    This function returns the number of open pyplot figures. The game itself
+    does not use pyplot, therefore it is only counted if something imported
+    it.
+    """
+    if "matplotlib.pyplot" not in sys.modules:
+        return 0
+    return len(sys.modules["matplotlib.pyplot"].get_fignums())
+
+
+def plan_moves(games):
+    """
+    This function yields all moves that are needed to play the given number
+    of games. The scenarios are played one after another. Each move is a
+    tuple of the game number, the scenario and the button to click. The moves
+    are created one after another so that even thousands of games do not
+    need any memory.
+    """
+    names = list(SCENARIOS)
+    for game in range(games):
+        scenario = names[game % len(names)]
+        jokers, end_round, end_move = SCENARIOS[scenario]
+        yield (game, scenario, "start")
+        for c_round in range(1, end_round + 1):
+            for joker in jokers.get(c_round, []):
+                yield (game, scenario, joker)
+            if c_round < end_round:
+                yield (game, scenario, "correct")
+            else:
+                yield (game, scenario, end_move)
+        yield (game, scenario, "back")
+
+
+class Driver():
+    """
+    This class plays games in a QuizApp by clicking its buttons from within
+    the tkinter mainloop and records a measurement for each click.
+    """
+    def __init__(self, app, moves, record=True, on_game_end=None):
+        """
+        This method initializes the driver for the given QuizApp and the
+        moves it should play. If record is False the measurements are not
+        stored. The function on_game_end is called with the game number after
+        each game.
+        """
+        self.__app = app
+        self.__moves = iter(moves)
+        self.__on_game_end = on_game_end
+        # This list stores one dictionary for each click.
+        self.records = [] if record else None
+
+    def run(self):
+        """
+        This method plays all moves and returns when they are finished.
+        """
+        self.__app.after(0, self.__next)
+        self.__app.mainloop()
+
+    def __find(self, move):
+        """
+        This method returns the button that has to be clicked for the given
+        move or None if it is not available yet.
+        """
+        controls = self.__app.controls
+        if move in ("start", "back", "surrender"):
+            button = controls.get(move)
+        elif move in ("50:50", "audience", "phone"):
+            index = ("50:50", "audience", "phone").index(move)
+            button = controls.get("jokers", [None] * 3)[index]
+        # The answer buttons show a letter and the answer. The generated
+        # correct answers start with "Correct" and all others with "Wrong".
+        else:
+            prefix = "Correct" if move == "correct" else "Wrong"
+            button = None
+            for answer in controls.get("answers", []):
+                if answer["text"][3:].startswith(prefix) and \
+                   answer["state"] == "normal":
+                    button = answer
+                    break
+        if button is None or button["state"] != "normal":
+            return None
+        return button
+
+    def __next(self):
+        """
+        This method waits until the next move can be played, then clicks the
+        button and schedules the measurement.
+        """
+        try:
+            game, scenario, move = next(self.__moves)
+        except StopIteration:
+            self.__app.quit()
+            return
+        self.__wait(game, scenario, move)
+
+    def __wait(self, game, scenario, move):
+        """
+        This method clicks the button of the given move as soon as it is
+        available and no background work is running anymore.
+        """
+        button = self.__find(move)
+        if button is None or self.__app.tasks.busy():
+            self.__app.after(
+                5, lambda: self.__wait(game, scenario, move))
+            return
+        start = time.perf_counter()
+        # The measurement is scheduled before clicking so that it is executed
+        # after everything the click changed in the window.
+        self.__app.after_idle(
+            lambda: self.__idle(game, scenario, move, start))
+        button.invoke()
+
+    def __idle(self, game, scenario, move, start):
+        """
+        This method measures the time from the click until all pending
+        drawing is finished.
+        """
+        self.__app.update_idletasks()
+        idle = time.perf_counter() - start
+        self.__ready(game, scenario, move, start, idle)
+
+    def __ready(self, game, scenario, move, start, idle):
+        """
+        This method measures the time from the click until the background
+        work started by it (e.g. retrieving questions or rendering a plot) is
+        finished and then records all measurements.
+        """
+        if self.__app.tasks.busy():
+            self.__app.after(
+                1, lambda: self.__ready(game, scenario, move, start, idle))
+            return
+        self.__app.update_idletasks()
+        ready = time.perf_counter() - start
+        if self.records is not None:
+            self.__record(game, scenario, move, idle, ready)
+        if move == "back" and self.__on_game_end is not None:
+            self.__on_game_end(game)
+        self.__app.after(0, self.__next)
+
+    def __record(self, game, scenario, move, idle, ready):
+        """
+        This method stores the measurements of one click.
+        """
+        status = self.__app.quiz.status() if self.__app.quiz else None
+        self.records.append({
+            "game": game,
+            "scenario": scenario,
+            "move": move,
+            "round": status["round"] if status else None,
+            "idle_ms": round(idle * 1000, 3),
+            "ready_ms": round(ready * 1000, 3),
+            "widgets": count_widgets(self.__app),
+            "images": len(self.__app.image_names()),
+            "fonts": len(font.names(self.__app)),
+            "rss_kb": rss_kb()})
+
+
+class Soak():
+    """
+    This class samples the resource usage of a QuizApp every few games while
+    the Driver plays and computes how much it grows per game.
+    """
+    # The keys of the samples whose growth is checked.
+    MEMORY = ("rss_kb", "traced_kb")
+    HANDLES = ("widgets", "images", "fonts", "figures")
+
+    def __init__(self, app, sample_every, warmup, top):
+        """
+        This method initializes the sampler for the given QuizApp. The first
+        sample is taken after the warmup games (so that caches are already
+        filled) and then after every sample_every games. Each sample lists
+        the top code lines that allocated memory since the first sample.
+        """
+        self.__app = app
+        self.__sample_every = sample_every
+        self.__warmup = warmup
+        self.__top = top
+        self.__baseline = None
+        # This list stores one dictionary for each sample.
+        self.samples = []
+        tracemalloc.start()
+
+    def sample(self, game):
+        """
+        This method is called after each game and takes a sample if it is
+        time for one.
+        """
+        games = game + 1
+        if games < self.__warmup or \
+           (games - self.__warmup) % self.__sample_every != 0:
+            return
+        # Compares the allocations with the first sample to find the code
+        # lines whose memory grows.
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),))
+        if self.__baseline is None:
+            self.__baseline = snapshot
+        top = snapshot.compare_to(self.__baseline, "lineno")[:self.__top]
+        self.samples.append({
+            "games": games,
+            "rss_kb": rss_kb(),
+            "traced_kb": tracemalloc.get_traced_memory()[0] // 1024,
+            "widgets": count_widgets(self.__app),
+            "images": len(self.__app.image_names()),
+            "fonts": len(font.names(self.__app)),
+            "figures": count_figures(),
+            "top": [str(stat) for stat in top]})
+        # Prints the progress because a soak test runs for a long time.
+        print(" ".join(f"{key}={value}"
+                       for key, value in self.samples[-1].items()
+                       if key != "top"), file=sys.stderr)
+
+    def growth(self):
+        """
+        This method returns how much each sampled value grew per game between
+        the first and the last sample.
+        """
+        if len(self.samples) < 2:
+            return {}
+        first, last = self.samples[0], self.samples[-1]
+        games = last["games"] - first["games"]
+        return {key: (last[key] - first[key]) / games
+                for key in self.MEMORY + self.HANDLES}
+
+
+def summarize(records):
+    """
+    This function returns the median, 95th percentile and maximum of the
+    measured times for each move as well as the widget count and memory usage
+    at the end of the first and the last game.
+    """
+    summary = {"moves": {}}
+    for move in sorted({record["move"] for record in records}):
+        summary["moves"][move] = {"count": 0}
+        for key in ("idle_ms", "ready_ms"):
+            values = sorted(record[key] for record in records
+                            if record["move"] == move)
+            summary["moves"][move]["count"] = len(values)
+            summary["moves"][move][key] = {
+                "median": round(statistics.median(values), 3),
+                "p95": values[int(0.95 * (len(values) - 1))],
+                "max": values[-1]}
+    # After clicking "back" the window always shows the same page and
+    # therefore any difference between the games is a leak.
+    ends = [record for record in records if record["move"] == "back"]
+    for key in ("widgets", "images", "fonts", "rss_kb"):
+        summary[key] = {"first": ends[0][key], "last": ends[-1][key]}
+    return summary
+
+
+def main(arguments=None):
+    """
+    This function parses the command line arguments, plays the games and
+    prints the results. It returns 1 if a limit was exceeded and 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(
+        description="Plays games in the tkinter window automatically and "
+                    "measures the latency of each click or (with --soak) the "
+                    "growth of the resource usage over many games.")
+    parser.add_argument("--games", type=int,
+                        help="number of games to play (default: one per "
+                             "scenario or 2000 with --soak)")
+    parser.add_argument("--xvfb", action="store_true",
+                        help="run the window on a virtual Xvfb display")
+    parser.add_argument("--output",
+                        help="file to write all measurements to as json")
+    parser.add_argument("--max-idle-ms", type=float,
+                        help="fail if the p95 time until idle of a move is "
+                             "higher")
+    parser.add_argument("--max-widget-growth", type=int, default=0,
+                        help="fail if the widget count after a game grows by "
+                             "more than this")
+    soak = parser.add_argument_group("soak test")
+    soak.add_argument("--soak", action="store_true",
+                      help="play many games and check the resource usage")
+    soak.add_argument("--sample-every", type=int, default=50,
+                      help="number of games between two samples")
+    soak.add_argument("--warmup", type=int, default=20,
+                      help="number of games before the first sample")
+    soak.add_argument("--top", type=int, default=10,
+                      help="number of growing code lines in each sample")
+    soak.add_argument("--max-rss-growth-kb", type=float, default=1.0,
+                      help="fail if the resident memory grows by more than "
+                           "this per game")
+    soak.add_argument("--max-traced-growth-kb", type=float, default=0.5,
+                      help="fail if the memory allocated by python grows by "
+                           "more than this per game")
+    args = parser.parse_args(arguments)
+    if args.games is None:
+        args.games = 2000 if args.soak else len(SCENARIOS)
+
+    # The game loads its images relative to the src folder.
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    xvfb = start_xvfb() if args.xvfb else None
+    try:
+        app = QuizApp(source=FixtureSource())
+        if args.soak:
+            sampler = Soak(app, args.sample_every, args.warmup, args.top)
+            driver = Driver(app, plan_moves(args.games), record=False,
+                            on_game_end=sampler.sample)
+        else:
+            driver = Driver(app, plan_moves(args.games))
+        driver.run()
+        app.close()
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    if args.soak:
+        return check_soak(args, sampler)
+    return check_latency(args, driver)
+
+
+def check_latency(args, driver):
+    """
+    This function prints the results of the latency benchmark and returns 1
+    if a limit was exceeded and 0 otherwise.
+    """
+    summary = summarize(driver.records)
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"summary": summary, "records": driver.records}, file,
+                      indent=1)
+
+    # Checks the limits and reports every exceeded one.
+    failed = False
+    if args.max_idle_ms is not None:
+        for move, values in summary["moves"].items():
+            if values["idle_ms"]["p95"] > args.max_idle_ms:
+                print(f"FAIL: {move} takes {values['idle_ms']['p95']} ms",
+                      file=sys.stderr)
+                failed = True
+    growth = summary["widgets"]["last"] - summary["widgets"]["first"]
+    if growth > args.max_widget_growth:
+        print(f"FAIL: the widget count grew by {growth}", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+def check_soak(args, sampler):
+    """
+    This function prints the results of the soak test and returns 1 if the
+    resource usage grew too much per game and 0 otherwise.
+    """
+    growth = sampler.growth()
+    print(json.dumps({"growth_per_game": growth,
+                      "last_sample": sampler.samples[-1]
+                      if sampler.samples else None}, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"growth_per_game": growth,
+                       "samples": sampler.samples}, file, indent=1)
+
+    if not growth:
+        print("FAIL: not enough games for two samples", file=sys.stderr)
+        return 1
+    # Checks the limits and reports every exceeded one. The tkinter objects
+    # and pyplot figures must not grow at all.
+    limits = {"rss_kb": args.max_rss_growth_kb,
+              "traced_kb": args.max_traced_growth_kb}
+    failed = False
+    for key, value in growth.items():
+        if value > limits.get(key, 0):
+            print(f"FAIL: {key} grows by {value:.3f} per game",
+                  file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+# This runs the benchmark when the file gets executed by the python
+# interpreter.
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,497 @@
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+import zlib
+
+from wwm_gamelogic import Quiz, Status
+
+from wwm_ladders import CLASSIC, Ladder
+
+
+###############################################################################
+# This code packs a whole game into one signed bundle so that a client can
+# play it without asking the server after every input. A bundle contains the
+# 15 questions with their shuffled answers, a salted hash of each correct
+# answer and the results of all jokers, which are drawn in advance. The client
+# plays the game with the BundleGame class (which works like the Quiz class)
+# and records each input in a transcript. At the end it sends the bundle and
+# the transcript back and the server checks both in one pass: The signature
+# shows that the server created the bundle, so the server does not need to
+# store it, and replaying the transcript gives the result of the game. A game
+# therefore needs two requests instead of one for every input.
+#
+# The bundle does not keep the answers secret from a client that wants to
+# cheat: Each question only has four answers whose hashes can be compared and
+# the jokers are included. It only ensures that the transcript belongs to a
+# game the server created and follows the rules of the game. The transcript
+# itself is not signed because the client would need the key to sign it and
+# could then sign any transcript.
+###############################################################################
+# The version of the bundle format.
+VERSION = 1
+# The largest decompressed bundle that is accepted.
+MAX_SIZE = 1 << 20
+# The jokers by the input that uses them (see Quiz.evaluate_answer) with the
+# name of the joker and the name of the action in the transcript.
+JOKERS = {"__joker_50:50": ("50:50 Joker", "50:50"),
+          "__joker_audience": ("Audience Joker", "audience"),
+          "__joker_phone": ("Phone Joker", "phone")}
+
+
+def encode(data, key=None):
+    """
+    This function packs the given data into a compact token (compressed json
+    in url safe base64). If a key is given the token is signed with it.
+    """
+    payload = base64.urlsafe_b64encode(zlib.compress(
+        json.dumps(data, separators=(",", ":")).encode("utf-8"), 9))
+    token = payload.decode("ascii")
+    if key is not None:
+        signature = hmac.new(key, payload, hashlib.sha256).digest()
+        token += "." + base64.urlsafe_b64encode(signature).decode("ascii")
+    return token
+
+
+def decode(token, key=None):
+    """
+    This function unpacks the data of a token created by encode. If a key is
+    given it raises a ValueError unless the token was signed with this key.
+    The signature is checked before the data is decompressed.
+    """
+    payload, _, signature = token.encode("ascii").partition(b".")
+    if key is not None:
+        expected = hmac.new(key, payload, hashlib.sha256).digest()
+        try:
+            valid = hmac.compare_digest(
+                base64.urlsafe_b64decode(signature), expected)
+        except ValueError:
+            valid = False
+        if not valid:
+            raise ValueError("The bundle has an invalid signature")
+    # The size is limited so that a small token can not use up the memory.
+    decompressor = zlib.decompressobj()
+    data = decompressor.decompress(base64.urlsafe_b64decode(payload),
+                                   MAX_SIZE)
+    if decompressor.unconsumed_tail:
+        raise ValueError("The bundle is too large")
+    return json.loads(data)
+
+
+def answer_hash(salt, game_round, answer):
+    """
+    This function returns the salted hash of an answer of the given round.
+    The salt of each game is different so that the hashes of one game can not
+    be used to look up the answers of another game.
+    """
+    return hashlib.blake2b(answer.encode("utf-8"), digest_size=8,
+                           salt=bytes.fromhex(salt),
+                           person=f"round {game_round}".encode()).hexdigest()
+
+
+def create_bundle(secret, source=None, ladder=None, round_seconds=None,
+                  timeout_state="lost", seen=None, stats=None,
+                  **quiz_options):
+    """
+    This function draws a new game from the given source (like Quiz, all
+    further keyword arguments are passed to it) and returns it as a token
+    signed with the given secret (bytes). The questions are added to the
+    SeenIndex if one is given. If AnswerStats are given the audience joker
+    votes like the real players did.
+    """
+    if ladder is None:
+        ladder = CLASSIC
+    quiz = Quiz(source, spares=0, seen=seen, ladder=ladder, **quiz_options)
+    game = secrets.token_hex(8)
+    salt = secrets.token_hex(16)
+    rounds = []
+    for game_round, (question, difficulty, category) in enumerate(
+            quiz.planned_questions(), 1):
+        if seen is not None:
+            seen.add(question.get_key())
+        answers = list(question.get_answers())
+        correct = next(answer for answer in answers if question == answer)
+        distribution = None
+        if stats is not None:
+            distribution = stats.distribution(question.get_key())
+        # The jokers are drawn in advance. The audience and the phone joker
+        # are drawn twice because their results depend on whether the 50:50
+        # joker was used before. The percentages of the audience are stored
+        # by the index of the answer.
+        audience = [0] * 4
+        for answer, percent in question.audience(distribution):
+            audience[answers.index(answer)] = percent
+        phone = answers.index(question.phone())
+        question.fifty_fifty()
+        fifty = [index for index, answer in enumerate(question.get_answers())
+                 if answer.startswith("DELETED")]
+        audience_fifty = [0] * 4
+        for answer, percent in question.audience(distribution):
+            audience_fifty[answers.index(answer)] = percent
+        phone_fifty = answers.index(question.phone())
+        rounds.append({"question": question.get_question(),
+                       "answers": answers,
+                       "hash": answer_hash(salt, game_round, correct),
+                       "key": question.get_key(),
+                       "difficulty": difficulty,
+                       "category": category,
+                       "fifty": fifty,
+                       "audience": audience,
+                       "audience_fifty": audience_fifty,
+                       "phone": phone,
+                       "phone_fifty": phone_fifty})
+    data = {"version": VERSION,
+            "game": game,
+            "issued_at": time.time(),
+            "salt": salt,
+            "ladder": dict(ladder.as_dict(), name=ladder.name),
+            "round_seconds": round_seconds,
+            "timeout_state": timeout_state,
+            "rounds": rounds}
+    return encode(data, secret)
+
+
+class BundleGame():
+    """
+    This class plays the game of a bundle on the client. It has the same
+    methods as the Quiz class (so the user interfaces can play it) and
+    records every input in a transcript. The server replays the transcript
+    with the same class to verify it.
+    """
+    def __init__(self, bundle):
+        """
+        This method initializes the game of the given bundle (a token created
+        by create_bundle or its decoded data).
+        """
+        if isinstance(bundle, str):
+            bundle = decode(bundle)
+        if bundle["version"] != VERSION:
+            raise ValueError(f"Unknown bundle version {bundle['version']}")
+        self.__data = bundle
+        self.__ladder = Ladder(bundle["ladder"]["name"],
+                               bundle["ladder"]["amounts"],
+                               bundle["ladder"]["secure_steps"])
+        self.__jokers = ["50:50 Joker", "Audience Joker", "Phone Joker"]
+        self.__state = "playing"
+        self.__round = 1
+        self.__secured_payout = 0
+        self.__current_payout = 0
+        # The answers of the current question. The deleted answers of the
+        # 50:50 joker start with "DELETED" like in the Question class.
+        self.__answers = list(bundle["rounds"][0]["answers"])
+        # This variable stores the inputs as actions of the transcript: the
+        # round, the action, the index of the answer (or None) and the
+        # milliseconds since the question was asked.
+        self.__actions = []
+        self.__history = []
+        self.__asked_at = None
+        self.__deadline = None
+        # These variables store the current Status object and the functions
+        # that are notified when it changes (like in the Quiz class).
+        self.__status = None
+        self.__observers = []
+        self.__publish()
+
+    def game(self):
+        """
+        This method returns the identifier of the game.
+        """
+        return self.__data["game"]
+
+    def status(self):
+        """
+        This method returns the status of the game like Quiz.status. The
+        Status object is only replaced when the game changes.
+        """
+        return self.__status
+
+    def subscribe(self, callback):
+        """
+        This method registers a function that is called with the new Status
+        object whenever it changes like Quiz.subscribe.
+        """
+        self.__observers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        This method removes a function registered with subscribe.
+        """
+        self.__observers.remove(callback)
+
+    def __publish(self):
+        """
+        This method creates a new Status object if any game variable changed
+        since the last one and notifies all registered functions about it.
+        """
+        if self.__state == "lost":
+            payout = self.__secured_payout
+        else:
+            payout = self.__current_payout
+        values = {"ladder": self.__ladder,
+                  "winnings": self.__ladder.amounts,
+                  "secure_step": self.__ladder.secure_steps,
+                  "jokers": tuple(self.__jokers),
+                  "state": self.__state,
+                  "round": self.__round,
+                  "secured_payout": self.__secured_payout,
+                  "current_payout": self.__current_payout,
+                  "payout": payout}
+        if self.__status is not None and all(
+                self.__status[key] == value for key, value in values.items()):
+            return
+        version = 0 if self.__status is None else self.__status.version + 1
+        self.__status = Status(version=version, **values)
+        for callback in list(self.__observers):
+            callback(self.__status)
+
+    def planned_questions(self):
+        """
+        This method exists because the Quiz class has it, but a bundle only
+        contains hashes of the correct answers, so it can not return Question
+        objects. It raises a NotImplementedError.
+        """
+        raise NotImplementedError("A bundle does not contain the correct "
+                                  "answers of its questions")
+
+    def history(self):
+        """
+        This method returns the history of the asked questions like
+        Quiz.history.
+        """
+        return [dict(entry, jokers=tuple(entry["jokers"]))
+                for entry in self.__history]
+
+    def deadline(self):
+        """
+        This method returns until when the current question needs to be
+        answered like Quiz.deadline.
+        """
+        if self.__state != "playing":
+            return None
+        return self.__deadline
+
+    def expire(self, now=None):
+        """
+        This method ends the game if the time to answer the current question
+        is up like Quiz.expire. The timeout is recorded in the transcript.
+        """
+        if now is None:
+            now = time.monotonic()
+        if (self.__state != "playing" or self.__deadline is None or
+                now < self.__deadline):
+            return False
+        self.replay([self.__round, "timeout", None,
+                     self.__data["round_seconds"] * 1000])
+        return True
+
+    def __question(self, index):
+        """
+        This method returns the question of the round with the given index
+        in the format of Quiz.ask_question.
+        """
+        entry = self.__data["rounds"][index]
+        answers = self.__answers if index == self.__round - 1 \
+            else list(entry["answers"])
+        return ((index, entry["difficulty"], entry["category"]),
+                entry["question"], list(answers), None)
+
+    def ask_question(self):
+        """
+        This method returns the question of the current round like
+        Quiz.ask_question.
+        """
+        self.__asked_at = time.monotonic()
+        # The time limit starts when the question of a round is asked for the
+        # first time.
+        if self.__start_round() and \
+                self.__data["round_seconds"] is not None:
+            self.__deadline = self.__asked_at + self.__data["round_seconds"]
+        return self.__question(self.__round - 1)
+
+    def __start_round(self):
+        """
+        This method starts the entry of the current round in the history if
+        it does not exist yet and returns whether it was started.
+        """
+        if self.__history and self.__history[-1]["round"] == self.__round:
+            return False
+        entry = self.__data["rounds"][self.__round - 1]
+        self.__history.append({"round": self.__round,
+                               "key": entry["key"],
+                               "category": entry["category"],
+                               "difficulty": entry["difficulty"],
+                               "jokers": [],
+                               "answer": None,
+                               "correct": None,
+                               "seconds": None})
+        return True
+
+    def peek_question(self):
+        """
+        This method returns the question of the next round like
+        Quiz.peek_question.
+        """
+        if self.__state != "playing" or self.__round == 15:
+            return None
+        return self.__question(self.__round)
+
+    def evaluate_answer(self, questionobj, given_input):
+        """
+        This method evaluates the player's input like Quiz.evaluate_answer
+        and records it in the transcript.
+        """
+        if self.expire():
+            return None
+        milliseconds = round((time.monotonic() - self.__asked_at) * 1000)
+        if given_input == "__surrender":
+            action = [self.__round, "surrender", None, milliseconds]
+        elif given_input in JOKERS:
+            action = [self.__round, JOKERS[given_input][1], None,
+                      milliseconds]
+        else:
+            action = [self.__round, "answer",
+                      self.__answers.index(given_input), milliseconds]
+        tips = self.replay(action)
+        if tips is None:
+            return None
+        return (questionobj, self.__data["rounds"][questionobj[0]]
+                ["question"], list(self.__answers), tips)
+
+    def replay(self, action):
+        """
+        This method applies one action of a transcript to the game and
+        returns the tips of a joker (or None). It raises a ValueError if the
+        action is not allowed.
+        """
+        tips = self.__apply(action)
+        self.__publish()
+        return tips
+
+    def __apply(self, action):
+        """
+        This method changes the game variables according to one action (see
+        replay).
+        """
+        if not isinstance(action, (list, tuple)) or len(action) != 4:
+            raise ValueError(f"Invalid action {action!r}")
+        game_round, kind, value, milliseconds = action
+        if self.__state != "playing" or game_round != self.__round:
+            raise ValueError(f"Unexpected action {action!r}")
+        entry = self.__data["rounds"][self.__round - 1]
+        self.__start_round()
+        history = self.__history[-1]
+        self.__actions.append(list(action))
+        # An input after the time limit counts as timeout.
+        limit = self.__data["round_seconds"]
+        if kind == "timeout" or (limit is not None and
+                                 milliseconds > limit * 1000):
+            self.__state = self.__data["timeout_state"]
+            history["seconds"] = limit
+            return None
+        if kind == "surrender":
+            self.__state = "surrendered"
+            history["seconds"] = milliseconds / 1000
+            return None
+        for joker, name in JOKERS.values():
+            if kind != name:
+                continue
+            if joker not in self.__jokers:
+                raise ValueError(f"The {joker} was already used")
+            self.__jokers.remove(joker)
+            history["jokers"].append(name)
+            fifty = "50:50" in history["jokers"][:-1]
+            if name == "50:50":
+                for index in entry["fifty"]:
+                    self.__answers[index] = "DELETED" + \
+                        self.__answers[index]
+                return "fifty-fifty"
+            if name == "audience":
+                percents = entry["audience_fifty" if fifty else "audience"]
+                return [(answer, percent) for answer, percent in
+                        zip(self.__answers, percents)
+                        if not answer.startswith("DELETED")]
+            return self.__answers[entry["phone_fifty" if fifty
+                                        else "phone"]]
+        if kind != "answer" or value not in range(4) or \
+                self.__answers[value].startswith("DELETED"):
+            raise ValueError(f"Invalid action {action!r}")
+        answer = self.__answers[value]
+        correct = hmac.compare_digest(
+            answer_hash(self.__data["salt"], self.__round, answer),
+            entry["hash"])
+        history.update(answer=answer, correct=correct,
+                       seconds=milliseconds / 1000)
+        if not correct:
+            self.__state = "lost"
+            return None
+        amount = self.__ladder.amounts[self.__round - 1]
+        self.__current_payout = amount
+        if self.__round == 15:
+            self.__state = "won"
+            return None
+        if self.__round in self.__ladder.secure_steps:
+            self.__secured_payout = amount
+        self.__round += 1
+        self.__answers = list(
+            self.__data["rounds"][self.__round - 1]["answers"])
+        return None
+
+    def transcript(self):
+        """
+        This method returns the transcript of all inputs that the client
+        sends to the server with the bundle.
+        """
+        return {"game": self.__data["game"],
+                "actions": [list(action) for action in self.__actions]}
+
+
+def verify_transcript(bundle, transcript, secret, max_age=24 * 3600,
+                      submitted=None, now=None):
+    """
+    This function checks a bundle and the transcript of its game with the
+    given secret and returns the final Status and the history of the game.
+    It raises a ValueError if the bundle was not created with the secret or
+    is older than max_age seconds, if the transcript does not belong to it or
+    breaks the rules, or if the game is not finished. If a SeenIndex is given
+    as submitted each game is only accepted once, even if it is submitted by
+    several threads at the same time.
+    """
+    if now is None:
+        now = time.time()
+    data = decode(bundle, secret)
+    if now - data["issued_at"] > max_age:
+        raise ValueError("The bundle is too old")
+    game = data["game"]
+    # The transcript comes from the client, so its format is checked before
+    # it is used.
+    if not isinstance(transcript, dict) or not isinstance(
+            transcript.get("actions"), list):
+        raise ValueError("The transcript has an invalid format")
+    if transcript.get("game") != game:
+        raise ValueError("The transcript does not belong to the bundle")
+    key = int(game, 16)
+    if submitted is not None and key in submitted:
+        raise ValueError("The game was already submitted")
+    replay = BundleGame(data)
+    for action in transcript["actions"]:
+        # Actions in the wrong format are invalid as well.
+        try:
+            replay.replay(action)
+        except (TypeError, IndexError) as error:
+            raise ValueError(f"Invalid action {action!r}") from error
+    status = replay.status()
+    if status["state"] == "playing":
+        raise ValueError("The transcript does not finish the game")
+    # The game is only accepted if this call added it to the index. Checking
+    # and adding in one step rejects a second submission that was replayed
+    # at the same time.
+    if submitted is not None and not submitted.add(key):
+        raise ValueError("The game was already submitted")
+    return status, replay.history()
+
+
+# This ensures that importing doesn't automatically run this code.
+if __name__ == '__main__':
+    pass
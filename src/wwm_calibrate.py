@@ -0,0 +1,262 @@
+import argparse
+import array
+import bisect
+import csv
+import glob
+import gzip
+import json
+import os
+import struct
+import time
+
+
+###############################################################################
+# This code calibrates the difficulty of the questions with the answers of the
+# exported games (see wwm_export). The difficulty labels of opentdb.com
+# (easy, medium, hard) only roughly tell how hard a question is for the
+# players of this game. The calibration fits a Rasch model to all answers:
+# The probability that a player answers a question correctly is
+#   1 / (1 + exp(difficulty of the question - ability of the player)),
+# so the difficulty of each question is measured on the same scale for all
+# questions, taking into account which players answered it. The model is
+# fitted with Newton steps that alternate between the abilities and the
+# difficulties. Each step handles all answers at once with numpy, so millions
+# of answers take seconds to minutes. Weak normal priors keep the values of
+# questions and players with few answers close to zero.
+#
+# The result is written to a compact file that the Quiz class loads with the
+# DifficultyTable class to order the questions of a game from the easiest to
+# the hardest. numpy is only needed to run the calibration, not to load the
+# table. The layout of the file is:
+#   magic (4 bytes) | header length (uint32) | header (json)
+#   | padding to 8 bytes | question keys (uint64, sorted)
+#   | difficulties (float32, in the order of the keys)
+###############################################################################
+MAGIC = b"WWMD"
+LENGTH_FORMAT = struct.Struct("<I")
+
+
+class DifficultyTable():
+    """
+    This class stores the calibrated difficulty of questions by their key
+    (see question_key in wwm_gamelogic).
+    """
+    def __init__(self, keys=(), difficulties=(), labels=None):
+        """
+        This method initializes the table with the given question keys (in
+        increasing order) and their difficulties. The labels map each
+        difficulty label of opentdb.com to the mean difficulty of its
+        questions which is used for questions without a calibrated value.
+        """
+        self.__keys = array.array("Q", keys)
+        self.__difficulties = array.array("f", difficulties)
+        self.labels = dict(labels or {})
+
+    @classmethod
+    def load(cls, path):
+        """
+        This method loads a table from the file under the given path (see
+        write).
+        """
+        with open(path, "rb") as file:
+            data = file.read()
+        if data[:4] != MAGIC:
+            raise ValueError(f"{path} does not contain a difficulty table")
+        header_length, = LENGTH_FORMAT.unpack_from(data, 4)
+        header = json.loads(data[8:8 + header_length])
+        start = (8 + header_length + 7) // 8 * 8
+        count = header["count"]
+        table = cls(labels=header["labels"])
+        table.__keys.frombytes(data[start:start + count * 8])
+        table.__difficulties.frombytes(
+            data[start + count * 8:start + count * 12])
+        return table
+
+    def write(self, path):
+        """
+        This method writes the table to the file under the given path. It is
+        first written to a temporary file and then renamed so that games
+        that load the table never see a half written file.
+        """
+        header = json.dumps({"count": len(self.__keys),
+                             "labels": self.labels}).encode("utf-8")
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(MAGIC + LENGTH_FORMAT.pack(len(header)) + header)
+            file.write(b"\0" * ((8 - (8 + len(header)) % 8) % 8))
+            file.write(self.__keys.tobytes())
+            file.write(self.__difficulties.tobytes())
+        os.replace(temporary_path, path)
+
+    def __len__(self):
+        """
+        This method returns the number of questions in the table.
+        """
+        return len(self.__keys)
+
+    def get(self, key, label=None):
+        """
+        This method returns the difficulty of the question with the given
+        key. If it was not calibrated the mean difficulty of the given label
+        is returned (or None if the label is unknown as well).
+        """
+        index = bisect.bisect_left(self.__keys, key)
+        if index < len(self.__keys) and self.__keys[index] == key:
+            return self.__difficulties[index]
+        return self.labels.get(label)
+
+
+def read_answers(directory):
+    """
+    This function reads the answered questions of all exported games in the
+    given directory (Parquet or gzip compressed csv files, see wwm_export)
+    and returns numpy arrays with the player, the question key, whether the
+    answer was correct and the difficulty label of each answer.
+    """
+    import numpy
+
+    players, questions, correct, labels = [], [], [], []
+    for path in sorted(glob.glob(os.path.join(directory, "*.parquet"))):
+        # pyarrow is only needed to read Parquet files.
+        import pyarrow.compute
+        import pyarrow.parquet
+
+        table = pyarrow.parquet.read_table(
+            path, columns=["player", "question", "correct", "difficulty"])
+        table = table.filter(pyarrow.compute.is_valid(table["correct"]))
+        players.append(table["player"].to_numpy(zero_copy_only=False))
+        questions.append(table["question"].to_numpy())
+        correct.append(table["correct"].to_numpy(zero_copy_only=False))
+        labels.append(table["difficulty"].to_numpy(zero_copy_only=False))
+    for path in sorted(glob.glob(os.path.join(directory, "*.csv.gz"))):
+        rows = [(row["player"], int(row["question"]), row["correct"] == "True",
+                 row["difficulty"])
+                for row in csv.DictReader(gzip.open(path, "rt",
+                                                    encoding="utf-8"))
+                if row["correct"] != ""]
+        if rows:
+            columns = list(zip(*rows))
+            players.append(numpy.array(columns[0], dtype=object))
+            questions.append(numpy.array(columns[1], dtype=numpy.uint64))
+            correct.append(numpy.array(columns[2], dtype=bool))
+            labels.append(numpy.array(columns[3], dtype=object))
+    if not players:
+        raise ValueError(f"No exported games found in {directory}")
+    return (numpy.concatenate(players),
+            numpy.concatenate(questions).astype(numpy.uint64),
+            numpy.concatenate(correct).astype(bool),
+            numpy.concatenate(labels))
+
+
+def fit_rasch(players, questions, correct, prior=1.0, iterations=100,
+              tolerance=1e-4):
+    """
+    This function fits the Rasch model to the given answers (arrays with the
+    index of the player, the index of the question and whether the answer was
+    correct). The prior is the precision of the normal priors of all values.
+    It returns the abilities of the players, the difficulties of the
+    questions, their standard errors and the number of iterations.
+    """
+    import numpy
+
+    correct = correct.astype(numpy.float64)
+    abilities = numpy.zeros(players.max() + 1)
+    difficulties = numpy.zeros(questions.max() + 1)
+    for iteration in range(1, iterations + 1):
+        # One Newton step for all abilities at once: The gradient and the
+        # curvature of each player are the sums over his answers which
+        # bincount adds up without a python loop.
+        probability = 1 / (1 + numpy.exp(difficulties[questions] -
+                                         abilities[players]))
+        gradient = numpy.bincount(players, correct - probability,
+                                  len(abilities)) - prior * abilities
+        curvature = numpy.bincount(players, probability * (1 - probability),
+                                   len(abilities)) + prior
+        step = gradient / curvature
+        abilities += step
+        largest_step = numpy.abs(step).max()
+        # The same for all difficulties with the new abilities.
+        probability = 1 / (1 + numpy.exp(difficulties[questions] -
+                                         abilities[players]))
+        gradient = numpy.bincount(questions, probability - correct,
+                                  len(difficulties)) - prior * difficulties
+        curvature = numpy.bincount(questions, probability * (1 - probability),
+                                   len(difficulties)) + prior
+        step = gradient / curvature
+        difficulties += step
+        largest_step = max(largest_step, numpy.abs(step).max())
+        if largest_step < tolerance:
+            break
+    return abilities, difficulties, 1 / numpy.sqrt(curvature), iteration
+
+
+def calibrate(directory, min_answers=20, prior=1.0):
+    """
+    This function calibrates the difficulties with the exported games in the
+    given directory and returns a DifficultyTable with all questions that
+    were answered at least min_answers times and a dictionary with details
+    of the calibration.
+    """
+    import numpy
+
+    started_at = time.monotonic()
+    player_names, question_keys, correct, labels = read_answers(directory)
+    # The players and questions are numbered so that their values can be
+    # stored in arrays. The names are numbered with a dictionary because
+    # sorting millions of strings with numpy is much slower.
+    numbers = {}
+    players = numpy.fromiter(
+        (numbers.setdefault(name, len(numbers)) for name in player_names),
+        dtype=numpy.int64, count=len(player_names))
+    keys, questions = numpy.unique(question_keys, return_inverse=True)
+    abilities, difficulties, errors, iterations = fit_rasch(
+        players, questions, correct, prior)
+    counts = numpy.bincount(questions, minlength=len(keys))
+    # The mean difficulty of each label is used for questions that were not
+    # answered often enough. The label of a question is taken from its first
+    # answer.
+    first = numpy.unique(questions, return_index=True)[1]
+    question_labels = labels[first]
+    label_means = {str(label): float(difficulties[question_labels == label]
+                                     .mean())
+                   for label in numpy.unique(question_labels)}
+    selected = counts >= min_answers
+    table = DifficultyTable(keys[selected].tolist(),
+                            difficulties[selected].tolist(), label_means)
+    details = {"answers": len(correct),
+               "players": len(abilities),
+               "questions": len(keys),
+               "calibrated": int(selected.sum()),
+               "iterations": iterations,
+               "median_error": float(numpy.median(errors[selected]))
+               if selected.any() else None,
+               "labels": label_means,
+               "seconds": time.monotonic() - started_at}
+    return table, details
+
+
+# This calibrates the difficulties when the file gets executed by the python
+# interpreter.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Calibrates the difficulty of the questions with the "
+                    "exported games.")
+    parser.add_argument("export", help="directory with the exported games "
+                                       "(see --export of wwm.py)")
+    parser.add_argument("--output", default="difficulties.bin",
+                        help="file to write the difficulty table to")
+    parser.add_argument("--min-answers", type=int, default=20,
+                        help="number of answers a question needs to be "
+                             "calibrated (default 20)")
+    args = parser.parse_args()
+    table, details = calibrate(args.export, args.min_answers)
+    table.write(args.output)
+    print(f"{details['answers']} answers of {details['players']} players "
+          f"to {details['questions']} questions in "
+          f"{details['iterations']} iterations "
+          f"({details['seconds']:.1f} seconds)")
+    print(f"{details['calibrated']} questions calibrated, median standard "
+          f"error {details['median_error']}")
+    for label, mean in sorted(details["labels"].items(),
+                              key=lambda item: item[1]):
+        print(f"mean difficulty of {label} questions: {mean:+.2f}")
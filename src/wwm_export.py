@@ -0,0 +1,343 @@
+import csv
+import gzip
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+
+###############################################################################
+# This code exports the finished games for analyses. Each exported file
+# contains one row for each asked question with the values of its game (player,
+# state, payout, ladder, duration, ...) and of its round (category, difficulty,
+# used jokers, given answer and decision time), so that the files of many
+# months can be loaded into one table. The rows are written by a background
+# thread in batches so that exporting never makes the game wait. If pyarrow is
+# installed the files are written in the columnar Parquet format, otherwise as
+# gzip compressed csv files. The rows are collected until there are enough
+# for one large row group (small row groups compress badly and make reading
+# the columns slow) or until the file is finished. A new file is started when
+# the current one is too large or too old and only complete files get their
+# final name.
+###############################################################################
+# The columns of each row with their types in the Parquet files.
+COLUMNS = (("game", "string"),
+           ("player", "string"),
+           ("day", "string"),
+           ("finished_at", "float64"),
+           ("state", "string"),
+           ("final_round", "int32"),
+           ("payout", "int64"),
+           ("ladder", "string"),
+           ("duration", "float64"),
+           ("round", "int32"),
+           ("question", "uint64"),
+           ("category", "string"),
+           ("difficulty", "string"),
+           ("jokers", "string"),
+           ("answer", "string"),
+           ("correct", "bool"),
+           ("seconds", "float64"))
+
+
+def export_rows(record):
+    """
+    This function converts the record of a finished game (see game_record in
+    wwm_leaderboard) with the history of its rounds (see Quiz.history) under
+    the key "rounds" into the rows of the export.
+    """
+    game = uuid.uuid4().hex
+    rows = []
+    for entry in record["rounds"]:
+        rows.append({"game": game,
+                     "player": record["player"],
+                     "day": record["day"],
+                     "finished_at": record["finished_at"],
+                     "state": record["state"],
+                     "final_round": record["round"],
+                     "payout": record["payout"],
+                     "ladder": record["ladder"],
+                     "duration": record["duration"],
+                     "round": entry["round"],
+                     "question": entry["key"],
+                     # The category might be a number (opentdb.com) or a name
+                     # (question store).
+                     "category": None if entry["category"] is None
+                     else str(entry["category"]),
+                     "difficulty": entry["difficulty"],
+                     "jokers": ",".join(entry["jokers"]),
+                     "answer": entry["answer"],
+                     "correct": entry["correct"],
+                     "seconds": entry["seconds"]})
+    return rows
+
+
+class CsvWriter():
+    """
+    This class writes rows into a gzip compressed csv file.
+    """
+    extension = ".csv.gz"
+
+    def __init__(self, path):
+        """
+        This method creates the file under the given path and writes the
+        header.
+        """
+        self.__file = gzip.open(path, "wt", newline="", encoding="utf-8")
+        self.__writer = csv.writer(self.__file)
+        self.__writer.writerow(name for name, _ in COLUMNS)
+
+    def write(self, rows):
+        """
+        This method writes the given rows.
+        """
+        self.__writer.writerows(
+            [row[name] for name, _ in COLUMNS] for row in rows)
+        self.__file.flush()
+
+    def close(self):
+        """
+        This method closes the file.
+        """
+        self.__file.close()
+
+
+class ParquetWriter():
+    """
+    This class writes rows into a Parquet file. Each batch of rows becomes
+    one row group.
+    """
+    extension = ".parquet"
+
+    def __init__(self, path):
+        """
+        This method creates the file under the given path.
+        """
+        # pyarrow is optional and therefore only imported when it is used.
+        import pyarrow
+        import pyarrow.parquet
+
+        self.__pyarrow = pyarrow
+        self.__schema = pyarrow.schema(
+            [(name, pyarrow.type_for_alias(kind)) for name, kind in COLUMNS])
+        self.__writer = pyarrow.parquet.ParquetWriter(
+            path, self.__schema, compression="zstd")
+
+    def write(self, rows):
+        """
+        This method writes the given rows.
+        """
+        self.__writer.write_table(self.__pyarrow.Table.from_pylist(
+            rows, schema=self.__schema))
+
+    def close(self):
+        """
+        This method closes the file.
+        """
+        self.__writer.close()
+
+
+def parquet_available():
+    """
+    This function returns whether pyarrow is installed.
+    """
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class GameExporter():
+    """
+    This class exports finished games into files in a directory.
+    """
+    def __init__(self, directory, file_format=None, row_group_size=100000,
+                 max_bytes=64 << 20, max_seconds=3600):
+        """
+        This method starts the thread that exports the games into the given
+        directory. The file format is "parquet" or "csv" (by default parquet
+        if pyarrow is installed). Rows are written when row_group_size rows
+        are waiting, when flush or close is called or when the file is
+        finished. A file is finished when it has max_bytes or when its first
+        row is older than max_seconds, so rows wait at most max_seconds.
+        """
+        if file_format is None:
+            file_format = "parquet" if parquet_available() else "csv"
+        self.__writer_class = {"parquet": ParquetWriter,
+                               "csv": CsvWriter}[file_format]
+        os.makedirs(directory, exist_ok=True)
+        self.__directory = directory
+        self.__row_group_size = row_group_size
+        self.__max_bytes = max_bytes
+        self.__max_seconds = max_seconds
+        # This variable stores the writer of the open file and the final path
+        # of the file. While the file is written its path ends with ".tmp".
+        self.__file = None
+        self.__files = 0
+        # This variable stores when the first row of the current file
+        # arrived (or None if there is none yet).
+        self.__started_at = None
+        # This variable stores the first error of the background thread until
+        # it is raised by flush or close.
+        self.__error = None
+        # New games are passed to the background thread with a queue.
+        self.__games = queue.Queue()
+        self.__thread = threading.Thread(target=self.__export, daemon=True)
+        self.__thread.start()
+
+    def add(self, record):
+        """
+        This method exports a finished game (see export_rows). It returns
+        immediately and the game is written in the background.
+        """
+        self.__games.put(record)
+
+    def flush(self):
+        """
+        This method waits until all added games are written. It raises the
+        error if games could not be written.
+        """
+        self.__games.put("flush")
+        self.__games.join()
+        self.__raise_error()
+
+    def close(self):
+        """
+        This method writes all added games, closes the current file and stops
+        the background thread. It raises the error if games could not be
+        written.
+        """
+        self.__games.put(None)
+        self.__thread.join()
+        self.__raise_error()
+
+    def __raise_error(self):
+        """
+        This method raises the error of the background thread (if there was
+        one) once.
+        """
+        error, self.__error = self.__error, None
+        if error is not None:
+            raise error
+
+    def __export(self):
+        """
+        This method is executed by the background thread. It collects the
+        rows of the added games and writes them in large batches. If they
+        can not be written, the rows and the current file are dropped and the
+        error is reported, so the thread keeps running and flush and close
+        never wait forever.
+        """
+        rows = []
+        running = True
+        while running:
+            # Waits for the next game but not longer than until the current
+            # file needs to be finished.
+            timeout = None
+            if self.__started_at is not None:
+                timeout = max(self.__started_at + self.__max_seconds -
+                              time.monotonic(), 0)
+            try:
+                record = self.__games.get(timeout=timeout)
+            except queue.Empty:
+                record = "timeout"
+            try:
+                if record is None:
+                    running = False
+                elif record not in ("flush", "timeout"):
+                    self.__collect(rows, record)
+                finish = self.__started_at is not None and (
+                    not running or time.monotonic() - self.__started_at >=
+                    self.__max_seconds)
+                if rows and (len(rows) >= self.__row_group_size or
+                             record == "flush" or finish):
+                    self.__write(rows)
+                    rows = []
+                # The file is also finished when it gets too old while no
+                # games are played.
+                if finish and self.__file is not None:
+                    self.__finish()
+            # E.g. pyarrow can not convert a row or the disk is full. Any
+            # error is caught because the thread must keep running.
+            except Exception as error:
+                self.__report(error)
+                rows = []
+                self.__abandon()
+            finally:
+                if record != "timeout":
+                    self.__games.task_done()
+
+    def __collect(self, rows, record):
+        """
+        This method adds the rows of the given game to the collected rows. A
+        game that can not be converted is dropped on its own so that the
+        rows of the other games are still written.
+        """
+        try:
+            new_rows = export_rows(record)
+        except Exception as error:
+            self.__report(error)
+            return
+        # The age of the file only starts with its first row. A game without
+        # rounds must not start it because nothing would finish the file.
+        if new_rows and self.__started_at is None:
+            self.__started_at = time.monotonic()
+        rows.extend(new_rows)
+
+    def __report(self, error):
+        """
+        This method prints an error of the background thread and keeps the
+        first one for flush and close.
+        """
+        traceback.print_exception(type(error), error, error.__traceback__)
+        if self.__error is None:
+            self.__error = error
+
+    def __write(self, rows):
+        """
+        This method writes the given rows into the current file (or a new one)
+        and finishes the file if it is too large.
+        """
+        if self.__file is None:
+            self.__files += 1
+            name = (time.strftime("games-%Y%m%d-%H%M%S") +
+                    f"-{os.getpid()}-{self.__files}" +
+                    self.__writer_class.extension)
+            path = os.path.join(self.__directory, name)
+            self.__file = (self.__writer_class(path + ".tmp"), path)
+        self.__file[0].write(rows)
+        if os.path.getsize(self.__file[1] + ".tmp") >= self.__max_bytes:
+            self.__finish()
+
+    def __finish(self):
+        """
+        This method closes the current file and gives it its final name.
+        """
+        writer, path = self.__file
+        self.__file = None
+        self.__started_at = None
+        writer.close()
+        os.replace(path + ".tmp", path)
+
+    def __abandon(self):
+        """
+        This method closes the current file after an error without giving it
+        its final name, so it is never read as a complete file.
+        """
+        self.__started_at = None
+        if self.__file is None:
+            return
+        writer, _ = self.__file
+        self.__file = None
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+
+# This ensures that importing doesn't automatically run this code.
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,356 @@
+import argparse
+import gc
+import json
+import os
+import re
+import selectors
+import signal
+import socket
+import sys
+import time
+import tkinter
+import traceback
+
+from wwm import QuizApp
+
+from wwm_leaderboard import Leaderboard
+
+from wwm_seen import SeenIndex
+
+from wwm_shm import SharedCorpus, store_questions
+
+from wwm_sources import OpentdbSource
+
+import wwm_ui
+
+
+###############################################################################
+# This code starts many game windows (e.g. one for each kiosk or session)
+# from one prepared process instead of starting python for each of them. The
+# server process imports all modules (tkinter, matplotlib, requests, ...),
+# reads the sprite sheet of the jokers, renders one audience chart so that
+# matplotlib loads its fonts, and retrieves a pool of questions into shared
+# memory. Then it starts each game as a child process with fork: The child
+# shares all memory pages of the server as long as neither of them changes
+# them (copy-on-write), so it only needs to create its window and can be
+# played within milliseconds, and each further child only needs the memory
+# for its own window and game.
+#
+# The server itself never creates a tkinter window because the connection to
+# the display can not be shared with the children. It also freezes the
+# garbage collector before starting children because the garbage collector
+# would otherwise write to the pages of all objects of the server and so copy
+# them into every child. Objects that need threads or own connections (the
+# worker threads of the window, the leaderboard) are created in the child.
+#
+# Each child remembers the asked questions in its own SeenIndex because the
+# processes can not share one. If a directory is given, the index of each
+# player is loaded from a file when a window starts and saved when it closes,
+# so a new window (e.g. after a kiosk window was closed) does not repeat the
+# questions of the previous one. Windows of the same player that run at the
+# same time still do not know the questions of each other.
+###############################################################################
+# The seconds a client of the socket has to send its request and the maximum
+# length of a request in bytes.
+REQUEST_TIMEOUT = 5
+MAX_REQUEST = 4096
+
+
+def read_memory(pid):
+    """
+    This function returns the resident memory of the process with the given
+    id and its proportional share (shared pages are divided by the number of
+    processes sharing them) in kilobytes. It only works on linux.
+    """
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name.lower()] = int(value.split()[0])
+    return values
+
+
+class ForkServer():
+    """
+    This class prepares everything the game windows need once and starts
+    each window in its own child process.
+    """
+    def __init__(self, store=None, warm=50, leaderboard=None, seen=None,
+                 **quiz_options):
+        """
+        This method imports and prepares everything. The questions come from
+        the question store in the given directory or, if it is None, warm
+        questions of each difficulty are retrieved from the opentdb.com api.
+        The questions are packed into shared memory (see wwm_shm). If the path
+        of a leaderboard database is given, each child records its games in
+        it. If a directory is given as seen, the asked questions of each
+        player are kept in a file in it (see seen_path). All other keyword
+        arguments are passed to each new Quiz object.
+        """
+        # The first window would create the default root of tkinter, which
+        # must not exist before the children are started.
+        if tkinter._default_root is not None:
+            raise RuntimeError("The fork server must not create a tkinter "
+                               "window")
+        started_at = time.monotonic()
+        if store is not None:
+            questions = list(store_questions(store))
+        else:
+            source = OpentdbSource()
+            questions = [question
+                         for difficulty in ("easy", "medium", "hard")
+                         for question in source.fetch(difficulty, warm)]
+        self.sprite_data = wwm_ui.read_sprite_sheet()
+        # Rendering one chart loads the fonts and caches of matplotlib.
+        wwm_ui.render_audience([("A: a", 40), ("B: b", 30), ("C: c", 20),
+                                ("D: d", 10)], ["a", "b", "c", "d"])
+        # The shared memory is created last so that it is not left behind
+        # if one of the steps above fails.
+        self.corpus = SharedCorpus.create(questions)
+        self.leaderboard = leaderboard
+        self.seen = seen
+        if seen is not None:
+            os.makedirs(seen, exist_ok=True)
+        self.quiz_options = quiz_options
+        # This variable stores the display and player of each running child
+        # by its process id.
+        self.workers = {}
+        # This variable stores the sockets of the server (e.g. the listening
+        # socket) which each child closes right after it was started.
+        self.__inherited = []
+        self.prepared_seconds = time.monotonic() - started_at
+        # All objects that exist now are moved into a generation that the
+        # garbage collector never visits so that their pages stay shared.
+        gc.collect()
+        gc.freeze()
+
+    def spawn(self, display=None, player="Player"):
+        """
+        This method starts a child process with a game window on the given X
+        display (or the display of the server) for the given player and
+        returns its process id.
+        """
+        forked_at = time.monotonic()
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = (display, player)
+            return pid
+        # The child never returns to the code of the server. os._exit skips
+        # the clean up of the server, e.g. removing the shared memory.
+        code = 0
+        try:
+            for inherited in self.__inherited:
+                inherited.close()
+            self.__play(display, player, forked_at)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    def seen_path(self, player):
+        """
+        This method returns the path of the file with the asked questions of
+        the given player (or None if no directory was given). Characters that
+        can not be part of a file name are replaced.
+        """
+        if self.seen is None:
+            return None
+        return os.path.join(self.seen,
+                            re.sub(r"[^\w.-]", "_", player) + ".bin")
+
+    def __play(self, display, player, forked_at):
+        """
+        This method is executed by the child process. It creates the window
+        and plays games until the window is closed.
+        """
+        # The handlers of the server only stop the server.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        if display is not None:
+            os.environ["DISPLAY"] = display
+        leaderboard = None
+        if self.leaderboard is not None:
+            leaderboard = Leaderboard(self.leaderboard)
+        seen = SeenIndex(path=self.seen_path(player))
+        app = QuizApp(self.corpus, leaderboard=leaderboard, player=player,
+                      sprite_data=self.sprite_data, seen=seen,
+                      **self.quiz_options)
+        app.after_idle(lambda: print(
+            f"worker {os.getpid()} ready after "
+            f"{(time.monotonic() - forked_at) * 1000:.1f} ms",
+            file=sys.stderr, flush=True))
+        app.mainloop()
+        seen.save()
+        if leaderboard is not None:
+            leaderboard.close()
+
+    def reap(self, block=False):
+        """
+        This method collects the ended children and returns their process ids
+        with their display and player.
+        """
+        ended = []
+        while self.workers:
+            pid, _ = os.waitpid(-1, 0 if block else os.WNOHANG)
+            if pid == 0:
+                break
+            ended.append((pid,) + self.workers.pop(pid, (None, None)))
+            block = False
+        return ended
+
+    def status(self):
+        """
+        This method returns a list with the process id, the display, the
+        player and the memory (see read_memory) of each running child.
+        """
+        workers = []
+        for pid, (display, player) in self.workers.items():
+            try:
+                memory = read_memory(pid)
+            except OSError:
+                memory = {}
+            workers.append({"pid": pid, "display": display,
+                            "player": player, **memory})
+        return workers
+
+    def supervise(self, displays):
+        """
+        This method keeps one child running on each of the given displays
+        (e.g. one for each kiosk) and starts a new one whenever one ends. It
+        returns when the server receives SIGTERM or SIGINT and ends all
+        children.
+        """
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+        signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+        for display in displays:
+            self.spawn(display)
+        # The children are collected without blocking because a blocking
+        # waitpid is resumed after a signal and would only return once a
+        # child ended.
+        while not stopping:
+            for _, display, player in self.reap():
+                self.spawn(display, player)
+            time.sleep(0.2)
+        self.stop()
+
+    def serve(self, path):
+        """
+        This method starts a child for each request on the unix socket under
+        the given path until the server receives SIGTERM or SIGINT. Each
+        request is one line of json: {"display": ..., "player": ...} starts a
+        child and answers with its process id, {"command": "status"} answers
+        with the status of all children.
+        """
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+        signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+        if os.path.exists(path):
+            os.unlink(path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(path)
+        listener.listen()
+        selector = selectors.DefaultSelector()
+        selector.register(listener, selectors.EVENT_READ)
+        self.__inherited = [listener, selector]
+        try:
+            while not stopping:
+                # Ended children are collected regularly so that they do not
+                # stay as zombies.
+                self.reap()
+                if not selector.select(timeout=1):
+                    continue
+                connection, _ = listener.accept()
+                with connection:
+                    self.__inherited.append(connection)
+                    self.__answer(connection)
+                    self.__inherited.remove(connection)
+        finally:
+            self.__inherited = []
+            selector.close()
+            listener.close()
+            os.unlink(path)
+            self.stop()
+
+    def __answer(self, connection):
+        """
+        This method reads one request from the given connection and answers
+        it (see serve). Invalid requests and clients that do not send their
+        request in time are answered with an error (if possible) but never
+        stop the server.
+        """
+        # A client that does not send its request must not block the
+        # requests of the other clients.
+        connection.settimeout(REQUEST_TIMEOUT)
+        try:
+            line = connection.makefile("rb").readline(MAX_REQUEST)
+            request = json.loads(line or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("The request needs to be a json object")
+            if request.get("command") == "status":
+                answer = {"workers": self.status()}
+            else:
+                answer = {"pid": self.spawn(
+                    request.get("display"),
+                    str(request.get("player", "Player")))}
+        except (ValueError, OSError) as error:
+            answer = {"error": str(error)}
+        try:
+            connection.sendall(json.dumps(answer).encode() + b"\n")
+        except OSError:
+            pass
+
+    def stop(self):
+        """
+        This method ends all children, waits for them and removes the shared
+        memory.
+        """
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        while self.workers:
+            self.reap(block=True)
+        self.corpus.close()
+
+
+# This starts the fork server when the file gets executed by the python
+# interpreter.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Starts game windows from one prepared process.")
+    parser.add_argument("--store",
+                        help="directory of a question store created with "
+                             "wwm_store.py to use instead of the opentdb.com "
+                             "api")
+    parser.add_argument("--warm", type=int, default=50,
+                        help="questions of each difficulty to retrieve from "
+                             "the api before the first window starts "
+                             "(default 50)")
+    parser.add_argument("--leaderboard", metavar="FILE",
+                        help="database that records the result of each game")
+    parser.add_argument("--seen", metavar="DIRECTORY",
+                        help="directory in which the recently asked "
+                             "questions of each player are kept so that new "
+                             "windows do not repeat them")
+    parser.add_argument("--display", action="append", default=[],
+                        help="X display of a kiosk, e.g. :1 (can be "
+                             "repeated); a new window is started whenever "
+                             "one is closed")
+    parser.add_argument("--socket", metavar="PATH",
+                        help="unix socket on which windows are requested "
+                             "instead of the kiosks")
+    args = parser.parse_args()
+    if not args.display and not args.socket:
+        parser.error("either --display or --socket is needed")
+    server = ForkServer(args.store, args.warm, args.leaderboard, args.seen)
+    print(f"prepared in {server.prepared_seconds:.1f} seconds",
+          file=sys.stderr, flush=True)
+    if args.socket:
+        server.serve(args.socket)
+    else:
+        server.supervise(args.display)
@@ -1,6 +1,12 @@
+import hashlib
+import html
 import random
+import re
+import time
 
-import requests
+from wwm_ladders import CLASSIC
+
+from wwm_sources import OpentdbSource, time_limit
 
 
 ###############################################################################
@@ -17,50 +23,131 @@ class Quiz():
     instance of the Question class and has different methods that are also used
     in this class.
     """
-    def __init__(self):
-        """
-        This method initializes a new game. It retrieves 15 questions from
-        the opentdb.com api and stores them as Question objects in different
-        lists. It also defines private game variables and sets them all on
-        their starting values.
-        """
-        # To increase the question difficulty during the game questions are
-        # stored according to their difficulty.
-        self.__easy_questions = []
-        self.__medium_questions = []
-        self.__hard_questions = []
-        difficulties = ("easy", "medium", "hard")
-        for index in range(3):
-            # 5 questions for each difficulty are retrieved from a public api.
-            params = {"amount": 5,
-                      "difficulty": difficulties[index],
-                      "type": "multiple",
-                      "category": 9}
-            response = requests.get(
-                      "https://opentdb.com/api.php",
-                      params=params)
-            # The api response body is parsed to a dictionary.
-            for question in response.json()["results"]:
-                # For each question a new Question object is created and stored
-                # in the list suited for its difficulty.
-                question = Question(
-                        question["question"],
-                        question["correct_answer"],
-                        question["incorrect_answers"])
-                if index == 0:
-                    self.__easy_questions.append(question)
-                elif index == 1:
-                    self.__medium_questions.append(question)
-                else:
-                    self.__hard_questions.append(question)
+    def __init__(self, source=None, categories=None, pool_size=5,
+                 seen=None, stats=None, spares=1, time_budget=None,
+                 practice=None, round_seconds=None, timeout_state="lost",
+                 ladder=None, difficulties=None):
+        """
+        This method initializes a new game. It retrieves questions from the
+        given source (by default the opentdb.com api) and stores them as
+        Question objects in different pools. Questions are drawn from the
+        given categories (a dictionary that maps each category to its weight)
+        or from the default category of the source if it is None. The
+        questions of all 15 rounds and the given number of spare questions
+        for each difficulty are selected from the pools right away. If a
+        SeenIndex is given, questions that were recently asked are skipped
+        and all asked questions are added to it. If AnswerStats are given,
+        each answer is added to them and the audience joker votes like the
+        real players did. If a PlayerDeck is given as practice, each question
+        the player answers incorrectly is added to it so that it can be
+        practiced later. If round_seconds is given the player has this many
+        seconds to answer each question and when the time is up the game
+        ends with the timeout_state ("lost" or "surrendered"). If a time
+        budget in seconds is given, retrieving the questions fails with a
+        TimeoutError when it takes longer. The payouts are taken from the
+        given Ladder (by default the classic ladder, see wwm_ladders). If a
+        DifficultyTable is given (see wwm_calibrate) the planned questions are
+        asked from the easiest to the hardest according to it. It also
+        defines private game variables and sets them all on their starting
+        values.
+        """
+        if source is None:
+            source = OpentdbSource()
+        if categories is None:
+            categories = {None: 1}
+        self.__source = source
+        self.__pool_size = pool_size
+        self.__seen = seen
+        self.__stats = stats
+        self.__practice = practice
+        self.__round_seconds = round_seconds
+        if timeout_state not in ("lost", "surrendered"):
+            raise ValueError("The timeout state needs to be 'lost' or "
+                             "'surrendered'")
+        self.__timeout_state = timeout_state
+        # This variable stores until when the current question needs to be
+        # answered (or None if there is no time limit).
+        self.__deadline = None
+        # This variable tracks when the current question was asked to measure
+        # how long the player needs to decide.
+        self.__asked_at = None
+        # This variable stores for each asked question which jokers were
+        # used, which answer was given and how long it took (see history).
+        self.__history = []
+        # This variable stores the keys of all questions in the pools so that
+        # the same question is never stored twice in one game.
+        self.__keys = set()
+        # All questions (and how many questions each category contains) are
+        # retrieved within the time budget.
+        with time_limit(time_budget):
+            # If the source knows how many questions each category contains
+            # (see OpentdbSource.count), the categories without questions of
+            # a difficulty are not used for it and no more questions are
+            # requested than the category contains.
+            count = getattr(source, "count", None)
+            self.__available = {}
+            for category in categories:
+                for difficulty in ("easy", "medium", "hard"):
+                    self.__available[(category, difficulty)] = None \
+                        if count is None else count(difficulty, category)
+            # The categories are selected randomly according to their weights.
+            # An alias table is used for each difficulty so that selecting a
+            # category takes the same time however many categories there are.
+            self.__categories = {}
+            for difficulty in ("easy", "medium", "hard"):
+                weights = {category: weight
+                           for category, weight in categories.items()
+                           if self.__available[(category, difficulty)] != 0}
+                if not weights:
+                    raise ValueError(f"No {difficulty} questions available "
+                                     f"for the categories {list(categories)}")
+                self.__categories[difficulty] = AliasTable(weights)
+            # To increase the question difficulty during the game questions
+            # are stored according to their category and difficulty. Each
+            # pool is a list of Question objects that is filled independently
+            # from the others when it is empty. The first request of each
+            # pool also retrieves the spare questions, which would otherwise
+            # need a second request right after the plan emptied the pool.
+            self.__pools = {}
+            for category in categories:
+                for difficulty in ("easy", "medium", "hard"):
+                    self.__pools[(category, difficulty)] = []
+                    if self.__available[(category, difficulty)] != 0:
+                        self.__refill(category, difficulty,
+                                      pool_size + spares)
+
+            # The whole game is planned in advance: For each round a category
+            # is selected and a question is taken from its pool. Because the
+            # plan is fixed the next question is known while the player still
+            # thinks about the current one (see peek_question).
+            self.__plan = [self.__draw(round_difficulty(game_round))
+                           for game_round in range(1, 16)]
+            # The labels of opentdb.com only roughly tell how hard a question
+            # is. With calibrated difficulties the drawn questions are sorted
+            # so that each question is at least as hard as the one before.
+            # Questions without a calibrated difficulty use the mean of their
+            # label. If the table does not know the label either, the
+            # question has no value on the same scale and keeps its planned
+            # round while the others are sorted among the remaining rounds.
+            if difficulties is not None:
+                values = [difficulties.get(question.get_key(), difficulty)
+                          for question, difficulty, _ in self.__plan]
+                ranked = [index for index, value in enumerate(values)
+                          if value is not None]
+                ordered = sorted(ranked, key=values.__getitem__)
+                plan = list(self.__plan)
+                for index, source_index in zip(ranked, ordered):
+                    self.__plan[index] = plan[source_index]
+            # The spare questions replace planned questions that were asked in
+            # another game (sharing the same SeenIndex) after this game was
+            # planned.
+            self.__spares = {difficulty: [self.__draw(difficulty)
+                                          for _ in range(spares)]
+                             for difficulty in ("easy", "medium", "hard")}
 
-        # This variable defines the possible winnings.
-        self.__winnings = ("50", "100", "200", "300", "500", "1'000", "2'000",
-                           "4'000", "8'000", "16'000", "32'000", "64'000",
-                           "125'000", "500'000", "1'000'000")
-        # This variable defines in which round a winnings safety net is
-        # created.
-        self.__secure_step = (5, 10)
+        # This variable defines the possible winnings (as integers) and in
+        # which rounds a winnings safety net is created.
+        self.__ladder = CLASSIC if ladder is None else ladder
 
         # This variable tracks which jokers are still available.
         self.__jokers = ["50:50 Joker", "Audience Joker", "Phone Joker"]
@@ -76,44 +163,226 @@ class Quiz():
         # game round.
         self.__current_payout = 0
 
+        # These variables store the current Status object and the functions
+        # that are notified when it changes.
+        self.__status = None
+        self.__observers = []
+        self.__publish()
+
     def status(self):
         """
         This method returns a representation of all private game variables
         because programs importing this class can not directly access these
-        variables.
+        variables. The returned Status object can not be changed and is only
+        replaced by a new one when the game variables change, so it can be
+        retrieved as often as needed.
         """
-        return {"winnings": self.__winnings,
-                "secure_step": self.__secure_step,
-                "jokers": self.__jokers,
-                "state": self.__state,
-                "round": self.__round,
-                "secured_payout": self.__secured_payout,
-                "current_payout": self.__current_payout}
+        return self.__status
 
-    def ask_question(self):
+    def deadline(self):
+        """
+        This method returns the time of time.monotonic() until which the
+        current question needs to be answered (or None if there is no time
+        limit or the game is over).
+        """
+        if self.__state != "playing":
+            return None
+        return self.__deadline
+
+    def expire(self, now=None):
+        """
+        This method ends the game with the timeout state if the time to
+        answer the current question is up at the given time of
+        time.monotonic() (by default now) and returns whether it did. It can
+        be called by a timer at the deadline and is also called before each
+        input is evaluated.
+        """
+        if now is None:
+            now = time.monotonic()
+        if (self.__state != "playing" or self.__deadline is None or
+                now < self.__deadline):
+            return False
+        self.__state = self.__timeout_state
+        self.__history[-1]["seconds"] = self.__round_seconds
+        self.__publish()
+        return True
+
+    def history(self):
+        """
+        This method returns a list with one dictionary for each asked
+        question: the round, the key, category and difficulty of the
+        question, the used jokers, the given answer (None after surrendering
+        or if it is not answered yet), whether it was correct and how many
+        seconds the player needed.
+        """
+        return [dict(entry, jokers=tuple(entry["jokers"]))
+                for entry in self.__history]
+
+    def planned_questions(self):
+        """
+        This method returns the planned question of each round as a tuple
+        with the Question object, its difficulty and its category. The
+        Question objects reveal the correct answers (see Question.as_dict),
+        so this should only be used by a server that sends the whole game to
+        a client (see wwm_bundle).
+        """
+        return [tuple(entry) for entry in self.__plan]
+
+    def subscribe(self, callback):
+        """
+        This method registers a function that is called with the new Status
+        object whenever the round, the state, the payouts or the available
+        jokers change.
+        """
+        self.__observers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        This method removes a function registered with subscribe.
         """
-        This method randomly selects a question according to the difficulty
-        of the current round and returns several values from the Question
-        methods.
-        """
-        if self.__round <= 5:
-            # random.randint(lower, upper) includes both boundaries so len()-1
-            # is used to find an existing index.
-            question_index = random.randint(0, len(self.__easy_questions)-1)
-            question_difficulty = "easy"
-            question = self.__easy_questions[question_index]
-        elif self.__round <= 10:
-            question_index = random.randint(0, len(self.__medium_questions)-1)
-            question_difficulty = "medium"
-            question = self.__medium_questions[question_index]
+        self.__observers.remove(callback)
+
+    def __publish(self):
+        """
+        This method creates a new Status object if any game variable changed
+        since the last one and notifies all registered functions about it.
+        """
+        # The player takes home the secured payout when he lost and the
+        # current payout otherwise.
+        if self.__state == "lost":
+            payout = self.__secured_payout
         else:
-            question_index = random.randint(0, len(self.__hard_questions)-1)
-            question_difficulty = "hard"
-            question = self.__hard_questions[question_index]
+            payout = self.__current_payout
+        values = {"ladder": self.__ladder,
+                  "winnings": self.__ladder.amounts,
+                  "secure_step": self.__ladder.secure_steps,
+                  "jokers": tuple(self.__jokers),
+                  "state": self.__state,
+                  "round": self.__round,
+                  "secured_payout": self.__secured_payout,
+                  "current_payout": self.__current_payout,
+                  "payout": payout}
+        if self.__status is not None and all(
+                self.__status[key] == value for key, value in values.items()):
+            return
+        version = 0 if self.__status is None else self.__status.version + 1
+        self.__status = Status(version=version, **values)
+        for callback in list(self.__observers):
+            callback(self.__status)
+
+    def __refill(self, category, difficulty, amount=None, attempts=3):
+        """
+        This method retrieves new questions for the pool of the given
+        category and difficulty from the source (amount questions or by
+        default the pool size). Questions that are already in a pool or were
+        recently asked are skipped. If all retrieved questions were skipped
+        it tries again and in the last attempt it also accepts questions that
+        were recently asked.
+        """
+        pool = self.__pools[(category, difficulty)]
+        if amount is None:
+            amount = self.__pool_size
+        available = self.__available[(category, difficulty)]
+        if available is not None:
+            amount = min(amount, available)
+        for attempt in range(attempts):
+            for question in self.__source.fetch(difficulty, amount,
+                                                category):
+                key = question_key(question["question"])
+                if key in self.__keys or (
+                        self.__seen is not None and key in self.__seen and
+                        attempt < attempts - 1):
+                    continue
+                self.__keys.add(key)
+                # For each question a new Question object is created and
+                # stored in the pool.
+                pool.append(Question(
+                    question["question"],
+                    question["correct_answer"],
+                    question["incorrect_answers"]))
+            if pool:
+                return
+        raise ValueError(f"No {difficulty} questions available for "
+                         f"category {category}")
+
+    def __draw(self, difficulty):
+        """
+        This method randomly selects a category according to the weights and
+        removes a random question with the given difficulty from its pool. It
+        returns the question, its difficulty and its category.
+        """
+        category = self.__categories[difficulty].sample()
+        # Each pool is refilled as soon as it is empty.
+        pool = self.__pools[(category, difficulty)]
+        if not pool:
+            self.__refill(category, difficulty)
+        # random.randrange(upper) excludes the upper boundary and therefore
+        # always returns an existing index. The last question of the pool is
+        # moved to the place of the selected one so that no other question
+        # needs to be moved.
+        index = random.randrange(len(pool))
+        question = pool[index]
+        pool[index] = pool[-1]
+        pool.pop()
+        return (question, difficulty, category)
+
+    def ask_question(self):
+        """
+        This method returns the planned question of the current round with
+        several values from the Question methods.
+        """
+        index = self.__round - 1
+        question, question_difficulty, question_category = self.__plan[index]
+        # If the planned question was asked in another game in the meantime
+        # it is replaced by a spare question of the same difficulty that was
+        # not asked yet (if there is one).
+        if self.__seen is not None and question.get_key() in self.__seen:
+            spares = self.__spares[question_difficulty]
+            for spare_index, spare in enumerate(spares):
+                if spare[0].get_key() not in self.__seen:
+                    self.__plan[index] = spares.pop(spare_index)
+                    question, question_difficulty, question_category = \
+                        self.__plan[index]
+                    break
+        # The question is remembered so that it is skipped in the next games.
+        if self.__seen is not None:
+            self.__seen.add(question.get_key())
+        self.__asked_at = time.monotonic()
+        # A new entry of the history is started for the question. If the
+        # question of the same round is asked again its entry is replaced
+        # but the time limit of the round does not start again.
+        if self.__history and self.__history[-1]["round"] == self.__round:
+            self.__history.pop()
+        elif self.__round_seconds is not None:
+            self.__deadline = self.__asked_at + self.__round_seconds
+        self.__history.append({"round": self.__round,
+                               "key": question.get_key(),
+                               "category": question_category,
+                               "difficulty": question_difficulty,
+                               "jokers": [],
+                               "answer": None,
+                               "correct": None,
+                               "seconds": None})
 
         # This returns a tuple to properly identify the question, the question,
         # the possible answers and a place holder variable None.
-        return ((question_index, question_difficulty),
+        return ((index, question_difficulty, question_category),
+                question.get_question(),
+                question.get_answers(),
+                None)
+
+    def peek_question(self):
+        """
+        This method returns the planned question of the next round in the
+        same format as ask_question (or None if there is no next round) so
+        that it can be prepared before it is asked. It does not change the
+        game.
+        """
+        if self.__state != "playing" or self.__round == 15:
+            return None
+        question, question_difficulty, question_category = \
+            self.__plan[self.__round]
+        return ((self.__round, question_difficulty, question_category),
                 question.get_question(),
                 question.get_answers(),
                 None)
@@ -125,70 +394,209 @@ class Quiz():
         surrender or use jokers. Otherwise it compares the player's input to
         the correct answer and changes the game state accordingly.
         """
-        # The question with the question index is retrieved from
-        # the list with the question difficulty (both in questionobj).
-        if questionobj[1] == "easy":
-            question = self.__easy_questions[questionobj[0]]
-        elif questionobj[1] == "medium":
-            question = self.__medium_questions[questionobj[0]]
-        else:
-            question = self.__hard_questions[questionobj[0]]
+        # The question is retrieved from the plan with the index of its round
+        # (stored in questionobj).
+        question = self.__plan[questionobj[0]][0]
+        # Inputs after the time limit are not accepted and end the game.
+        if self.expire():
+            return None
+        # Surrendering or answering a question returns None.
+        result = None
 
         # If the player wants to surrender the state is changed accordingly.
         if given_input == "__surrender":
             self.__state = "surrendered"
+            self.__history[-1]["seconds"] = time.monotonic() - self.__asked_at
         # If the player wants to use a joker, it is removed from the
         # available jokers and the corresponding Question method is called.
-        # Then the updated values are returned.
+        # Then the updated values are returned after publishing the new
+        # status.
         elif given_input == "__joker_50:50":
             self.__jokers.remove("50:50 Joker")
+            self.__history[-1]["jokers"].append("50:50")
             question.fifty_fifty()
-            return ((questionobj[0], questionobj[1]),
-                    question.get_question(),
-                    question.get_answers(),
-                    "fifty-fifty")
+            result = (questionobj,
+                      question.get_question(),
+                      question.get_answers(),
+                      "fifty-fifty")
         elif given_input == "__joker_audience":
             self.__jokers.remove("Audience Joker")
-            audience_result = question.audience()
-            return ((questionobj[0], questionobj[1]),
-                    question.get_question(),
-                    question.get_answers(),
-                    audience_result)
+            self.__history[-1]["jokers"].append("audience")
+            # If enough players answered this question the audience votes
+            # like they did.
+            distribution = None
+            if self.__stats is not None:
+                distribution = self.__stats.distribution(question.get_key())
+            audience_result = question.audience(distribution)
+            result = (questionobj,
+                      question.get_question(),
+                      question.get_answers(),
+                      audience_result)
         elif given_input == "__joker_phone":
             self.__jokers.remove("Phone Joker")
+            self.__history[-1]["jokers"].append("phone")
             phone_result = question.phone()
-            return ((questionobj[0], questionobj[1]),
-                    question.get_question(),
-                    question.get_answers(),
-                    phone_result)
-        # If the player doesn't want to surrender nor wants to use a joker, the
-        # question is removed from the question list.
+            result = (questionobj,
+                      question.get_question(),
+                      question.get_answers(),
+                      phone_result)
+        # If the player doesn't want to surrender nor wants to use a joker the
+        # answer is evaluated.
         else:
-            if questionobj[1] == "easy":
-                question = self.__easy_questions.pop(questionobj[0])
-            elif questionobj[1] == "medium":
-                question = self.__medium_questions.pop(questionobj[0])
-            else:
-                question = self.__hard_questions.pop(questionobj[0])
+            seconds = time.monotonic() - self.__asked_at
+            self.__history[-1].update(answer=given_input,
+                                      correct=given_input == question,
+                                      seconds=seconds)
+            # The answer is added to the statistics of the question.
+            if self.__stats is not None:
+                self.__stats.record(question.get_key(), given_input,
+                                    given_input == question, seconds)
             # Then it is checked whether the given answer is correct or false.
             if given_input == question:
                 # If it is correct and the player is in the last round he wins
                 # the game and the state and current payout are updated.
                 if self.__round == 15:
                     self.__state = "won"
-                    self.__current_payout = self.__winnings[self.__round - 1]
+                    self.__current_payout = \
+                        self.__ladder.amounts[self.__round - 1]
                 # If it is correct but the player is not in the last round the
                 # current payout is updated. If he is in a round with a
                 # winnings safety net the secured payout is also updated.
                 # Finally the variable tracking the round is updated.
                 else:
-                    if self.__round in self.__secure_step:
-                        self.__secured_payout = self.__winnings[self.__round-1]
-                    self.__current_payout = self.__winnings[self.__round - 1]
+                    amount = self.__ladder.amounts[self.__round - 1]
+                    if self.__round in self.__ladder.secure_steps:
+                        self.__secured_payout = amount
+                    self.__current_payout = amount
                     self.__round += 1
             # If the answer is false the player loses and the state is updated.
+            # The question is added to the practice deck of the player.
             else:
                 self.__state = "lost"
+                if self.__practice is not None:
+                    self.__practice.add(question)
+
+        self.__publish()
+        return result
+
+
+class Status():
+    """
+    This class implements a snapshot of all game variables of a Quiz object.
+    Its values can be read as attributes or like the values of a dictionary
+    (e.g. status["round"]) but not changed. The version increases by one with
+    each new snapshot of the same game.
+    """
+    __slots__ = ("version", "ladder", "winnings", "secure_step", "jokers",
+                 "state", "round", "secured_payout", "current_payout",
+                 "payout")
+
+    def __init__(self, **values):
+        """
+        This method initializes a new snapshot with the given values.
+        """
+        for key in self.__slots__:
+            object.__setattr__(self, key, values[key])
+
+    def __setattr__(self, key, value):
+        """
+        This method prevents changing the values of a snapshot.
+        """
+        raise AttributeError("Status objects can not be changed")
+
+    def __delattr__(self, key):
+        """
+        This method prevents deleting the values of a snapshot.
+        """
+        raise AttributeError("Status objects can not be changed")
+
+    def __getitem__(self, key):
+        """
+        This method defines the behavior of "object[key]" so that a snapshot
+        can be used like the dictionary that was returned before.
+        """
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __repr__(self):
+        """
+        This method returns a readable representation of the snapshot.
+        """
+        return "Status(" + ", ".join(
+            f"{key}={getattr(self, key)!r}" for key in self.__slots__) + ")"
+
+
+def round_difficulty(game_round):
+    """
+    This function returns the difficulty of the questions in the given round
+    so that the questions get harder during the game.
+    """
+    if game_round <= 5:
+        return "easy"
+    if game_round <= 10:
+        return "medium"
+    return "hard"
+
+
+def question_key(text):
+    """
+    This function returns a 64 bit integer that identifies a question. The
+    text is normalized first (html escape characters, upper case letters,
+    punctuation and whitespace are ignored) so that slightly different
+    versions of the same question get the same key.
+    """
+    normalized = " ".join(re.findall(r"\w+", html.unescape(text).casefold()))
+    digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=8)
+    return int.from_bytes(digest.digest(), "big")
+
+
+class AliasTable():
+    """
+    This class selects keys randomly according to their weights. It uses the
+    alias method: The weights are distributed once over equally likely slots
+    which contain at most two keys. Each selection then only needs one random
+    slot and one random number however many keys there are.
+    """
+    def __init__(self, weights):
+        """
+        This method initializes the table for the given dictionary that maps
+        each key to its weight.
+        """
+        if not weights or min(weights.values()) <= 0:
+            raise ValueError("All weights need to be positive")
+        self.__keys = list(weights)
+        count = len(self.__keys)
+        total = sum(weights.values())
+        # Each weight is scaled so that the average weight is 1 which is the
+        # size of a slot.
+        scaled = [weight * count / total for weight in weights.values()]
+        # For each slot this stores the probability of its own key and the
+        # key (alias) that fills the rest of the slot.
+        self.__probability = [1.0] * count
+        self.__alias = list(range(count))
+        small = [index for index, value in enumerate(scaled) if value < 1]
+        large = [index for index, value in enumerate(scaled) if value >= 1]
+        # Each slot with a small weight is filled up with a part of a large
+        # weight which then might become small itself.
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.__probability[less] = scaled[less]
+            self.__alias[less] = more
+            scaled[more] += scaled[less] - 1
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+
+    def sample(self):
+        """
+        This method returns a randomly selected key.
+        """
+        index = random.randrange(len(self.__keys))
+        if random.random() < self.__probability[index]:
+            return self.__keys[index]
+        return self.__keys[self.__alias[index]]
 
 
 class Question:
@@ -220,6 +628,27 @@ class Question:
         """
         return self.__question
 
+    def get_key(self):
+        """
+        This method returns the key that identifies this question (see
+        question_key).
+        """
+        return question_key(self.__question)
+
+    def as_dict(self):
+        """
+        This method returns the question in the format of the opentdb.com api
+        so that it can be stored (e.g. to practice it later). It is the only
+        method that reveals the correct answer and should not be used while
+        the question is played.
+        """
+        return {"question": self.__question,
+                "correct_answer": self.__correct_answer,
+                "incorrect_answers": [
+                    answer[7:] if answer.startswith("DELETED") else answer
+                    for answer in self.__all_answers
+                    if answer != self.__correct_answer]}
+
     def get_answers(self):
         """
         This method is a getter for the private variable __all_answers.
@@ -261,13 +690,29 @@ class Question:
                 previous_random_number = random_number
                 counter += 1
 
-    def audience(self):
+    def audience(self, distribution=None):
         """
         This method implements an "audience" joker on an object. This means
         that it returns probabilities whether this answer is correct depending
         on randomness. Usually the answer with the highest percentage is
-        correct but not always.
+        correct but not always. If a distribution (how often real players
+        chose each answer) is given the audience votes accordingly.
         """
+        if distribution:
+            # Only the answers that were not deleted through the 50:50 joker
+            # get votes.
+            answers = [answer for answer in self.__all_answers
+                       if not answer.startswith("DELETED")]
+            # Each of the 100 people in the audience chooses an answer as
+            # often as real players did. One is added to each count so that
+            # every answer can get votes.
+            votes = random.choices(
+                answers,
+                weights=[distribution.get(answer, 0) + 1
+                         for answer in answers],
+                k=100)
+            return [(answer, votes.count(answer)) for answer in answers]
+
         # The percentages for the false answers are created randomly.
         false_percent = [random.randint(3, 12),
                          random.randint(5, 20),
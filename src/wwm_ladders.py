@@ -0,0 +1,268 @@
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import random
+import threading
+
+
+###############################################################################
+# This code defines the payout ladders of the game. A ladder stores the amount
+# of each of the 15 rounds as integers so that payouts can be added and
+# compared, and the rounds with a safety net. The labels that are displayed
+# (e.g. "1'000") are formatted once when the ladder is created. Several
+# ladders can be loaded from a json file and played as variants of an
+# experiment: Each game is assigned to one variant and the results of the
+# games of each variant (number of games, mean payout and how many games
+# reached each round) are updated with each finished game, so that ladders can
+# be compared without reading all games again.
+###############################################################################
+class Ladder():
+    """
+    This class stores the amounts and safety nets of one payout ladder.
+    """
+    def __init__(self, name, amounts, secure_steps=(5, 10)):
+        """
+        This method initializes a ladder with the given name, the amounts of
+        the 15 rounds (increasing integers) and the rounds that create a
+        safety net.
+        """
+        amounts = tuple(int(amount) for amount in amounts)
+        if len(amounts) != 15:
+            raise ValueError("A ladder needs an amount for each of the 15 "
+                             "rounds")
+        if any(amount <= previous for previous, amount in
+               zip((0,) + amounts, amounts)):
+            raise ValueError("The amounts of a ladder need to increase")
+        secure_steps = tuple(sorted(int(step) for step in secure_steps))
+        if any(not 1 <= step < 15 for step in secure_steps):
+            raise ValueError("The safety nets need to be in the rounds 1 to "
+                             "14")
+        self.name = name
+        self.amounts = amounts
+        self.secure_steps = secure_steps
+        # The labels of all amounts (and of no payout) are formatted once.
+        self.__labels = {amount: format_amount(amount)
+                         for amount in (0,) + amounts}
+        self.labels = tuple(self.__labels[amount] for amount in amounts)
+
+    def label(self, amount):
+        """
+        This method returns the label of the given amount.
+        """
+        label = self.__labels.get(amount)
+        return format_amount(amount) if label is None else label
+
+    def secured_round(self, game_round):
+        """
+        This method returns the highest round below the given round that
+        creates a safety net (or None if the player did not reach one).
+        """
+        index = bisect.bisect_left(self.secure_steps, game_round)
+        return self.secure_steps[index - 1] if index else None
+
+    def as_dict(self):
+        """
+        This method returns the ladder in the format of the json file (see
+        load_ladders) without its name.
+        """
+        return {"amounts": list(self.amounts),
+                "secure_steps": list(self.secure_steps)}
+
+    def __repr__(self):
+        """
+        This method returns a readable representation of the ladder.
+        """
+        return f"Ladder({self.name!r})"
+
+
+def format_amount(amount):
+    """
+    This function formats an amount with apostrophes as thousands separator
+    (e.g. 1000 as "1'000").
+    """
+    return f"{amount:,}".replace(",", "'")
+
+
+# The ladder of the original game.
+CLASSIC = Ladder("classic", (50, 100, 200, 300, 500, 1000, 2000, 4000, 8000,
+                             16000, 32000, 64000, 125000, 500000, 1000000))
+
+
+def load_ladders(path):
+    """
+    This function loads the ladders from the json file under the given path.
+    It contains an object with an object for each ladder with its amounts,
+    its safety nets (by default 5 and 10) and the weight with which games
+    are assigned to it (by default 1), e.g.
+    {"classic": {"amounts": [50, 100, ...], "secure_steps": [5, 10]}}.
+    It returns a dictionary with the ladders and one with the weights.
+    """
+    with open(path, encoding="utf-8") as file:
+        config = json.load(file)
+    ladders = {}
+    weights = {}
+    for name, values in config.items():
+        ladders[name] = Ladder(name, values["amounts"],
+                               values.get("secure_steps", (5, 10)))
+        weights[name] = float(values.get("weight", 1))
+    return ladders, weights
+
+
+class LadderVariants():
+    """
+    This class assigns games to the variants of a ladder experiment and
+    keeps the results of the finished games of each variant.
+    """
+    def __init__(self, ladders, weights=None, path=None):
+        """
+        This method initializes the experiment with the given ladders (a
+        dictionary with the name of each ladder) and the weights with which
+        games are assigned to them (by default all the same). If a path is
+        given the results are loaded from this file (if it exists) and the
+        save method writes them back to it.
+        """
+        if weights is None:
+            weights = {name: 1 for name in ladders}
+        self.__ladders = dict(ladders)
+        self.__path = path
+        # The names and cumulative weights of the variants to look up the
+        # variant of a number between 0 and 1.
+        self.__names = sorted(name for name in ladders if weights[name] > 0)
+        if not self.__names:
+            raise ValueError("At least one ladder needs a positive weight")
+        total = sum(weights[name] for name in self.__names)
+        self.__bounds = []
+        cumulative = 0
+        for name in self.__names:
+            cumulative += weights[name] / total
+            self.__bounds.append(cumulative)
+        # The results of each variant: The number of games, the sum of the
+        # payouts, the mean and the sum of squared differences from the mean
+        # of the payouts (updated with Welford's method) and how many games
+        # ended in each round. How many games reached a round is calculated
+        # from the last value only when the results are requested so that
+        # recording a game does not depend on the number of rounds.
+        self.__results = {name: self.__empty() for name in ladders}
+        # The results can be updated by games running in different threads.
+        self.__lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for name, results in json.load(file).items():
+                    if name in self.__results:
+                        self.__results[name] = results
+
+    @staticmethod
+    def __empty():
+        """
+        This method returns the results of a variant without games.
+        """
+        return {"games": 0, "payout_sum": 0, "payout_mean": 0.0,
+                "payout_m2": 0.0, "won": 0, "final_rounds": [0] * 15}
+
+    @classmethod
+    def from_file(cls, config, path=None):
+        """
+        This method creates an experiment with the ladders of the given json
+        file (see load_ladders). The results are stored under path.
+        """
+        return cls(*load_ladders(config), path=path)
+
+    def ladders(self):
+        """
+        This method returns the dictionary of all ladders.
+        """
+        return dict(self.__ladders)
+
+    def assign(self, player=None):
+        """
+        This method returns the ladder for a new game. A player always gets
+        the same variant (as long as the variants stay the same) because the
+        variant is chosen with a hash of the name. Games without a player
+        are assigned randomly.
+        """
+        if player is None:
+            position = random.random()
+        else:
+            digest = hashlib.sha256(
+                ("\0".join(self.__names) + "\0" + player).encode()).digest()
+            position = int.from_bytes(digest[:8], "big") / 2 ** 64
+        index = min(bisect.bisect_right(self.__bounds, position),
+                    len(self.__names) - 1)
+        return self.__ladders[self.__names[index]]
+
+    def record(self, status):
+        """
+        This method adds the result of a finished game (given by its status
+        from Quiz.status) to the results of its variant.
+        """
+        payout = status["payout"]
+        with self.__lock:
+            results = self.__results.setdefault(status["ladder"].name,
+                                                self.__empty())
+            results["games"] += 1
+            results["payout_sum"] += payout
+            delta = payout - results["payout_mean"]
+            results["payout_mean"] += delta / results["games"]
+            results["payout_m2"] += delta * (payout - results["payout_mean"])
+            results["won"] += status["state"] == "won"
+            results["final_rounds"][status["round"] - 1] += 1
+
+    def summary(self):
+        """
+        This method returns a dictionary with the results of each variant:
+        the number of games, the mean payout, the variance of the payouts,
+        the share of won games and the share of games that reached each
+        round.
+        """
+        summary = {}
+        with self.__lock:
+            for name, results in self.__results.items():
+                games = results["games"]
+                reached = []
+                remaining = games
+                for ended in results["final_rounds"]:
+                    reached.append(remaining / games if games else 0.0)
+                    remaining -= ended
+                summary[name] = {
+                    "games": games,
+                    "mean_payout": results["payout_mean"],
+                    "payout_variance": results["payout_m2"] / (games - 1)
+                    if games > 1 else 0.0,
+                    "win_rate": results["won"] / games if games else 0.0,
+                    "reach_rate": reached}
+        return summary
+
+    def save(self):
+        """
+        This method writes the results of all variants to the file given
+        when the experiment was created.
+        """
+        if self.__path is None:
+            return
+        with self.__lock:
+            data = json.dumps(self.__results)
+        # The results are first written to a temporary file and then renamed
+        # so that the file is never left half written.
+        temporary_path = f"{self.__path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(temporary_path, self.__path)
+
+
+# This prints the results of a ladder experiment when the file gets executed
+# by the python interpreter.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Shows the results of the ladder variants.")
+    parser.add_argument("config", help="json file with the ladders")
+    parser.add_argument("results", help="file with the results of the games")
+    args = parser.parse_args()
+    variants = LadderVariants.from_file(args.config, args.results)
+    for name, results in sorted(variants.summary().items()):
+        print(f"{name:<20} {results['games']:>8} games   mean payout "
+              f"{results['mean_payout']:>12,.0f}   won "
+              f"{results['win_rate']:6.1%}")
+        print(" " * 20 + " reached " + " ".join(
+            f"{rate:4.0%}" for rate in results["reach_rate"]))
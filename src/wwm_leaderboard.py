@@ -0,0 +1,208 @@
+import argparse
+import datetime
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+
+
+###############################################################################
+# This code stores the result of every finished game in a local sqlite
+# database. The database has indexes for the payout, the day and the player so
+# that the best games overall, of a day or of a player can be found without
+# reading all games. New results are written by a background thread in
+# batches so that recording a result never makes the game wait.
+###############################################################################
+# The seconds a connection waits for another process (e.g. another game of
+# the fork server) that is writing to the same database.
+LOCK_TIMEOUT = 30
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    day TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    state TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    payout INTEGER NOT NULL,
+    jokers TEXT NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_payout ON games (payout DESC);
+CREATE INDEX IF NOT EXISTS games_by_day ON games (day, payout DESC);
+CREATE INDEX IF NOT EXISTS games_by_player ON games (player, payout DESC);
+"""
+# The order of the columns when a game is inserted or returned.
+COLUMNS = ("player", "day", "finished_at", "state", "round", "payout",
+           "jokers", "duration")
+# All jokers a player can use in a game.
+JOKERS = ("50:50 Joker", "Audience Joker", "Phone Joker")
+
+
+def game_record(status, player, duration, finished_at=None):
+    """
+    This function creates the record of a finished game from its status, the
+    name of the player and the duration of the game in seconds. The name of
+    the payout ladder is part of the record but not stored in the database.
+    """
+    if finished_at is None:
+        finished_at = time.time()
+    return {"player": player,
+            "day": datetime.date.fromtimestamp(finished_at).isoformat(),
+            "finished_at": finished_at,
+            "state": status["state"],
+            "round": status["round"],
+            "payout": status["payout"],
+            "ladder": status["ladder"].name,
+            "jokers": ",".join(joker for joker in JOKERS
+                               if joker not in status["jokers"]),
+            "duration": duration}
+
+
+class Leaderboard():
+    """
+    This class records finished games in the database and queries the best
+    games.
+    """
+    def __init__(self, path, batch_size=500):
+        """
+        This method opens (or creates) the database under the given path and
+        starts the thread that writes new games in batches of up to
+        batch_size games.
+        """
+        self.__path = path
+        self.__batch_size = batch_size
+        # The write-ahead log allows reading while the background thread is
+        # writing.
+        self.__connection = sqlite3.connect(path, timeout=LOCK_TIMEOUT,
+                                            check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.executescript(SCHEMA)
+        # The connection for the queries can be used by several threads but
+        # only by one at a time.
+        self.__lock = threading.Lock()
+        # New games are passed to the background thread with a queue.
+        self.__games = queue.Queue()
+        # This variable stores the first error of the background thread until
+        # it is raised by flush or close.
+        self.__error = None
+        self.__writer = threading.Thread(target=self.__write, daemon=True)
+        self.__writer.start()
+
+    def add(self, record):
+        """
+        This method records a finished game (see game_record). It returns
+        immediately and the game is written in the background.
+        """
+        self.__games.put(record)
+
+    def __write(self):
+        """
+        This method is executed by the background thread. It waits for new
+        games and writes all games that are waiting (up to the batch size) in
+        one transaction. If a batch can not be written it is dropped and the
+        error is reported, so the thread keeps running and flush and close
+        never wait forever.
+        """
+        connection = sqlite3.connect(self.__path, timeout=LOCK_TIMEOUT)
+        running = True
+        while running:
+            batch = [self.__games.get()]
+            while len(batch) < self.__batch_size:
+                try:
+                    batch.append(self.__games.get_nowait())
+                except queue.Empty:
+                    break
+            # None is used to stop the background thread.
+            if None in batch:
+                running = False
+            records = [record for record in batch if record is not None]
+            try:
+                with connection:
+                    connection.executemany(
+                        f"INSERT INTO games ({', '.join(COLUMNS)}) VALUES "
+                        f"({', '.join('?' * len(COLUMNS))})",
+                        [tuple(record[column] for column in COLUMNS)
+                         for record in records])
+            # E.g. the database stayed locked or the disk is full. Any error
+            # is caught because the thread must keep running.
+            except Exception as error:
+                traceback.print_exception(type(error), error,
+                                          error.__traceback__)
+                if self.__error is None:
+                    self.__error = error
+            finally:
+                for _ in batch:
+                    self.__games.task_done()
+        connection.close()
+
+    def __raise_error(self):
+        """
+        This method raises the error of the background thread (if there was
+        one) once.
+        """
+        error, self.__error = self.__error, None
+        if error is not None:
+            raise error
+
+    def flush(self):
+        """
+        This method waits until all recorded games are written. It raises
+        the error if games could not be written.
+        """
+        self.__games.join()
+        self.__raise_error()
+
+    def top(self, k=10, day=None, player=None):
+        """
+        This method returns the k games with the highest payout (overall, of
+        the given day in the format YYYY-MM-DD or of the given player) as
+        dictionaries. Each query is answered from one of the indexes and only
+        reads k games.
+        """
+        conditions = []
+        parameters = []
+        if day is not None:
+            conditions.append("day = ?")
+            parameters.append(day)
+        if player is not None:
+            conditions.append("player = ?")
+            parameters.append(player)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.__lock:
+            rows = self.__connection.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM games {where} "
+                f"ORDER BY payout DESC LIMIT ?", parameters + [k]).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def close(self):
+        """
+        This method writes all recorded games, stops the background thread
+        and closes the database. It raises the error if games could not be
+        written.
+        """
+        self.__games.put(None)
+        self.__writer.join()
+        self.__connection.close()
+        self.__raise_error()
+
+
+# This prints the best games when the file gets executed by the python
+# interpreter.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Shows the best games of a leaderboard.")
+    parser.add_argument("database", help="leaderboard database")
+    parser.add_argument("--top", type=int, default=10,
+                        help="number of games to show")
+    parser.add_argument("--day", help="only show games of this day "
+                                      "(YYYY-MM-DD)")
+    parser.add_argument("--player", help="only show games of this player")
+    args = parser.parse_args()
+    leaderboard = Leaderboard(args.database)
+    for rank, game in enumerate(
+            leaderboard.top(args.top, args.day, args.player), 1):
+        print(f"{rank:>3}. {game['player']:<20} {game['payout']:>9} "
+              f"round {game['round']:>2} {game['state']:<12} {game['day']}")
+    leaderboard.close()
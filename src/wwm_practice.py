@@ -0,0 +1,298 @@
+import heapq
+import json
+import os
+import threading
+import time
+
+from wwm_gamelogic import Question, question_key
+
+
+###############################################################################
+# This code implements a practice mode for the questions a player answered
+# incorrectly. The missed questions of each player are repeated with growing
+# intervals (spaced repetition): A question that is answered correctly again
+# is repeated after longer and longer intervals until it is learned, and a
+# question that is answered incorrectly starts again with the shortest
+# interval. The questions of each player are kept in a heap ordered by the
+# time they are due, so the due questions are found in logarithmic time even
+# for players with thousands of missed questions.
+###############################################################################
+# The intervals in seconds after which a question is repeated. A question is
+# learned once it was answered correctly after the last interval.
+INTERVALS = (10 * 60, 24 * 3600, 3 * 24 * 3600, 7 * 24 * 3600,
+             21 * 24 * 3600, 60 * 24 * 3600)
+# A due question that was taken for a practice game is due again after this
+# many seconds if it is never answered (e.g. because the game was quit).
+LEASE = 10 * 60
+
+
+class PracticeDeck():
+    """
+    This class stores the missed questions of all players. The questions of
+    one player are accessed through the PlayerDeck returned by player.
+    """
+    def __init__(self, path=None):
+        """
+        This method initializes a new deck. If a path is given the questions
+        are loaded from this file (if it exists) and the save method writes
+        them back to it.
+        """
+        self.__path = path
+        self.__players = {}
+        # The deck can be shared by games running in different threads.
+        self.__lock = threading.RLock()
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for name, items in json.load(file).items():
+                    self.__players[name] = PlayerDeck(self.__lock, items)
+
+    def player(self, name):
+        """
+        This method returns the PlayerDeck with the missed questions of the
+        player with the given name.
+        """
+        with self.__lock:
+            if name not in self.__players:
+                self.__players[name] = PlayerDeck(self.__lock)
+            return self.__players[name]
+
+    def save(self):
+        """
+        This method writes the questions of all players to the file given
+        when the deck was created.
+        """
+        if self.__path is None:
+            return
+        with self.__lock:
+            data = {name: deck.items()
+                    for name, deck in self.__players.items()}
+        # The questions are first written to a temporary file and then
+        # renamed so that the file is never left half written.
+        temporary_path = f"{self.__path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporary_path, self.__path)
+
+
+class PlayerDeck():
+    """
+    This class stores the missed questions of one player. It can be passed to
+    the Quiz class (practice) which adds each incorrectly answered question.
+    """
+    def __init__(self, lock, items=()):
+        """
+        This method initializes the deck with the given items (dictionaries
+        with the question in the format of the opentdb.com api, the step of
+        its interval and the time it is due). The lock is shared with the
+        PracticeDeck.
+        """
+        self.__lock = lock
+        # The items are stored by the key of their question. The heap contains
+        # a (due, key) tuple for each item. When an item gets a new due time a
+        # new tuple is added and the old one is skipped later because its
+        # time does not match the item anymore.
+        self.__items = {}
+        self.__heap = []
+        for item in items:
+            key = question_key(item["question"]["question"])
+            self.__items[key] = item
+            self.__heap.append((item["due"], key))
+        heapq.heapify(self.__heap)
+        # The number of due items is kept up to date with a second heap that
+        # only contains the items that were not yet counted as due and the
+        # keys of the counted items, so that the due items do not need to be
+        # counted again each time. The heap is changed by take, the second
+        # heap only by due_count.
+        self.__pending = list(self.__heap)
+        self.__counted = set()
+
+    def __len__(self):
+        """
+        This method returns the number of questions in the deck.
+        """
+        return len(self.__items)
+
+    def items(self):
+        """
+        This method returns a list of all items (see __init__).
+        """
+        with self.__lock:
+            return [dict(item) for item in self.__items.values()]
+
+    def __schedule(self, key, due):
+        """
+        This method sets the time the item with the given key is due. If the
+        heap contains too many outdated tuples it is rebuilt.
+        """
+        self.__items[key]["due"] = due
+        heapq.heappush(self.__heap, (due, key))
+        if len(self.__heap) > 2 * len(self.__items) + 16:
+            self.__heap = [(item["due"], key)
+                           for key, item in self.__items.items()]
+            heapq.heapify(self.__heap)
+        # The item is counted again once its new time is reached.
+        self.__counted.discard(key)
+        heapq.heappush(self.__pending, (due, key))
+        if len(self.__pending) > 2 * len(self.__items) + 16:
+            self.__pending = [(item["due"], key)
+                              for key, item in self.__items.items()
+                              if key not in self.__counted]
+            heapq.heapify(self.__pending)
+
+    def add(self, question, now=None):
+        """
+        This method adds a missed question (a Question object) to the deck.
+        If it is already in the deck it starts again with the shortest
+        interval.
+        """
+        if now is None:
+            now = time.time()
+        with self.__lock:
+            key = question.get_key()
+            if key not in self.__items:
+                self.__items[key] = {"question": question.as_dict()}
+            self.__items[key]["step"] = 0
+            self.__schedule(key, now + INTERVALS[0])
+
+    def due_count(self, now=None):
+        """
+        This method returns how many questions are due. Only the questions
+        that became due since the last call are counted, each in logarithmic
+        time.
+        """
+        if now is None:
+            now = time.time()
+        with self.__lock:
+            while self.__pending and self.__pending[0][0] <= now:
+                due, key = heapq.heappop(self.__pending)
+                item = self.__items.get(key)
+                # Skips tuples of removed items and outdated tuples.
+                if item is not None and item["due"] == due:
+                    self.__counted.add(key)
+            return len(self.__counted)
+
+    def take(self, amount, now=None):
+        """
+        This method returns up to the given amount of due questions as new
+        Question objects, the question that is due the longest first. The
+        questions are due again after a while if they are not reviewed.
+        """
+        if now is None:
+            now = time.time()
+        questions = []
+        with self.__lock:
+            while self.__heap and len(questions) < amount:
+                due, key = self.__heap[0]
+                if due > now:
+                    break
+                heapq.heappop(self.__heap)
+                item = self.__items.get(key)
+                # Skips tuples of removed items and outdated tuples.
+                if item is None or item["due"] != due:
+                    continue
+                self.__schedule(key, now + LEASE)
+                data = item["question"]
+                questions.append(Question(data["question"],
+                                          data["correct_answer"],
+                                          data["incorrect_answers"]))
+        return questions
+
+    def review(self, question, correct, now=None):
+        """
+        This method records whether a question of the deck was answered
+        correctly. It is then due after the next interval (or the shortest
+        one if the answer was incorrect) or removed if it is learned.
+        """
+        if now is None:
+            now = time.time()
+        with self.__lock:
+            key = question.get_key()
+            item = self.__items.get(key)
+            if item is None:
+                return
+            item["step"] = item["step"] + 1 if correct else 0
+            if item["step"] >= len(INTERVALS):
+                del self.__items[key]
+                self.__counted.discard(key)
+            else:
+                self.__schedule(key, now + INTERVALS[item["step"]])
+
+
+class PracticeSession():
+    """
+    This class implements a practice game with the due questions of a player.
+    Like in a normal game each joker can be used once, but an incorrect
+    answer does not end the game and there are no winnings.
+    """
+    def __init__(self, deck, size=10):
+        """
+        This method starts a practice game with up to size due questions of
+        the given PlayerDeck.
+        """
+        self.__deck = deck
+        self.__questions = deck.take(size)
+        self.__jokers = ["50:50 Joker", "Audience Joker", "Phone Joker"]
+        # This variable tracks which question is asked.
+        self.__index = 0
+        self.__correct = 0
+
+    def status(self):
+        """
+        This method returns a dictionary with the number of questions, the
+        number of the current question, the number of correct answers, the
+        available jokers and whether the practice game is over.
+        """
+        return {"total": len(self.__questions),
+                "round": self.__index + 1,
+                "correct": self.__correct,
+                "jokers": tuple(self.__jokers),
+                "state": "playing" if self.__index < len(self.__questions)
+                else "finished"}
+
+    def deadline(self):
+        """
+        This method returns None because practice games have no time limit.
+        """
+        return None
+
+    def ask_question(self):
+        """
+        This method returns the current question in the same format as
+        Quiz.ask_question.
+        """
+        question = self.__questions[self.__index]
+        return (self.__index, question.get_question(),
+                question.get_answers(), None)
+
+    def evaluate_answer(self, questionobj, given_input):
+        """
+        This method evaluates the player's input like Quiz.evaluate_answer:
+        Using a joker returns the updated values of the question and
+        answering returns None. The answer is reviewed in the deck and the
+        next question is asked.
+        """
+        question = self.__questions[questionobj]
+        for joker, name in (("__joker_50:50", "50:50 Joker"),
+                            ("__joker_audience", "Audience Joker"),
+                            ("__joker_phone", "Phone Joker")):
+            if given_input == joker:
+                self.__jokers.remove(name)
+                if name == "50:50 Joker":
+                    question.fifty_fifty()
+                    tips = "fifty-fifty"
+                elif name == "Audience Joker":
+                    tips = question.audience()
+                else:
+                    tips = question.phone()
+                return (questionobj, question.get_question(),
+                        question.get_answers(), tips)
+        correct = given_input == question
+        self.__deck.review(question, correct)
+        self.__correct += 1 if correct else 0
+        self.__index += 1
+        return None
+
+
+# This ensures that importing doesn't automatically run this code.
+if __name__ == '__main__':
+    pass
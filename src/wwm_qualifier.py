@@ -0,0 +1,231 @@
+import argparse
+import queue
+import random
+import secrets
+import statistics
+import threading
+import time
+
+from wwm_gamelogic import Question
+
+from wwm_sources import OpentdbSource
+
+
+###############################################################################
+# This code implements the "fastest finger first" round that decides which of
+# several players gets to play the game. All players get the same question and
+# the player who answers correctly in the shortest time wins. The time of each
+# answer is taken with a monotonic clock in nanoseconds as soon as the input
+# arrives (at the edge, e.g. in the key or network handler) and passed along
+# with the answer, so that the time the user interface or the event loop
+# needs to process the input does not change the result. The reaction time of
+# each player is measured from the moment the question was shown to this
+# player, so players whose question arrived later (e.g. over the network) are
+# not at a disadvantage. Players whose reaction times are closer than the tie
+# window are drawn by lot.
+###############################################################################
+def stamp():
+    """
+    This function returns the current time of the monotonic clock in
+    nanoseconds. Input handlers should call it first thing when an input
+    arrives.
+    """
+    return time.perf_counter_ns()
+
+
+class Qualifier():
+    """
+    This class implements one fastest finger first round.
+    """
+    def __init__(self, question, players, tie_window_ns=1000000, seed=None):
+        """
+        This method initializes a round with the given Question object for
+        the given player names. Correct answers whose reaction times differ by
+        less than tie_window_ns nanoseconds are ties. The seed of the lot that
+        decides ties is random unless it is given (e.g. to replay a round).
+        """
+        self.__question = question
+        self.__players = list(players)
+        self.__tie_window_ns = tie_window_ns
+        self.seed = secrets.randbits(64) if seed is None else seed
+        # These variables store when the question was shown to each player
+        # and the answer of each player with the time it arrived.
+        self.__shown_at = {}
+        self.__answers = {}
+        self.__closed = False
+        # Answers of networked players can arrive on different threads.
+        self.__lock = threading.Lock()
+
+    def question(self):
+        """
+        This method returns the question and the possible answers.
+        """
+        return self.__question.get_question(), self.__question.get_answers()
+
+    def show(self, player=None, timestamp=None):
+        """
+        This method records when the question was shown to the given player
+        (or to all players if it is None). The timestamp (see stamp) is taken
+        now if it is not given.
+        """
+        if timestamp is None:
+            timestamp = stamp()
+        with self.__lock:
+            for name in self.__players if player is None else [player]:
+                self.__shown_at.setdefault(name, timestamp)
+
+    def submit(self, player, answer, timestamp):
+        """
+        This method records the answer of a player together with the
+        timestamp taken when it arrived. Only the first answer of each player
+        counts and answers before the question was shown or after the round
+        was closed are ignored. It returns whether the answer was accepted.
+        """
+        with self.__lock:
+            if (self.__closed or player not in self.__shown_at or
+                    player in self.__answers or
+                    timestamp < self.__shown_at[player]):
+                return False
+            self.__answers[player] = (answer, timestamp)
+            return True
+
+    def waiting(self):
+        """
+        This method returns the players who did not answer yet.
+        """
+        with self.__lock:
+            return [player for player in self.__players
+                    if player not in self.__answers]
+
+    def close(self):
+        """
+        This method ends the round so that no more answers are accepted.
+        """
+        with self.__lock:
+            self.__closed = True
+
+    def results(self):
+        """
+        This method closes the round and returns a list with a dictionary for
+        each player that answered: the player, the answer, whether it was
+        correct and the reaction time in nanoseconds. The correct answers come
+        first ordered by reaction time.
+        """
+        self.close()
+        results = [{"player": player,
+                    "answer": answer,
+                    "correct": self.__question == answer,
+                    "reaction_ns": timestamp - self.__shown_at[player]}
+                   for player, (answer, timestamp) in self.__answers.items()]
+        results.sort(key=lambda result: (not result["correct"],
+                                         result["reaction_ns"]))
+        return results
+
+    def winner(self):
+        """
+        This method closes the round and returns the winning player (or None
+        if nobody answered correctly) and the list of players that tied for
+        the first place. Ties are decided by a lot that is drawn with the seed
+        of the round so that the decision can be checked afterwards.
+        """
+        correct = [result for result in self.results() if result["correct"]]
+        if not correct:
+            return None, []
+        fastest = correct[0]["reaction_ns"]
+        # The order of the tied players does not depend on the order in which
+        # their answers arrived.
+        tied = sorted(result["player"] for result in correct
+                      if result["reaction_ns"] - fastest <
+                      self.__tie_window_ns)
+        return random.Random(self.seed).choice(tied), tied
+
+
+def draw_question(source=None, difficulty="easy"):
+    """
+    This function retrieves one question with the given difficulty from the
+    given source (by default the opentdb.com api) for a round. If the source
+    has no question of this difficulty (e.g. the category is exhausted) the
+    other difficulties are tried. It raises a ValueError if there is no
+    question at all.
+    """
+    if source is None:
+        source = OpentdbSource()
+    others = [other for other in ("easy", "medium", "hard")
+              if other != difficulty]
+    for difficulty in [difficulty] + others:
+        questions = source.fetch(difficulty, 1)
+        if questions:
+            question = questions[0]
+            return Question(question["question"], question["correct_answer"],
+                            question["incorrect_answers"])
+    raise ValueError("No question available for the fastest finger first "
+                     "round")
+
+
+def benchmark_input_path(samples=10000):
+    """
+    This function measures the parts of the input path and returns their
+    durations in nanoseconds (median and 99th percentile): reading the clock,
+    recording an answer and passing an input from a receiving thread (like a
+    network handler) to the thread that processes it.
+    """
+    def percentiles(values):
+        values = sorted(values)
+        return {"median": statistics.median(values),
+                "p99": values[int(len(values) * 0.99) - 1]}
+
+    # The time between two readings of the clock is its overhead and
+    # resolution.
+    clock = []
+    for _ in range(samples):
+        first = stamp()
+        clock.append(stamp() - first)
+
+    # Recording an answer of one of many players.
+    players = [f"player {number}" for number in range(samples)]
+    qualifier = Qualifier(Question("?", "right", ["a", "b", "c"]), players)
+    qualifier.show()
+    submit = []
+    for player in players:
+        timestamp = stamp()
+        qualifier.submit(player, "right", timestamp)
+        submit.append(stamp() - timestamp)
+
+    # The time from taking the timestamp in a receiving thread until the
+    # processing thread gets the input. This delay does not change the result
+    # because the timestamp is taken before.
+    inputs = queue.Queue()
+    handoff = []
+
+    def receive():
+        for _ in range(samples):
+            inputs.put(stamp())
+            # Gives the processing thread time to wait for the next input.
+            time.sleep(0.0001)
+        inputs.put(None)
+
+    thread = threading.Thread(target=receive)
+    thread.start()
+    while True:
+        timestamp = inputs.get()
+        if timestamp is None:
+            break
+        handoff.append(stamp() - timestamp)
+    thread.join()
+    return {"clock": percentiles(clock),
+            "submit": percentiles(submit),
+            "handoff": percentiles(handoff)}
+
+
+# This benchmarks the input path when the file gets executed by the python
+# interpreter.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the input path of the fastest finger first "
+                    "round.")
+    parser.add_argument("--samples", type=int, default=10000,
+                        help="number of measurements of each part")
+    args = parser.parse_args()
+    for part, values in benchmark_input_path(args.samples).items():
+        print(f"{part:<8} median {values['median'] / 1000:8.2f} us   "
+              f"p99 {values['p99'] / 1000:8.2f} us")
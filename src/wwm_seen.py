@@ -0,0 +1,96 @@
+import array
+import os
+import threading
+
+
+###############################################################################
+# This code remembers which questions were recently asked so that the same
+# question is not asked again in one of the next games. Instead of the
+# questions themselves only a 64 bit hash of each question (see question_key
+# in wwm_gamelogic) is stored and only the most recent ones are kept so that
+# the memory needed stays small and bounded.
+###############################################################################
+class SeenIndex():
+    """
+    This class stores the keys of the most recently asked questions. One
+    object can be shared by all games (globally) or one object can be used for
+    each player.
+    """
+    def __init__(self, capacity=10000, path=None):
+        """
+        This method initializes a new index that remembers up to capacity
+        questions. If a path is given the keys are loaded from this file (if
+        it exists) and the save method writes them back to it.
+        """
+        self.__capacity = capacity
+        self.__path = path
+        # The keys are stored twice: In the order they were added in a compact
+        # array of 64 bit integers which is used as ring buffer to find the
+        # oldest key, and in a set to check quickly whether a key exists.
+        self.__order = array.array("Q")
+        self.__keys = set()
+        # This variable tracks the position of the oldest key in the ring
+        # buffer once it is full.
+        self.__oldest = 0
+        # The index can be shared by games running in different threads.
+        self.__lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path, "rb") as file:
+                keys = array.array("Q", file.read())
+            # Only the newest keys are kept if the capacity got smaller.
+            for key in keys[-capacity:]:
+                self.add(key)
+
+    def __len__(self):
+        """
+        This method returns the number of stored keys.
+        """
+        return len(self.__keys)
+
+    def __contains__(self, key):
+        """
+        This method defines the behavior of "key in object". It returns
+        whether the question with the given key was recently asked.
+        """
+        return key in self.__keys
+
+    def add(self, key):
+        """
+        This method stores the key of an asked question. If the index is full
+        the oldest key is removed. It returns whether the key was new, which
+        is checked under the same lock so that only one thread can add it.
+        """
+        with self.__lock:
+            if key in self.__keys:
+                return False
+            if len(self.__order) < self.__capacity:
+                self.__order.append(key)
+            # The oldest key is overwritten and the next key becomes the
+            # oldest one.
+            else:
+                self.__keys.discard(self.__order[self.__oldest])
+                self.__order[self.__oldest] = key
+                self.__oldest = (self.__oldest + 1) % self.__capacity
+            self.__keys.add(key)
+        return True
+
+    def save(self):
+        """
+        This method writes all keys from the oldest to the newest to the file
+        given when the index was created.
+        """
+        if self.__path is None:
+            return
+        with self.__lock:
+            keys = self.__order[self.__oldest:] + self.__order[:self.__oldest]
+        # The keys are first written to a temporary file and then renamed so
+        # that the file is never left half written.
+        temporary_path = f"{self.__path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as file:
+            keys.tofile(file)
+        os.replace(temporary_path, self.__path)
+
+
+# This ensures that importing doesn't automatically run this code.
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,257 @@
+import json
+import random
+import struct
+from multiprocessing import shared_memory
+
+from wwm_gamelogic import Question
+
+from wwm_store import QuestionStore
+
+
+###############################################################################
+# This code packs a whole question corpus once into a block of shared memory
+# so that several worker processes on the same host can use it without each
+# holding its own copy. The block starts with a header that describes the
+# groups of questions with the same difficulty and category, followed by the
+# position of each question and the questions themselves. Workers attach to
+# the block by its name and read the questions through a view of the shared
+# memory, so the memory needed stays the same however many workers there are.
+#
+# The layout of the block is:
+#   magic (4 bytes) | header length (uint32) | header (json)
+#   | padding to 8 bytes | positions (uint64, one more than questions)
+#   | questions
+# Each question is stored as the index of its correct answer (uint8), the
+# lengths of its text and its four answers (5 x uint32) and the utf-8 encoded
+# text and answers.
+###############################################################################
+MAGIC = b"WWMQ"
+# The format of the header length and of the fixed part of each question.
+LENGTH_FORMAT = struct.Struct("<I")
+RECORD_FORMAT = struct.Struct("<B5I")
+# Each position is stored as unsigned 64 bit integer.
+OFFSET_TYPE = "Q"
+
+
+def pack_question(question):
+    """
+    This function encodes a question in the format of the opentdb.com api as
+    bytes. The correct answer is stored as first answer.
+    """
+    texts = [text.encode("utf-8") for text in
+             [question["question"], question["correct_answer"]] +
+             list(question["incorrect_answers"])]
+    return RECORD_FORMAT.pack(0, *(len(text) for text in texts)) + \
+        b"".join(texts)
+
+
+class SharedCorpus():
+    """
+    This class gives access to a question corpus in shared memory. It can be
+    used as question source for the Quiz class. The process that creates the
+    corpus owns the shared memory and removes it with unlink once all workers
+    are done.
+    """
+    def __init__(self, memory, owner=False):
+        """
+        This method initializes the access to the given SharedMemory object.
+        Use create or attach instead of calling this method directly.
+        """
+        self.__memory = memory
+        self.__owner = owner
+        buffer = memory.buf
+        if bytes(buffer[:4]) != MAGIC:
+            raise ValueError(f"{memory.name} does not contain a question "
+                             f"corpus")
+        header_length, = LENGTH_FORMAT.unpack_from(buffer, 4)
+        header = json.loads(bytes(buffer[8:8 + header_length]))
+        self.__groups = header["groups"]
+        self.__total = header["total"]
+        # The positions are read as array of integers without copying them.
+        start = (8 + header_length + 7) // 8 * 8
+        self.__positions = buffer[
+            start:start + (self.__total + 1) * 8].cast(OFFSET_TYPE)
+
+    @classmethod
+    def create(cls, questions, name=None):
+        """
+        This method packs the given questions (in the format of the
+        opentdb.com api) into a new block of shared memory with the given name
+        (or a random name if it is None) and returns a SharedCorpus object for
+        it. Only multiple choice questions are packed because the game needs
+        four answers.
+        """
+        # The questions are grouped by difficulty and category so that the
+        # questions of each group are stored next to each other.
+        grouped = {}
+        for question in questions:
+            if len(question.get("incorrect_answers", ())) != 3:
+                continue
+            grouped.setdefault((question["difficulty"], question["category"]),
+                               []).append(pack_question(question))
+        groups = []
+        records = []
+        for (difficulty, category), packed in grouped.items():
+            groups.append({"difficulty": difficulty, "category": category,
+                           "start": len(records), "count": len(packed)})
+            records.extend(packed)
+        header = json.dumps({"total": len(records), "groups": groups},
+                            separators=(",", ":")).encode("utf-8")
+        start = (8 + len(header) + 7) // 8 * 8
+        data_start = start + (len(records) + 1) * 8
+        size = data_start + sum(len(record) for record in records)
+
+        memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        buffer = memory.buf
+        buffer[:4] = MAGIC
+        LENGTH_FORMAT.pack_into(buffer, 4, len(header))
+        buffer[8:8 + len(header)] = header
+        positions = buffer[start:data_start].cast(OFFSET_TYPE)
+        position = data_start
+        for index, record in enumerate(records):
+            positions[index] = position
+            buffer[position:position + len(record)] = record
+            position += len(record)
+        # The last position marks the end of the last question.
+        positions[len(records)] = position
+        positions.release()
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """
+        This method returns a SharedCorpus object for the existing block of
+        shared memory with the given name. The workers should be started by
+        the process that created the corpus so that they share its resource
+        tracker which otherwise removes the shared memory when a worker ends.
+        """
+        return cls(shared_memory.SharedMemory(name=name))
+
+    def name(self):
+        """
+        This method returns the name workers use to attach to the corpus.
+        """
+        return self.__memory.name
+
+    def close(self):
+        """
+        This method closes the access of this process to the shared memory
+        and removes the shared memory if this process created it.
+        """
+        self.__positions.release()
+        self.__memory.close()
+        if self.__owner:
+            self.__memory.unlink()
+
+    def __len__(self):
+        """
+        This method returns the number of questions in the corpus.
+        """
+        return self.__total
+
+    def categories(self):
+        """
+        This method returns the names of all categories in the corpus.
+        """
+        return sorted({group["category"] for group in self.__groups})
+
+    def count(self, difficulty, category=None):
+        """
+        This method returns the number of questions with the given difficulty
+        (and category if it is not None).
+        """
+        return sum(group["count"] for group in self.__select(
+            difficulty, category))
+
+    def __select(self, difficulty, category):
+        """
+        This method returns the groups with the given difficulty (and
+        category if it is not None).
+        """
+        return [group for group in self.__groups
+                if group["difficulty"] == difficulty and
+                category in (None, group["category"])]
+
+    def view(self, position):
+        """
+        This method returns a view of the shared memory that contains the
+        question at the given position. No bytes are copied.
+        """
+        return self.__memory.buf[self.__positions[position]:
+                                 self.__positions[position + 1]]
+
+    def texts(self, position):
+        """
+        This method decodes the question at the given position and returns
+        its text, its answers and the index of the correct answer. Only the
+        texts of this question are copied out of the shared memory.
+        """
+        view = self.view(position)
+        correct_index, *lengths = RECORD_FORMAT.unpack_from(view)
+        texts = []
+        start = RECORD_FORMAT.size
+        for length in lengths:
+            texts.append(str(view[start:start + length], "utf-8"))
+            start += length
+        view.release()
+        return texts[0], texts[1:], correct_index
+
+    def question(self, position):
+        """
+        This method returns a new Question object for the question at the
+        given position. Each game needs its own Question objects because the
+        jokers change them.
+        """
+        text, answers, correct_index = self.texts(position)
+        return Question(text, answers[correct_index],
+                        answers[:correct_index] + answers[correct_index + 1:])
+
+    def fetch(self, difficulty, amount, category=None):
+        """
+        This method returns the given amount of randomly selected questions
+        with the given difficulty (and category if it is not None) in the
+        format of the opentdb.com api.
+        """
+        groups = self.__select(difficulty, category)
+        total = sum(group["count"] for group in groups)
+        questions = []
+        for number in random.sample(range(total), min(amount, total)):
+            for group in groups:
+                if number < group["count"]:
+                    text, answers, correct_index = self.texts(
+                        group["start"] + number)
+                    questions.append({
+                        "category": group["category"],
+                        "type": "multiple",
+                        "difficulty": difficulty,
+                        "question": text,
+                        "correct_answer": answers[correct_index],
+                        "incorrect_answers":
+                            answers[:correct_index] +
+                            answers[correct_index + 1:]})
+                    break
+                number -= group["count"]
+        return questions
+
+
+def store_questions(directory):
+    """
+    This function yields all questions of a question store created with
+    wwm_store.py.
+    """
+    store = QuestionStore(directory)
+    try:
+        for difficulty in ("easy", "medium", "hard"):
+            for category in store.categories():
+                # The store has no method to list the questions of a group,
+                # but fetching all of them returns each question once.
+                yield from store.fetch(difficulty,
+                                       store.count(difficulty, category),
+                                       category)
+    finally:
+        store.close()
+
+
+# This ensures that importing doesn't automatically run this code.
+if __name__ == '__main__':
+    pass
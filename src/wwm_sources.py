@@ -0,0 +1,403 @@
+import contextlib
+import itertools
+import threading
+import time
+
+import requests
+
+
+###############################################################################
+# This code implements the sources the game retrieves its questions from. Each
+# source has a fetch method that returns a list of questions for a difficulty
+# (and optionally a category) in the format of the opentdb.com api so that the
+# Quiz class does not need to know where the questions come from.
+###############################################################################
+# The deadline of the current time limit is stored separately for each
+# thread because several games can retrieve questions at the same time.
+_limit = threading.local()
+
+
+@contextlib.contextmanager
+def time_limit(seconds):
+    """
+    This function returns a context manager that limits the time all
+    requests to the api within it may take together to the given number of
+    seconds (or does nothing if it is None). Nested limits can only shorten
+    the time.
+    """
+    previous = getattr(_limit, "deadline", None)
+    if seconds is not None:
+        deadline = time.monotonic() + seconds
+        _limit.deadline = deadline if previous is None else min(deadline,
+                                                                 previous)
+    try:
+        yield
+    finally:
+        _limit.deadline = previous
+
+
+def remaining_time():
+    """
+    This function returns how many seconds of the current time limit are
+    left (or None if there is no limit).
+    """
+    deadline = getattr(_limit, "deadline", None)
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def request_timeout(timeout):
+    """
+    This function returns the given tuple with the seconds to wait for the
+    connection and for the response, shortened so that a request ends with
+    the current time limit. It raises a TimeoutError if the time limit is
+    used up.
+    """
+    connect_timeout, read_timeout = timeout
+    remaining = remaining_time()
+    if remaining is not None:
+        if remaining <= 0:
+            raise TimeoutError("The time limit for retrieving questions is "
+                               "used up")
+        connect_timeout = min(connect_timeout, remaining)
+        read_timeout = min(read_timeout, remaining)
+    return connect_timeout, read_timeout
+
+
+class OpentdbCatalog():
+    """
+    This class retrieves the categories of opentdb.com and how many questions
+    of each difficulty they contain and keeps them for some time, so that
+    questions are only requested from categories that have enough of them.
+    """
+    def __init__(self, session=None, ttl=3600, retry_after=60,
+                 timeout=(3.05, 10)):
+        """
+        This method initializes the catalog. The values are requested again
+        after ttl seconds. If a request fails the values are unknown and it is
+        only tried again after retry_after seconds so that the game does not
+        wait for the catalog. The requests use the given session and timeout
+        (see OpentdbSource).
+        """
+        self.__session = requests.Session() if session is None else session
+        self.__ttl = ttl
+        self.__retry_after = retry_after
+        self.__timeout = timeout
+        # This variable stores for each url with its parameters the parsed
+        # response (or None if the request failed) and until when it is
+        # valid.
+        self.__cache = {}
+        # The catalog can be shared by games running in different threads.
+        # The lock only protects the cache and is never held during a
+        # request. Instead each url has its own lock so that it is only
+        # requested by one thread at a time.
+        self.__lock = threading.Lock()
+        self.__requesting = {}
+
+    def __get(self, url, params=None):
+        """
+        This method returns the parsed response of the given url from the
+        cache or requests it if it is missing or too old.
+        """
+        key = (url, tuple(sorted((params or {}).items())))
+        with self.__lock:
+            body, valid_until = self.__cache.get(key, (None, 0))
+            if time.monotonic() < valid_until:
+                return body
+            requesting = self.__requesting.setdefault(key, threading.Lock())
+        with requesting:
+            # Another thread might have requested the url while this one
+            # waited.
+            with self.__lock:
+                body, valid_until = self.__cache.get(key, (None, 0))
+                if time.monotonic() < valid_until:
+                    return body
+            try:
+                response = self.__session.get(
+                    url, params=params,
+                    timeout=request_timeout(self.__timeout))
+                response.raise_for_status()
+                body = response.json()
+                valid_until = time.monotonic() + self.__ttl
+            except (requests.RequestException, TimeoutError, ValueError):
+                body = None
+                valid_until = time.monotonic() + self.__retry_after
+            with self.__lock:
+                self.__cache[key] = (body, valid_until)
+        return body
+
+    def categories(self):
+        """
+        This method returns a dictionary with the name of each category by
+        its number (or None if it is unknown).
+        """
+        body = self.__get("https://opentdb.com/api_category.php")
+        if body is None:
+            return None
+        return {category["id"]: category["name"]
+                for category in body["trivia_categories"]}
+
+    def counts(self, category):
+        """
+        This method returns a dictionary with the number of questions of each
+        difficulty in the given category (or None if it is unknown). The
+        numbers also contain questions that are not multiple choice questions,
+        so they are an upper limit. They are lowered with the limit method.
+        """
+        body = self.__get("https://opentdb.com/api_count.php",
+                          {"category": category})
+        if body is None:
+            return None
+        counts = body["category_question_count"]
+        return {difficulty: counts[f"total_{difficulty}_question_count"]
+                for difficulty in ("easy", "medium", "hard")}
+
+    def count(self, difficulty, category):
+        """
+        This method returns the number of questions with the given difficulty
+        in the given category (or None if it is unknown).
+        """
+        counts = self.counts(category)
+        if counts is None:
+            return None
+        return counts[difficulty]
+
+    def limit(self, difficulty, category, count):
+        """
+        This method records that the given category contains at most count
+        questions with the given difficulty (e.g. after the api answered that
+        there are not enough). The limit is kept until the counts are
+        requested again.
+        """
+        key = ("https://opentdb.com/api_count.php",
+               (("category", category),))
+        with self.__lock:
+            body, valid_until = self.__cache.get(key, (None, 0))
+            if body is None:
+                return
+            counts = body["category_question_count"]
+            name = f"total_{difficulty}_question_count"
+            counts[name] = min(counts[name], count)
+
+
+class OpentdbSource():
+    """
+    This class retrieves questions from the public api of opentdb.com.
+    """
+    def __init__(self, category=9, timeout=(3.05, 10), catalog_ttl=3600):
+        """
+        This method initializes the source for the given default opentdb
+        category. The category 9 contains general knowledge questions. The
+        timeout is a tuple with the seconds to wait for the connection and for
+        the response. The number of questions in each category is requested
+        again after catalog_ttl seconds.
+        """
+        self.__category = category
+        self.__timeout = timeout
+        # The session keeps the connection to the api open so that only the
+        # first request needs to establish a new (encrypted) connection.
+        self.__session = requests.Session()
+        self.catalog = OpentdbCatalog(self.__session, ttl=catalog_ttl,
+                                      timeout=timeout)
+
+    def count(self, difficulty, category=None):
+        """
+        This method returns how many questions with the given difficulty the
+        given category (or the default category if it is None) contains at
+        most (or None if it is unknown).
+        """
+        if category is None:
+            category = self.__category
+        return self.catalog.count(difficulty, category)
+
+    def fetch(self, difficulty, amount, category=None):
+        """
+        This method retrieves the given amount of multiple choice questions
+        with the given difficulty and category (or the default category if it
+        is None) from the api and returns them. Fewer questions are requested
+        if the category does not contain enough (see count) and no request is
+        sent if it contains none. It raises an exception if the api does not
+        answer in time or returns an error.
+        """
+        if category is None:
+            category = self.__category
+        available = self.catalog.count(difficulty, category)
+        if available is not None:
+            amount = min(amount, available)
+        if amount <= 0:
+            return []
+        while True:
+            body = self.__request(difficulty, amount, category)
+            # The response code 1 means that the category does not contain
+            # enough multiple choice questions (the counts of the catalog also
+            # contain other questions). The catalog is corrected and half as
+            # many questions are requested once more.
+            if body["response_code"] == 1 and amount > 1:
+                self.catalog.limit(difficulty, category, amount - 1)
+                amount //= 2
+                continue
+            if body["response_code"] == 1:
+                self.catalog.limit(difficulty, category, 0)
+                return []
+            # The response code is 0 if the request was successful.
+            if body["response_code"] != 0:
+                raise ValueError(f"The api returned the response code "
+                                 f"{body['response_code']}")
+            return body["results"]
+
+    def __request(self, difficulty, amount, category):
+        """
+        This method requests the questions from the api and returns the
+        parsed response body.
+        """
+        params = {"amount": amount,
+                  "difficulty": difficulty,
+                  "type": "multiple",
+                  "category": category}
+        # The timeouts are shortened so that the request ends with the time
+        # limit.
+        response = self.__session.get(
+                  "https://opentdb.com/api.php",
+                  params=params,
+                  timeout=request_timeout(self.__timeout))
+        response.raise_for_status()
+        # The api response body is parsed to a dictionary.
+        return response.json()
+
+
+class FailoverSource():
+    """
+    This class retrieves questions from a primary source (e.g. the api) and
+    uses a fallback source (e.g. a local question store) when the primary
+    source fails. It works like a circuit breaker: After several failures in
+    a row the primary source is not used at all for some time so that the
+    game does not wait for a source that is down. Then one request tries
+    whether the primary source works again.
+    """
+    def __init__(self, primary, fallback, failure_threshold=3,
+                 reset_timeout=60):
+        """
+        This method initializes the source. The primary source is skipped
+        for reset_timeout seconds after failure_threshold failures in a row.
+        """
+        self.__primary = primary
+        self.__fallback = fallback
+        self.__failure_threshold = failure_threshold
+        self.__reset_timeout = reset_timeout
+        # The circuit is "closed" while the primary source is used, "open"
+        # while it is skipped and "half-open" while one request tries it
+        # again.
+        self.__state = "closed"
+        self.__failures = 0
+        self.__opened_at = None
+        self.__last_error = None
+        self.__counts = {"primary": 0, "fallback": 0, "errors": 0}
+        # The source can be shared by games running in different threads.
+        self.__lock = threading.Lock()
+
+    def state(self):
+        """
+        This method returns a dictionary that describes the circuit for
+        monitoring: its state, the number of failures in a row, since when it
+        is open, the last error, how many requests were answered by each
+        source and how many requests to the primary source failed.
+        """
+        with self.__lock:
+            return {"state": self.__state,
+                    "failures": self.__failures,
+                    "opened_at": self.__opened_at,
+                    "last_error": self.__last_error,
+                    **self.__counts}
+
+    def __use_primary(self):
+        """
+        This method returns whether the next request should use the primary
+        source. Once the reset timeout passed only one request at a time
+        tries the primary source.
+        """
+        with self.__lock:
+            if self.__state == "closed":
+                return True
+            if (self.__state == "open" and
+                    time.monotonic() - self.__opened_at >=
+                    self.__reset_timeout):
+                self.__state = "half-open"
+                return True
+            return False
+
+    def fetch(self, difficulty, amount, category=None):
+        """
+        This method returns the given amount of questions with the given
+        difficulty and category from the primary source or, if it fails or is
+        skipped, from the fallback source.
+        """
+        if self.__use_primary():
+            try:
+                questions = self.__primary.fetch(difficulty, amount, category)
+            except Exception as error:
+                with self.__lock:
+                    self.__failures += 1
+                    self.__counts["errors"] += 1
+                    self.__last_error = repr(error)
+                    # The circuit opens after too many failures or if the
+                    # primary source still fails after the reset timeout.
+                    if (self.__state == "half-open" or
+                            self.__failures >= self.__failure_threshold):
+                        self.__state = "open"
+                        self.__opened_at = time.monotonic()
+            else:
+                with self.__lock:
+                    self.__state = "closed"
+                    self.__failures = 0
+                    self.__opened_at = None
+                    self.__counts["primary"] += 1
+                return questions
+        with self.__lock:
+            self.__counts["fallback"] += 1
+        return self.__fallback.fetch(difficulty, amount, category)
+
+
+class FixtureSource():
+    """
+    This class creates generated questions without any network access, e.g.
+    to run the game automatically in tests and benchmarks. The correct answer
+    of each question starts with "Correct" and every incorrect answer starts
+    with "Wrong".
+    """
+    def __init__(self):
+        """
+        This method initializes the source with a counter that numbers all
+        generated questions so that every question is unique.
+        """
+        self.__counter = itertools.count(1)
+
+    def fetch(self, difficulty, amount, category=None):
+        """
+        This method creates the given amount of questions with the given
+        difficulty and category and returns them in the format of the
+        opentdb.com api.
+        """
+        if category is None:
+            category = "Fixtures"
+        results = []
+        for _ in range(amount):
+            number = next(self.__counter)
+            # The texts contain html escape characters and have different
+            # lengths like the questions from the api.
+            results.append({
+                "category": category,
+                "type": "multiple",
+                "difficulty": difficulty,
+                "question": f"Fixture question {number} for the &quot;"
+                            f"{difficulty}&quot; rounds" + " ..." * (
+                                number % 7) + "?",
+                "correct_answer": f"Correct answer {number}",
+                "incorrect_answers": [f"Wrong answer {number}{letter}"
+                                      for letter in "abc"]})
+        return results
+
+
+# This ensures that importing doesn't automatically run this code.
+if __name__ == '__main__':
+    pass
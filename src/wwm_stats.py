@@ -0,0 +1,140 @@
+import collections
+import dbm
+import json
+import threading
+
+
+###############################################################################
+# This code collects statistics about how players answer each question: how
+# often each answer was chosen, how often the question was answered correctly
+# and how long players needed to decide. The statistics are updated with each
+# answer, the most recently used ones are kept in memory and all of them are
+# written to a key-value database on disk in batches. They can be used for the
+# audience joker so that the audience votes like real players.
+###############################################################################
+class AnswerStats():
+    """
+    This class stores the answer statistics of all questions. Each question
+    is identified by its key (see question_key in wwm_gamelogic).
+    """
+    def __init__(self, path, capacity=10000, batch_size=100):
+        """
+        This method opens (or creates) the database under the given path. At
+        most capacity statistics are kept in memory and changed statistics are
+        written to the database after batch_size answers.
+        """
+        self.__database = dbm.open(path, "c")
+        self.__capacity = capacity
+        self.__batch_size = batch_size
+        # The statistics in memory are ordered from the least to the most
+        # recently used one so that the least recently used one can be removed
+        # when there are too many.
+        self.__cache = collections.OrderedDict()
+        # This variable stores the keys of statistics that changed since they
+        # were last written to the database.
+        self.__changed = set()
+        # The statistics can be shared by games running in different threads.
+        self.__lock = threading.RLock()
+
+    def __load(self, key):
+        """
+        This method returns the statistics of the given key from memory or
+        from the database (or None if there are none) and marks them as most
+        recently used.
+        """
+        if key in self.__cache:
+            self.__cache.move_to_end(key)
+            return self.__cache[key]
+        value = self.__database.get(format(key, "016x"))
+        if value is None:
+            return None
+        entry = json.loads(value)
+        self.__store(key, entry)
+        return entry
+
+    def __store(self, key, entry):
+        """
+        This method keeps the given statistics in memory. If there are too
+        many statistics in memory the least recently used one is removed
+        after writing it to the database if it changed.
+        """
+        self.__cache[key] = entry
+        if len(self.__cache) > self.__capacity:
+            oldest, oldest_entry = self.__cache.popitem(last=False)
+            if oldest in self.__changed:
+                self.__database[format(oldest, "016x")] = \
+                    json.dumps(oldest_entry)
+                self.__changed.discard(oldest)
+
+    def record(self, key, answer, correct, seconds):
+        """
+        This method adds one answer to the statistics of the question with
+        the given key: the chosen answer, whether it was correct and how many
+        seconds the player needed to decide.
+        """
+        with self.__lock:
+            entry = self.__load(key)
+            if entry is None:
+                entry = {"answers": {}, "total": 0, "correct": 0,
+                         "seconds": 0.0}
+                self.__store(key, entry)
+            entry["answers"][answer] = entry["answers"].get(answer, 0) + 1
+            entry["total"] += 1
+            entry["correct"] += 1 if correct else 0
+            entry["seconds"] += seconds
+            self.__changed.add(key)
+            if len(self.__changed) >= self.__batch_size:
+                self.flush()
+
+    def get(self, key):
+        """
+        This method returns the statistics of the question with the given key
+        (or None if it was never answered): the number of answers, the rate
+        of correct answers, the mean decision time in seconds and how often
+        each answer was chosen.
+        """
+        with self.__lock:
+            entry = self.__load(key)
+            if entry is None:
+                return None
+            return {"total": entry["total"],
+                    "correct_rate": entry["correct"] / entry["total"],
+                    "mean_seconds": entry["seconds"] / entry["total"],
+                    "answers": dict(entry["answers"])}
+
+    def distribution(self, key, min_answers=30):
+        """
+        This method returns how often each answer of the question with the
+        given key was chosen or None if it was answered less than min_answers
+        times because then the numbers are not meaningful.
+        """
+        with self.__lock:
+            entry = self.__load(key)
+            if entry is None or entry["total"] < min_answers:
+                return None
+            return dict(entry["answers"])
+
+    def flush(self):
+        """
+        This method writes all changed statistics to the database.
+        """
+        with self.__lock:
+            for key in self.__changed:
+                self.__database[format(key, "016x")] = \
+                    json.dumps(self.__cache[key])
+            self.__changed.clear()
+            # Not all databases support sync.
+            if hasattr(self.__database, "sync"):
+                self.__database.sync()
+
+    def close(self):
+        """
+        This method writes all changed statistics and closes the database.
+        """
+        self.flush()
+        self.__database.close()
+
+
+# This ensures that importing doesn't automatically run this code.
+if __name__ == '__main__':
+    pass
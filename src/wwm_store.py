@@ -0,0 +1,275 @@
+import argparse
+import array
+import json
+import mmap
+import os
+import random
+import shutil
+import tempfile
+
+
+###############################################################################
+# This code stores large amounts of questions on disk so that the game does
+# not need to retrieve them from the api. The importer reads question dumps in
+# the format of the opentdb.com api piece by piece and therefore needs the same
+# amount of memory for any size of dump. It writes all questions into one data
+# file and creates an index with the position of each question grouped by
+# difficulty and category. The QuestionStore class memory-maps both files and
+# only decodes the questions that are actually asked.
+###############################################################################
+# The names of the files that make up a store.
+DATA_FILE = "questions.dat"
+INDEX_FILE = "index.dat"
+HEADER_FILE = "index.json"
+# Each position in the index is stored as unsigned 64 bit integer.
+OFFSET_TYPE = "Q"
+
+
+def iter_array(file, buffer, chunk_size):
+    """
+    This function yields the objects of a json array whose opening bracket
+    was already read. The buffer contains the text that was read after the
+    bracket and further text is read from the file in chunks when needed.
+    """
+    decoder = json.JSONDecoder()
+    position = 0
+    while True:
+        # Skips the whitespace and commas between the objects and reads the
+        # next chunk when the buffer is used up.
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position == len(buffer):
+            buffer = file.read(chunk_size)
+            position = 0
+            if not buffer:
+                return
+            continue
+        # The closing bracket ends the array.
+        if buffer[position] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        # If the object is not complete yet, the next chunk is appended and
+        # decoding is tried again.
+        except json.JSONDecodeError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield value
+        position = end
+
+
+def iter_questions(path, chunk_size=1 << 16):
+    """
+    This function yields all questions of a dump file one after another. A
+    .jsonl file contains one question or one api response per line. Any other
+    file contains either an api response or an array of questions.
+    """
+    with open(path, encoding="utf-8") as file:
+        if path.endswith(".jsonl"):
+            for line in file:
+                if not line.strip():
+                    continue
+                value = json.loads(line)
+                # A line can also contain a whole api response.
+                if "results" in value:
+                    yield from value["results"]
+                else:
+                    yield value
+            return
+
+        # Reads until the beginning of the array with the questions which is
+        # either the first character or the value of "results".
+        buffer = ""
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise ValueError(f"{path} does not contain any questions")
+            buffer += chunk
+            stripped = buffer.lstrip()
+            if stripped.startswith("["):
+                start = buffer.index("[")
+                break
+            results = buffer.find('"results"')
+            if results != -1 and buffer.find("[", results) != -1:
+                start = buffer.find("[", results)
+                break
+        yield from iter_array(file, buffer[start+1:], chunk_size)
+
+
+def import_dumps(paths, directory):
+    """
+    This function imports all questions from the given dump files into a new
+    store in the given directory and returns the number of questions. Only
+    multiple choice questions are imported because the game needs four
+    answers.
+    """
+    os.makedirs(directory, exist_ok=True)
+    # The positions of the questions are written to one temporary file for
+    # each combination of difficulty and category so that they do not need
+    # to be kept in memory.
+    temporary = tempfile.mkdtemp(dir=directory)
+    offset_files = {}
+    buffers = {}
+    total = 0
+    try:
+        with open(os.path.join(directory, DATA_FILE), "wb") as data:
+            for path in paths:
+                for question in iter_questions(path):
+                    if len(question.get("incorrect_answers", ())) != 3:
+                        continue
+                    key = (question["difficulty"], question["category"])
+                    if key not in offset_files:
+                        offset_files[key] = open(
+                            os.path.join(temporary, str(len(offset_files))),
+                            "wb")
+                        buffers[key] = array.array(OFFSET_TYPE)
+                    # Stores the position of the question and writes it as
+                    # one line of compact json.
+                    buffers[key].append(data.tell())
+                    data.write(json.dumps(
+                        {"question": question["question"],
+                         "correct_answer": question["correct_answer"],
+                         "incorrect_answers": question["incorrect_answers"],
+                         "difficulty": question["difficulty"],
+                         "category": question["category"]},
+                        ensure_ascii=False, separators=(",", ":")
+                    ).encode("utf-8") + b"\n")
+                    total += 1
+                    # The positions are written in blocks.
+                    if len(buffers[key]) >= 4096:
+                        buffers[key].tofile(offset_files[key])
+                        del buffers[key][:]
+
+        # The positions of all groups are copied one after another into the
+        # index file and the header stores where each group starts.
+        groups = []
+        with open(os.path.join(directory, INDEX_FILE), "wb") as index:
+            start = 0
+            for key, offset_file in offset_files.items():
+                buffers[key].tofile(offset_file)
+                count = offset_file.tell() // buffers[key].itemsize
+                offset_file.close()
+                with open(offset_file.name, "rb") as source:
+                    shutil.copyfileobj(source, index)
+                groups.append({"difficulty": key[0], "category": key[1],
+                               "start": start, "count": count})
+                start += count
+        with open(os.path.join(directory, HEADER_FILE), "w") as header:
+            json.dump({"total": total, "groups": groups}, header, indent=1)
+    finally:
+        for offset_file in offset_files.values():
+            offset_file.close()
+        shutil.rmtree(temporary)
+    return total
+
+
+def map_file(path):
+    """
+    This function memory-maps the file under the given path for reading. The
+    files of a store without questions are empty and can not be mapped, so
+    they are returned as empty bytes instead.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class QuestionStore():
+    """
+    This class gives access to the questions of a store created with
+    import_dumps. It can be used as question source for the Quiz class and
+    only reads the questions that are retrieved.
+    """
+    def __init__(self, directory):
+        """
+        This method opens the store in the given directory. The data and the
+        index file are memory-mapped so that opening a store takes the same
+        time and memory for any number of questions. A store without
+        questions can be opened as well and returns no questions.
+        """
+        with open(os.path.join(directory, HEADER_FILE)) as header:
+            self.__groups = json.load(header)["groups"]
+        self.__data = map_file(os.path.join(directory, DATA_FILE))
+        self.__index_map = map_file(os.path.join(directory, INDEX_FILE))
+        # The index is read as array of integers without copying it.
+        self.__index = memoryview(self.__index_map).cast(OFFSET_TYPE)
+
+    def close(self):
+        """
+        This method closes the memory-mapped files.
+        """
+        self.__index.release()
+        for mapped in (self.__index_map, self.__data):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+    def categories(self):
+        """
+        This method returns the names of all categories in the store.
+        """
+        return sorted({group["category"] for group in self.__groups})
+
+    def count(self, difficulty, category=None):
+        """
+        This method returns the number of questions with the given difficulty
+        (and category if it is not None).
+        """
+        return sum(group["count"] for group in self.__select(
+            difficulty, category))
+
+    def __select(self, difficulty, category):
+        """
+        This method returns the index groups with the given difficulty (and
+        category if it is not None).
+        """
+        return [group for group in self.__groups
+                if group["difficulty"] == difficulty and
+                category in (None, group["category"])]
+
+    def question(self, position):
+        """
+        This method decodes and returns the question at the given position of
+        the index.
+        """
+        offset = self.__index[position]
+        end = self.__data.find(b"\n", offset)
+        return json.loads(self.__data[offset:end])
+
+    def fetch(self, difficulty, amount, category=None):
+        """
+        This method returns the given amount of randomly selected questions
+        with the given difficulty (and category if it is not None) in the
+        format of the opentdb.com api.
+        """
+        groups = self.__select(difficulty, category)
+        total = sum(group["count"] for group in groups)
+        # Random numbers over all selected groups are drawn and each number is
+        # translated to a position in the index. random.sample on a range
+        # does not create a list of all numbers.
+        positions = []
+        for number in random.sample(range(total), min(amount, total)):
+            for group in groups:
+                if number < group["count"]:
+                    positions.append(group["start"] + number)
+                    break
+                number -= group["count"]
+        return [self.question(position) for position in positions]
+
+
+# This imports question dumps into a store when the file gets executed by the
+# python interpreter.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Imports question dumps in the format of the opentdb.com "
+                    "api (.json or .jsonl) into a question store.")
+    parser.add_argument("dumps", nargs="+", help="dump files to import")
+    parser.add_argument("--output", default="questions",
+                        help="directory of the new store")
+    args = parser.parse_args()
+    total = import_dumps(args.dumps, args.output)
+    print(f"Imported {total} questions into {args.output}")
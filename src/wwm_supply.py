@@ -0,0 +1,117 @@
+import threading
+
+from wwm_gamelogic import question_key
+
+from wwm_seen import SeenIndex
+
+from wwm_sources import OpentdbSource
+
+
+###############################################################################
+# This code shares one supply of questions between many games that run in
+# different threads of the same process. Each thread keeps a small local cache
+# of questions for each category and difficulty and only takes a new batch
+# from the central pool when its cache is used up, so the threads rarely wait
+# for each other. The central pool retrieves large batches from the actual
+# source and hands out every question only once so that no two games get the
+# same question.
+###############################################################################
+class SharedSupply():
+    """
+    This class wraps a question source and can be used as question source
+    for any number of Quiz objects at the same time.
+    """
+    def __init__(self, source=None, batch_size=50, local_size=10,
+                 capacity=100000):
+        """
+        This method initializes a new supply for the given source (by default
+        the opentdb.com api). The central pool retrieves batch_size questions
+        at once and each thread takes local_size questions at once. The keys
+        of the last capacity questions that were handed out are remembered to
+        prevent duplicates.
+        """
+        if source is None:
+            source = OpentdbSource()
+        self.__source = source
+        self.__batch_size = batch_size
+        self.__local_size = local_size
+        # The central pool stores a list of questions for each category and
+        # difficulty. The lock is only held while a batch is moved.
+        self.__pools = {}
+        self.__lock = threading.Lock()
+        # Only one thread retrieves new questions for the same category and
+        # difficulty at a time while the other threads can still take
+        # questions of other categories and difficulties.
+        self.__fetch_locks = {}
+        # This variable stores the keys of all questions that were added to
+        # the central pool.
+        self.__issued = SeenIndex(capacity)
+        # Each thread has its own caches which are only used by this thread
+        # and therefore need no lock.
+        self.__local = threading.local()
+
+    def fetch(self, difficulty, amount, category=None):
+        """
+        This method returns up to the given amount of questions with the
+        given difficulty and category in the format of the opentdb.com api.
+        The questions are taken from the cache of the current thread which is
+        refilled from the central pool when needed.
+        """
+        if not hasattr(self.__local, "caches"):
+            self.__local.caches = {}
+        cache = self.__local.caches.setdefault((category, difficulty), [])
+        while len(cache) < amount:
+            batch = self.__take(category, difficulty,
+                                max(self.__local_size, amount - len(cache)))
+            # The source has no more new questions.
+            if not batch:
+                break
+            cache.extend(batch)
+        questions = cache[:amount]
+        del cache[:amount]
+        return questions
+
+    def __take(self, category, difficulty, amount):
+        """
+        This method removes up to the given amount of questions with the
+        given category and difficulty from the central pool and returns them.
+        If there are not enough questions in the pool a new batch is
+        retrieved from the source first.
+        """
+        key = (category, difficulty)
+        with self.__lock:
+            pool = self.__pools.setdefault(key, [])
+            if len(pool) >= amount:
+                return self.__pop(pool, amount)
+            fetch_lock = self.__fetch_locks.setdefault(key, threading.Lock())
+        with fetch_lock:
+            # Another thread might have refilled the pool while this thread
+            # waited for the lock.
+            with self.__lock:
+                if len(pool) >= amount:
+                    return self.__pop(pool, amount)
+            questions = self.__source.fetch(
+                difficulty, max(self.__batch_size, amount), category)
+            with self.__lock:
+                # Questions that were already handed out are skipped.
+                for question in questions:
+                    question_id = question_key(question["question"])
+                    if question_id in self.__issued:
+                        continue
+                    self.__issued.add(question_id)
+                    pool.append(question)
+                return self.__pop(pool, amount)
+
+    def __pop(self, pool, amount):
+        """
+        This method removes up to the given amount of questions from the end
+        of the given pool and returns them. The lock needs to be held.
+        """
+        questions = pool[-amount:]
+        del pool[-amount:]
+        return questions
+
+
+# This ensures that importing doesn't automatically run this code.
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,171 @@
+import queue
+import threading
+
+
+###############################################################################
+# This code is a bridge between blocking work and the tkinter window. Tkinter
+# can only be used from the thread that created the window and while a slow
+# operation (e.g. retrieving questions from the api) runs on that thread the
+# window freezes. Therefore this code runs such jobs on worker threads and
+# hands their results back to the tkinter mainloop by polling a thread-safe
+# queue with after().
+###############################################################################
+class Task():
+    """
+    This class represents one job that was submitted to the TaskRunner. It can
+    be used to cancel the job.
+    """
+    def __init__(self, job, args, on_done, on_error):
+        """
+        This method initializes a new task. It stores the job with its
+        arguments and the callbacks that are called in the tkinter mainloop
+        once the job is finished.
+        """
+        self.job = job
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        # This event is set when the task gets cancelled. An event is used
+        # because it can be safely read from the worker threads.
+        self.__cancelled = threading.Event()
+
+    def cancel(self):
+        """
+        This method cancels the task. A job that has not started yet is never
+        executed and the result of a running job is thrown away instead of
+        being passed to the callbacks.
+        """
+        self.__cancelled.set()
+
+    def cancelled(self):
+        """
+        This method returns whether the task was cancelled.
+        """
+        return self.__cancelled.is_set()
+
+
+class TaskRunner():
+    """
+    This class runs jobs on a few worker threads and calls the callbacks of
+    finished jobs in the tkinter mainloop so that they can safely update the
+    window.
+    """
+    def __init__(self, window, workers=2, poll_interval=50):
+        """
+        This method initializes the runner for the given tkinter window and
+        starts the worker threads. The poll interval in milliseconds defines
+        how often the mainloop checks for finished jobs while jobs are running.
+        """
+        self.__window = window
+        self.__poll_interval = poll_interval
+        # The jobs are passed to the worker threads with one queue and the
+        # results are passed back with another one.
+        self.__jobs = queue.Queue()
+        self.__results = queue.Queue()
+        # This variable tracks how many jobs are not yet handed back to the
+        # mainloop so that the queue is only polled while it is necessary.
+        self.__pending = 0
+        self.__polling = False
+        self.__workers = workers
+        # The worker threads are daemon threads so that a job that hangs (e.g.
+        # a network request) never prevents the program from exiting.
+        for _ in range(workers):
+            threading.Thread(target=self.__work, daemon=True).start()
+
+    def submit(self, job, *args, on_done=None, on_error=None):
+        """
+        This method runs job(*args) on a worker thread and returns a Task
+        object. When the job finishes on_done is called with its return value
+        or on_error is called with the raised exception in the mainloop.
+        """
+        task = Task(job, args, on_done, on_error)
+        self.__pending += 1
+        self.__jobs.put(task)
+        # Starts polling for results if this is not already happening.
+        if not self.__polling:
+            self.__polling = True
+            self.__window.after(self.__poll_interval, self.__poll)
+        return task
+
+    def busy(self):
+        """
+        This method returns whether there are jobs whose callbacks have not
+        been called yet.
+        """
+        return self.__pending > 0
+
+    def shutdown(self):
+        """
+        This method stops the worker threads after their current job. Jobs
+        that are still waiting are not executed anymore.
+        """
+        # The waiting jobs are removed and cancelled first because the
+        # worker threads would otherwise run all of them before they reach
+        # the None that stops them.
+        while True:
+            try:
+                task = self.__jobs.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                task.cancel()
+        # Each worker thread stops when it receives None.
+        for _ in range(self.__workers):
+            self.__jobs.put(None)
+
+    def __work(self):
+        """
+        This method is executed by each worker thread. It runs the submitted
+        jobs one after another and puts their results in the result queue.
+        """
+        while True:
+            task = self.__jobs.get()
+            if task is None:
+                break
+            # Cancelled tasks are skipped without running their job.
+            if task.cancelled():
+                self.__results.put((task, None, None))
+                continue
+            try:
+                self.__results.put((task, task.job(*task.args), None))
+            # Any exception is handed to the mainloop because it can not be
+            # handled sensibly on the worker thread.
+            except Exception as error:
+                self.__results.put((task, None, error))
+
+    def __poll(self):
+        """
+        This method is executed in the tkinter mainloop. It calls the
+        callbacks of all finished jobs and schedules itself again as long as
+        there are jobs that are not finished yet.
+        """
+        while True:
+            try:
+                task, result, error = self.__results.get_nowait()
+            except queue.Empty:
+                break
+            self.__pending -= 1
+            # The callbacks of cancelled tasks are not called because the
+            # window might not show the widgets they would update anymore.
+            if task.cancelled():
+                continue
+            if error is not None:
+                if task.on_error is not None:
+                    task.on_error(error)
+                # Without an error callback the exception is reported the
+                # same way tkinter reports exceptions raised in callbacks.
+                else:
+                    self.__window.report_callback_exception(
+                        type(error), error, error.__traceback__)
+            elif task.on_done is not None:
+                task.on_done(result)
+
+        if self.__pending > 0:
+            self.__window.after(self.__poll_interval, self.__poll)
+        else:
+            self.__polling = False
+
+
+# This ensures that importing doesn't automatically run this code.
+if __name__ == '__main__':
+    pass
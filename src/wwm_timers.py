@@ -0,0 +1,257 @@
+import math
+import time
+
+
+###############################################################################
+# This code schedules functions that are called at a given time (e.g. when the
+# time to answer a question is up) for any number of games. Instead of one
+# thread or one tkinter after call for each game, all timers are stored in a
+# hierarchical timer wheel which is advanced by one regular tick: The first
+# wheel has one slot for each of the next 256 ticks, the next wheels have 64
+# slots which each cover a whole turn of the previous wheel. Scheduling and
+# cancelling a timer and advancing by one tick take the same time however many
+# timers exist. The ticks are counted from a fixed starting time of the
+# monotonic clock, so delays of the tick itself do not add up (drift) but are
+# caught up with the next tick.
+###############################################################################
+# The number of bits of the slot index of each wheel. The first wheel has 256
+# slots and every further wheel 64 slots.
+WHEEL_BITS = (8, 6, 6, 6)
+
+
+class Timer():
+    """
+    This class implements a scheduled function call that can be cancelled.
+    """
+    __slots__ = ("tick", "callback", "wheel", "cancelled")
+
+    def __init__(self, tick, callback, wheel):
+        """
+        This method initializes a timer that calls the given function when
+        the given wheel reaches the given tick.
+        """
+        self.tick = tick
+        self.callback = callback
+        self.wheel = wheel
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        This method prevents that the function is called.
+        """
+        if not self.cancelled:
+            self.cancelled = True
+            self.wheel.discard(self)
+
+
+class TimerWheel():
+    """
+    This class stores timers in a hierarchical timer wheel. It does not use
+    threads itself: advance needs to be called regularly (e.g. by a
+    TimerDriver) and calls the functions of all timers that are due.
+    """
+    def __init__(self, resolution=0.1, clock=time.monotonic):
+        """
+        This method initializes an empty wheel whose ticks are resolution
+        seconds of the given clock apart.
+        """
+        self.__resolution = resolution
+        self.__clock = clock
+        self.__origin = clock()
+        # This variable counts the ticks that were processed.
+        self.__tick = 0
+        self.__wheels = [[[] for _ in range(1 << bits)]
+                         for bits in WHEEL_BITS]
+        # The first tick each wheel covers with one slot.
+        self.__shifts = [sum(WHEEL_BITS[:level])
+                         for level in range(len(WHEEL_BITS))]
+        # Timers that are too far in the future for all wheels.
+        self.__overflow = []
+        # Timers that were already due when they were scheduled.
+        self.__due = []
+        # The active timers (to know whether any are left).
+        self.__timers = set()
+
+    def __len__(self):
+        """
+        This method returns the number of active timers.
+        """
+        return len(self.__timers)
+
+    def now(self):
+        """
+        This method returns the current time of the clock of the wheel.
+        """
+        return self.__clock()
+
+    def time_of_tick(self, tick):
+        """
+        This method returns the time of the clock at which the given tick is
+        due.
+        """
+        return self.__origin + tick * self.__resolution
+
+    def next_tick(self):
+        """
+        This method returns the next tick that needs to be processed.
+        """
+        return self.__tick + 1
+
+    def schedule(self, when, callback):
+        """
+        This method schedules the given function to be called once the clock
+        reaches the given time and returns a Timer object to cancel it. The
+        function is never called earlier but up to about one tick later.
+        """
+        tick = math.ceil((when - self.__origin) / self.__resolution)
+        timer = Timer(tick, callback, self)
+        self.__timers.add(timer)
+        if tick <= self.__tick:
+            self.__due.append(timer)
+        else:
+            self.__place(timer)
+        return timer
+
+    def discard(self, timer):
+        """
+        This method removes a cancelled timer from the active timers. It
+        stays in its slot and is skipped when the slot is processed.
+        """
+        self.__timers.discard(timer)
+
+    def __place(self, timer):
+        """
+        This method puts the timer into the slot of the smallest wheel that
+        reaches its tick.
+        """
+        delta = timer.tick - self.__tick
+        for level, bits in enumerate(WHEEL_BITS):
+            shift = self.__shifts[level]
+            if delta < 1 << (shift + bits):
+                slots = self.__wheels[level]
+                slots[(timer.tick >> shift) & ((1 << bits) - 1)].append(timer)
+                return
+        self.__overflow.append(timer)
+
+    def __cascade(self):
+        """
+        This method moves the timers of the next slot of the larger wheels
+        into the smaller wheels whenever a smaller wheel completed a turn.
+        """
+        for level in range(1, len(WHEEL_BITS)):
+            shift = self.__shifts[level]
+            # The smaller wheel did not complete a turn.
+            if self.__tick & ((1 << shift) - 1):
+                return
+            slots = self.__wheels[level]
+            index = (self.__tick >> shift) & ((1 << WHEEL_BITS[level]) - 1)
+            timers, slots[index] = slots[index], []
+            for timer in timers:
+                if not timer.cancelled:
+                    self.__place(timer)
+            # The larger wheels only need to be checked if this wheel also
+            # completed a turn.
+            if index:
+                return
+        timers, self.__overflow = self.__overflow, []
+        for timer in timers:
+            if not timer.cancelled:
+                self.__place(timer)
+
+    def advance(self, now=None):
+        """
+        This method processes all ticks up to the given time (by default the
+        current time of the clock) and calls the functions of all timers that
+        are due. It returns the number of called functions.
+        """
+        if now is None:
+            now = self.__clock()
+        target = math.floor((now - self.__origin) / self.__resolution)
+        called = 0
+        due, self.__due = self.__due, []
+        for timer in due:
+            called += self.__fire(timer)
+        while self.__tick < target:
+            # Without timers the ticks do not need to be processed one by one.
+            if not self.__timers:
+                self.__tick = target
+                break
+            self.__tick += 1
+            self.__cascade()
+            slots = self.__wheels[0]
+            index = self.__tick & ((1 << WHEEL_BITS[0]) - 1)
+            timers, slots[index] = slots[index], []
+            for timer in timers:
+                called += self.__fire(timer)
+        return called
+
+    def __fire(self, timer):
+        """
+        This method calls the function of the given timer unless it was
+        cancelled and returns whether it was called.
+        """
+        if timer.cancelled:
+            return 0
+        timer.cancelled = True
+        self.__timers.discard(timer)
+        timer.callback()
+        return 1
+
+
+class TimerDriver():
+    """
+    This class advances a TimerWheel with the after method of a tkinter
+    window. Only one after call is pending at a time and only while there are
+    timers.
+    """
+    def __init__(self, window, wheel=None):
+        """
+        This method initializes the driver for the given tkinter window and
+        wheel (a new wheel with ticks of 0.1 seconds by default).
+        """
+        self.window = window
+        self.wheel = TimerWheel() if wheel is None else wheel
+        self.__pending = None
+
+    def schedule(self, when, callback):
+        """
+        This method schedules the given function like TimerWheel.schedule
+        and makes sure the wheel is advanced.
+        """
+        timer = self.wheel.schedule(when, callback)
+        if self.__pending is None:
+            self.__next()
+        return timer
+
+    def __next(self):
+        """
+        This method waits until the next tick. The delay is calculated from
+        the time of the tick so that it does not drift.
+        """
+        delay = self.wheel.time_of_tick(self.wheel.next_tick()) - \
+            self.wheel.now()
+        self.__pending = self.window.after(max(math.ceil(delay * 1000), 0),
+                                           self.__tick)
+
+    def __tick(self):
+        """
+        This method advances the wheel and waits for the next tick if there
+        are still timers.
+        """
+        self.__pending = None
+        self.wheel.advance()
+        if len(self.wheel) and self.__pending is None:
+            self.__next()
+
+    def stop(self):
+        """
+        This method stops advancing the wheel.
+        """
+        if self.__pending is not None:
+            self.window.after_cancel(self.__pending)
+            self.__pending = None
+
+
+# This ensures that importing doesn't automatically run this code.
+if __name__ == '__main__':
+    pass
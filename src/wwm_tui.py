@@ -0,0 +1,560 @@
+import argparse
+import curses
+import html
+import math
+import textwrap
+import time
+
+from wwm_calibrate import DifficultyTable
+
+from wwm_gamelogic import Quiz
+
+from wwm_ladders import LadderVariants
+
+from wwm_leaderboard import Leaderboard, game_record
+
+from wwm_practice import PracticeDeck, PracticeSession
+
+from wwm_qualifier import Qualifier, draw_question, stamp
+
+from wwm_seen import SeenIndex
+
+from wwm_store import QuestionStore
+
+
+###############################################################################
+# This code is a user interface for the terminal. It uses curses instead of
+# tkinter and does not need Pillow or matplotlib, so it starts quickly, needs
+# little memory and can also be played over ssh. It uses the same Quiz class
+# as the window of wwm.py: the question and the answers are shown on the
+# left, the possible winnings and the jokers on the right and the tips of the
+# jokers below the answers (the audience vote as a bar chart of characters).
+#
+# Keys: a-d answer, 1-3 use a joker, s surrender, q quit. If a practice deck
+# is used the missed questions can be practiced with p on the starting page.
+# With several players a fastest finger first round decides who plays: each
+# player answers with one row of keys (see KEY_ROWS).
+###############################################################################
+# The width of the column with the winnings and the jokers on the right.
+SIDEBAR_WIDTH = 24
+# The jokers with the key that uses them and the input for the Quiz object.
+JOKERS = (("1", "50:50 Joker", "__joker_50:50"),
+          ("2", "Audience Joker", "__joker_audience"),
+          ("3", "Phone Joker", "__joker_phone"))
+# The keys the players use to choose the answers A-D in the fastest finger
+# first round.
+KEY_ROWS = ("1234", "qwer", "asdf", "zxcv")
+# The number of seconds the players have to answer in the fastest finger
+# first round.
+QUALIFIER_SECONDS = 20
+
+
+def put(window, y, x, text, attributes=curses.A_NORMAL):
+    """
+    This function writes the given text at the given position of the window
+    and cuts it off at the edge of the window. Text that does not fit into a
+    small terminal is skipped instead of raising an error.
+    """
+    height, width = window.getmaxyx()
+    if not 0 <= y < height or not 0 <= x < width:
+        return
+    try:
+        window.addstr(y, x, text[:width - x - 1], attributes)
+    except curses.error:
+        pass
+
+
+def audience_chart(tip, answers, width):
+    """
+    This function returns the lines of a bar chart for the result of an
+    audience joker. Each line contains the letter of the answer, a bar of
+    characters and the percentage.
+    """
+    lines = []
+    for answer, percentage in tip:
+        letter = "ABCD"[answers.index(answer)]
+        bar = "#" * round(percentage * (width - 8) / 100)
+        lines.append(f"{letter} {bar:<{width - 8}} {percentage:>3}%")
+    return lines
+
+
+class QuizTerminal():
+    """
+    This class shows the game in the terminal and handles the keys the player
+    presses.
+    """
+    def __init__(self, screen, quiz_factory, leaderboard=None,
+                 player="Player", practice=None, players=None, source=None,
+                 ladders=None):
+        """
+        This method initializes the user interface for the given curses
+        screen. Each new game is created by calling quiz_factory with the name
+        of the player. If a Leaderboard is given the result of each game is
+        recorded for the player. If a PlayerDeck is given as practice the
+        player can practice the due questions. If a list of up to four
+        players is given, a fastest finger first round with a question from
+        the given source (by default the opentdb.com api) decides who plays
+        each game. If LadderVariants are given the result of each game is
+        added to the results of the variant of its ladder.
+        """
+        self.screen = screen
+        self.quiz_factory = quiz_factory
+        self.leaderboard = leaderboard
+        self.player = player
+        self.practice = practice
+        self.players = players
+        self.source = source
+        self.ladders = ladders
+        # Hides the cursor if the terminal supports it.
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+
+    def run(self):
+        """
+        This method shows the starting page and plays games until the player
+        quits.
+        """
+        while True:
+            choice = self.start_page()
+            if choice == "q":
+                return
+            if choice == "p":
+                if not self.play_practice(PracticeSession(self.practice)):
+                    return
+                continue
+            if self.players:
+                winner = self.qualify()
+                if winner is None:
+                    continue
+                self.player = winner
+            quiz = self.load_game()
+            if quiz is None:
+                continue
+            started_at = time.monotonic()
+            if not self.play(quiz):
+                return
+            if self.leaderboard is not None:
+                self.leaderboard.add(game_record(
+                    quiz.status(), self.player,
+                    time.monotonic() - started_at))
+            if self.ladders is not None:
+                self.ladders.record(quiz.status())
+            if not self.result_page(quiz.status()):
+                return
+
+    def wait_for(self, keys):
+        """
+        This method waits until the player presses one of the given keys and
+        returns it. If the screen has a timeout (see curses timeout) and no key
+        is pressed in time None is returned.
+        """
+        while True:
+            try:
+                key = self.screen.getkey().lower()
+            except curses.error:
+                return None
+            if key in keys:
+                return key
+
+    def show_text(self, lines, hint):
+        """
+        This method clears the screen and shows the given lines (wrapped to
+        the width of the terminal) and a hint at the bottom.
+        """
+        self.screen.erase()
+        height, width = self.screen.getmaxyx()
+        y = 1
+        for line in lines:
+            for part in textwrap.wrap(line, max(width - 4, 10)) or [""]:
+                put(self.screen, y, 2, part)
+                y += 1
+        put(self.screen, height - 2, 2, hint, curses.A_BOLD)
+        self.screen.refresh()
+
+    def start_page(self):
+        """
+        This method shows some information about the game and returns the
+        key the player pressed: Enter to start a new game, p to practice or
+        q to quit.
+        """
+        keys = ["\n", "q"]
+        hint = "Press Enter to start a new game or q to quit."
+        due = 0 if self.practice is None else self.practice.due_count()
+        if due:
+            keys.append("p")
+            hint = (f"Press Enter to start a new game, p to practice "
+                    f"{due} missed questions or q to quit.")
+        self.show_text(
+            ["WHO WANTS TO BE A MILLIONAIRE?", "",
+             "Each question you answer correctly lets you take home more "
+             "money. But beware, if you give an incorrect answer you might "
+             "lose everything.", "",
+             "If you struggle with a question you can always surrender and "
+             "take home the money you already won. You can also use one of "
+             "three jokers that might help you with your answer. Or you can "
+             "risk falling back on the security levels from question 5 or "
+             "10.", "", "Good Luck!"],
+            hint)
+        return self.wait_for(keys)
+
+    def load_game(self):
+        """
+        This method creates a new Quiz object and returns it. If the
+        questions could not be retrieved the error is shown and None is
+        returned.
+        """
+        self.show_text(["Loading Questions ..."], "")
+        try:
+            return self.quiz_factory(self.player)
+        except Exception as error:
+            self.show_text(["Loading Failed:", str(error)],
+                           "Press Enter to go back.")
+            self.wait_for(("\n",))
+            return None
+
+    def qualify(self):
+        """
+        This method plays a fastest finger first round and returns the
+        winning player (or None if nobody answered correctly or the question
+        could not be retrieved).
+        """
+        self.show_text(["Loading Question ..."], "")
+        try:
+            qualifier = Qualifier(draw_question(self.source), self.players)
+        except Exception as error:
+            self.show_text(["Loading Failed:", str(error)],
+                           "Press Enter to go back.")
+            self.wait_for(("\n",))
+            return None
+        question, answers = qualifier.question()
+        keys = {key: (player, answers[index])
+                for player, row in zip(self.players, KEY_ROWS)
+                for index, key in enumerate(row)}
+        # Keys pressed before the question is shown do not count.
+        curses.flushinp()
+        self.screen.timeout(100)
+        deadline = time.monotonic() + QUALIFIER_SECONDS
+        shown = False
+        try:
+            while qualifier.waiting() and time.monotonic() < deadline:
+                self.screen.erase()
+                self.draw_question(question, answers, [])
+                x = self.screen.getmaxyx()[1] - SIDEBAR_WIDTH
+                put(self.screen, 1, x, "FASTEST FINGER FIRST",
+                    curses.A_BOLD)
+                for index, (player, row) in enumerate(
+                        zip(self.players, KEY_ROWS)):
+                    answered = player not in qualifier.waiting()
+                    put(self.screen, 3 + index, x,
+                        f"{row} {player[:SIDEBAR_WIDTH - 7]}"
+                        f"{' *' if answered else ''}")
+                put(self.screen, self.screen.getmaxyx()[0] - 2, 2,
+                    f"{int(deadline - time.monotonic()):>2} seconds left",
+                    curses.A_BOLD)
+                self.screen.refresh()
+                # The reaction times start when the question is visible.
+                if not shown:
+                    qualifier.show()
+                    shown = True
+                try:
+                    key = self.screen.getkey().lower()
+                except curses.error:
+                    continue
+                # The time is taken right after the key arrived so that
+                # drawing the screen does not change the result.
+                timestamp = stamp()
+                if key in keys:
+                    player, answer = keys[key]
+                    qualifier.submit(player, answer, timestamp)
+        finally:
+            self.screen.timeout(-1)
+
+        winner, tied = qualifier.winner()
+        lines = []
+        for result in qualifier.results():
+            lines.append(f"{result['player']}: "
+                         f"{result['reaction_ns'] / 1e9:.3f} seconds "
+                         f"({'correct' if result['correct'] else 'wrong'})")
+        if winner is None:
+            lines += ["", "Nobody answered correctly."]
+        else:
+            if len(tied) > 1:
+                lines += ["", f"{', '.join(tied)} were equally fast, the lot "
+                              f"decided."]
+            lines += ["", f"{winner} plays the game!"]
+        self.show_text(lines, "Press Enter to continue.")
+        self.wait_for(("\n",))
+        return winner
+
+    def play(self, quiz):
+        """
+        This method asks the questions of the given game until it is over and
+        returns False if the player quits the program.
+        """
+        while quiz.status()["state"] == "playing":
+            if not self.ask(quiz, self.draw_ladder, True):
+                return False
+        return True
+
+    def play_practice(self, session):
+        """
+        This method asks the questions of the given PracticeSession until all
+        were answered, shows the result and returns False if the player quits
+        the program.
+        """
+        while session.status()["state"] == "playing":
+            if not self.ask(session, self.draw_progress, False):
+                return False
+        status = session.status()
+        self.show_text(["Practice finished!",
+                        f"You answered {status['correct']} of "
+                        f"{status['total']} questions correctly."],
+                       "Press Enter to go back to the start or q to quit.")
+        return self.wait_for(("\n", "q")) == "\n"
+
+    def ask(self, quiz, draw_sidebar, surrender):
+        """
+        This method asks the current question of the given game (a Quiz or a
+        PracticeSession) until the player answers it (or surrenders if
+        possible) or the time is up and returns False if the player quits the
+        program. The given function draws the sidebar.
+        """
+        questionobj, question, answers, tips = quiz.ask_question()
+        shown_tips = []
+        # With a time limit the page is drawn again several times a second to
+        # show the remaining time.
+        deadline = quiz.deadline()
+        if deadline is not None:
+            self.screen.timeout(250)
+        try:
+            while True:
+                status = quiz.status()
+                self.screen.erase()
+                self.draw_question(question, answers, shown_tips)
+                draw_sidebar(status)
+                if deadline is not None:
+                    put(self.screen, self.screen.getmaxyx()[0] - 3, 2,
+                        f"{max(math.ceil(deadline - time.monotonic()), 0)} "
+                        f"seconds left", curses.A_BOLD)
+                self.screen.refresh()
+                available = [key for key, name, _ in JOKERS
+                             if name in status["jokers"]]
+                letters = [letter for letter, answer in zip("abcd", answers)
+                           if not answer.startswith("DELETED")]
+                key = self.wait_for(letters + available +
+                                    ["q", "key_resize"] +
+                                    (["s"] if surrender else []))
+                # No key was pressed in time. The game ends when the time is
+                # up.
+                if key is None:
+                    if quiz.expire():
+                        return True
+                    continue
+                # The page is drawn again when the terminal is resized.
+                if key == "key_resize":
+                    continue
+                if key == "q":
+                    return False
+                if key == "s":
+                    given_input = "__surrender"
+                elif key in available:
+                    given_input = JOKERS[int(key) - 1][2]
+                else:
+                    given_input = answers["abcd".index(key)]
+                evaluation = quiz.evaluate_answer(questionobj, given_input)
+                # Surrendering or answering the question returns None.
+                if evaluation is None:
+                    return True
+                questionobj, question, answers, tips = evaluation
+                if tips != "fifty-fifty":
+                    shown_tips.append(tips)
+        finally:
+            self.screen.timeout(-1)
+
+    def draw_question(self, question, answers, tips):
+        """
+        This method draws the current question, its answers and the tips of
+        the used jokers.
+        """
+        height, width = self.screen.getmaxyx()
+        text_width = max(width - SIDEBAR_WIDTH - 4, 20)
+
+        # The question and the answers without html escape characters. The
+        # answers deleted by the fifty-fifty joker are left empty.
+        y = 1
+        for line in textwrap.wrap(html.unescape(question), text_width):
+            put(self.screen, y, 2, line, curses.A_BOLD)
+            y += 1
+        y += 1
+        for letter, answer in zip("ABCD", answers):
+            if not answer.startswith("DELETED"):
+                put(self.screen, y, 2,
+                    f"{letter}: {html.unescape(answer)}")
+            y += 1
+        y += 1
+
+        # The tip of the audience joker is a list and the tip of the phone
+        # joker is an answer.
+        for tip in tips:
+            if isinstance(tip, list):
+                put(self.screen, y, 2, "Audience Vote:")
+                y += 1
+                for line in audience_chart(tip, answers, min(text_width, 50)):
+                    put(self.screen, y, 2, line)
+                    y += 1
+            else:
+                put(self.screen, y, 2,
+                    f"Phone: I think it is: {html.unescape(tip)}!")
+                y += 1
+            y += 1
+
+    def draw_jokers(self, status, y):
+        """
+        This method draws the jokers in the sidebar starting at the given
+        line. The jokers that were already used are crossed out.
+        """
+        x = self.screen.getmaxyx()[1] - SIDEBAR_WIDTH
+        for index, (key, name, _) in enumerate(JOKERS):
+            if name in status["jokers"]:
+                put(self.screen, y + index, x, f"[{key}] {name}")
+            else:
+                put(self.screen, y + index, x, f" x  {name}",
+                    curses.A_DIM)
+
+    def draw_ladder(self, status):
+        """
+        This method draws the possible winnings, the jokers and the keys of a
+        game.
+        """
+        height, width = self.screen.getmaxyx()
+        # The winnings from the highest to the lowest. The current round is
+        # highlighted and the rounds with a safety net are marked.
+        x = width - SIDEBAR_WIDTH
+        for game_round in range(15, 0, -1):
+            attributes = curses.A_NORMAL
+            if game_round == status["round"]:
+                attributes = curses.A_REVERSE
+            elif game_round in status["secure_step"]:
+                attributes = curses.A_BOLD
+            put(self.screen, 16 - game_round, x,
+                f"{game_round:>2}  "
+                f"{status['ladder'].labels[game_round - 1]:>9}",
+                attributes)
+        self.draw_jokers(status, 17)
+        put(self.screen, height - 2, 2,
+            f"a-d: answer   1-3: joker   s: surrender and take "
+            f"{status['ladder'].label(status['current_payout'])}   q: quit",
+            curses.A_BOLD)
+
+    def draw_progress(self, status):
+        """
+        This method draws the progress, the jokers and the keys of a practice
+        game.
+        """
+        height, width = self.screen.getmaxyx()
+        x = width - SIDEBAR_WIDTH
+        put(self.screen, 1, x, "PRACTICE", curses.A_BOLD)
+        put(self.screen, 3, x,
+            f"Question {status['round']} of {status['total']}")
+        put(self.screen, 4, x, f"Correct: {status['correct']}")
+        self.draw_jokers(status, 6)
+        put(self.screen, height - 2, 2,
+            "a-d: answer   1-3: joker   q: quit", curses.A_BOLD)
+
+    def result_page(self, status):
+        """
+        This method shows the result of the game and returns whether the
+        player wants to go back to the starting page.
+        """
+        if status["state"] == "surrendered":
+            lines = [f"You surrendered in Round {status['round']}!"]
+        elif status["state"] == "lost":
+            lines = [f"You lost in Round {status['round']}!"]
+        else:
+            lines = ["You answered all 15 questions correct!"]
+        lines.append(f"You will therefore take home: "
+                     f"{status['ladder'].label(status['payout'])}")
+        self.show_text(lines, "Press Enter to go back to the start or q to "
+                              "quit.")
+        return self.wait_for(("\n", "q")) == "\n"
+
+
+# This parses the command line arguments and starts the user interface in the
+# terminal when the file gets executed by the python interpreter.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Who wants to be a millionaire? in the terminal")
+    parser.add_argument("--store",
+                        help="directory of a question store created with "
+                             "wwm_store.py to use instead of the opentdb.com "
+                             "api")
+    parser.add_argument("--seen", metavar="FILE",
+                        help="file that stores which questions were recently "
+                             "asked")
+    parser.add_argument("--leaderboard", metavar="FILE",
+                        help="database that records the result of each game")
+    parser.add_argument("--player", default="Player",
+                        help="name of the player in the leaderboard")
+    parser.add_argument("--practice", metavar="FILE",
+                        help="file that stores the missed questions of each "
+                             "player to practice them")
+    parser.add_argument("--round-seconds", type=float, metavar="SECONDS",
+                        help="time to answer each question (default: no "
+                             "limit)")
+    parser.add_argument("--timeout-state", choices=("lost", "surrendered"),
+                        default="lost",
+                        help="whether running out of time counts as a wrong "
+                             "answer (lost) or as surrendering")
+    parser.add_argument("--ladders", metavar="FILE",
+                        help="json file with payout ladders to assign the "
+                             "players to (see wwm_ladders.py)")
+    parser.add_argument("--ladder-results", metavar="FILE",
+                        help="file that stores the results of the games of "
+                             "each ladder")
+    parser.add_argument("--players", metavar="NAME,NAME",
+                        help="up to four players that play a fastest finger "
+                             "first round before each game")
+    parser.add_argument("--difficulties", metavar="FILE",
+                        help="difficulty table created with "
+                             "wwm_calibrate.py to ask the questions of a "
+                             "game from the easiest to the hardest")
+    parser.add_argument("--time-budget", type=float, default=20,
+                        metavar="SECONDS",
+                        help="maximum time to retrieve the questions of one "
+                             "game (default 20)")
+    args = parser.parse_args()
+    source = QuestionStore(args.store) if args.store else None
+    seen = SeenIndex(path=args.seen)
+    leaderboard = Leaderboard(args.leaderboard) if args.leaderboard else None
+    deck = PracticeDeck(args.practice) if args.practice else None
+    ladders = None
+    if args.ladders:
+        ladders = LadderVariants.from_file(args.ladders, args.ladder_results)
+    players = args.players.split(",")[:len(KEY_ROWS)] if args.players \
+        else None
+    difficulties = DifficultyTable.load(args.difficulties) \
+        if args.difficulties else None
+    try:
+        curses.wrapper(lambda screen: QuizTerminal(
+            screen,
+            lambda player: Quiz(
+                source, seen=seen, time_budget=args.time_budget,
+                practice=deck.player(player) if deck is not None else None,
+                round_seconds=args.round_seconds,
+                timeout_state=args.timeout_state,
+                ladder=ladders.assign(player) if ladders is not None
+                else None,
+                difficulties=difficulties),
+            leaderboard, args.player,
+            deck.player(args.player) if deck is not None else None,
+            players, source, ladders).run())
+    finally:
+        seen.save()
+        if deck is not None:
+            deck.save()
+        if leaderboard is not None:
+            leaderboard.close()
+        if ladders is not None:
+            ladders.save()
@@ -1,13 +1,19 @@
+import base64
 import ctypes
+import hashlib
+import io
 import os
 import tkinter as tk
+import tkinter.font as font
 
-from PIL import Image
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 
 ###############################################################################
 # This code is a helper for the user interface: It sets up the window
-# properties, handles the joker images and creates the layout for each page.
+# properties, handles the joker images, creates the layout for each page and
+# the sidebars that are shared by all pages.
 ###############################################################################
 def setup_window_properties(self):
     """
@@ -40,76 +46,179 @@ def setup_window_properties(self):
     # Adds an icon to the window. Uses os.path.join() to make the program
     # operating system independent. This icon was downloaded from:
     # https://freebiesupply.com/logos/who-wants-to-be-a-millionaire-logo/
-    self.iconbitmap(os.path.join("assets", "wwtbam.ico"))
+    # Icons in the ico format can only be used on windows and therefore the
+    # window keeps its default icon on other OS.
+    try:
+        self.iconbitmap(os.path.join("assets", "wwtbam.ico"))
+    except tk.TclError:
+        pass
+
+
+# The names of the joker images (without file extension) in the order in which
+# they are placed next to each other in the cached sprite sheet.
+SPRITES = ("5050", "audience", "phone",
+           "5050_crossed", "audience_crossed", "phone_crossed")
+# The size (width, height) every joker image is resized to so that it fits the
+# window.
+SPRITE_SIZE = (70, 38)
 
 
-def store_images():
+def sprite_sheet_path():
+    """
+    This function returns the path of the cached sprite sheet. The file name
+    contains a hash of all source images and of the sprite size so that a new
+    sprite sheet is built automatically whenever one of them changes.
+    """
+    digest = hashlib.sha256(repr(SPRITE_SIZE).encode())
+    for name in SPRITES:
+        with open(os.path.join("assets", name + ".gif"), "rb") as file:
+            digest.update(file.read())
+    return os.path.join("assets", "cache",
+                        f"jokers_{digest.hexdigest()[:16]}.png")
+
+
+def build_sprite_sheet(path):
     """
     This function converts and resizes all images needed to display the jokers
-    in their appropriate size in a dictionary and returns the whole dictionary.
-    """
-    # Opens each image, converts it into a compatible mode and resizes it so
-    # that it fits the window.
-    files = {"5050":
-             Image.open(os.path.join("assets", "5050.gif"))
-             .convert(mode="RGBA").resize((70, 38)),
-             "audience":
-             Image.open(os.path.join("assets", "audience.gif"))
-             .convert(mode="RGBA").resize((70, 38)),
-             "phone":
-             Image.open(os.path.join("assets", "phone.gif"))
-             .convert(mode="RGBA").resize((70, 38)),
-             "5050_crossed":
-             Image.open(os.path.join("assets", "5050_crossed.gif"))
-             .convert(mode="RGBA").resize((70, 38)),
-             "audience_crossed":
-             Image.open(os.path.join("assets", "audience_crossed.gif"))
-             .convert(mode="RGBA").resize((70, 38)),
-             "phone_crossed":
-             Image.open(os.path.join("assets", "phone_crossed.gif"))
-             .convert(mode="RGBA").resize((70, 38))}
+    and pastes them next to each other into one sprite sheet which is saved as
+    png file under the given path.
+    """
+    # PIL is only needed to build the sprite sheet once. Afterwards tkinter can
+    # load the png file directly and therefore it is only imported here.
+    from PIL import Image
+
+    width, height = SPRITE_SIZE
+    sheet = Image.new("RGBA", (width * len(SPRITES), height))
+    # Opens each image, converts it into a compatible mode, resizes it and
+    # pastes it at its position in the sprite sheet.
+    for index, name in enumerate(SPRITES):
+        image = Image.open(os.path.join("assets", name + ".gif")) \
+            .convert(mode="RGBA").resize(SPRITE_SIZE)
+        sheet.paste(image, (index * width, 0))
+
+    # The sprite sheet is first written to a temporary file and then renamed
+    # so that another process never reads a half written file.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    sheet.save(temporary_path, format="PNG")
+    os.replace(temporary_path, path)
+
+
+def prepare_sprite_sheet():
+    """
+    This function builds the cached sprite sheet if it does not exist yet and
+    returns its path. It does not use tkinter and can therefore be executed on
+    a worker thread.
+    """
+    path = sprite_sheet_path()
+    if not os.path.exists(path):
+        build_sprite_sheet(path)
+    return path
+
+
+def read_sprite_sheet():
+    """
+    This function builds the cached sprite sheet if needed and returns its
+    content encoded in base64 as tkinter expects it for the data of an image.
+    It does not use tkinter, so a process can read the sprite sheet once
+    before it starts other processes that create windows (see
+    wwm_forkserver).
+    """
+    with open(prepare_sprite_sheet(), "rb") as file:
+        return base64.b64encode(file.read()).decode("ascii")
+
+
+def store_images(self, path=None, data=None):
+    """
+    This function gets passed the tkinter window and the path of the sprite
+    sheet (or its data, see read_sprite_sheet) and returns a dictionary with
+    one tkinter image for each joker image that is cut out of the sprite
+    sheet.
+    """
+    # Loads the whole sprite sheet once and copies each joker image into its
+    # own tkinter image.
+    if data is not None:
+        sheet = tk.PhotoImage(master=self, data=data)
+    else:
+        sheet = tk.PhotoImage(master=self, file=path)
+    width, height = SPRITE_SIZE
+    files = {}
+    for index, name in enumerate(SPRITES):
+        image = tk.PhotoImage(master=self, width=width, height=height)
+        image.tk.call(image, "copy", sheet,
+                      "-from", index * width, 0, (index + 1) * width, height)
+        files[name] = image
 
     # Returns the dictionary.
     return files
 
 
-def page_layout(self, page_indicator):
+def render_audience(tips, answers):
+    """
+    This function plots the result of an audience joker as a bar chart and
+    returns it as png image encoded in base64 which tkinter can display. It
+    does not use tkinter nor the global state of pyplot and can therefore be
+    executed on a worker thread.
+    """
+    # Creates a new plot and sets its properties.
+    fig = Figure(figsize=(3, 3), dpi=100)
+    axes = fig.add_subplot()
+    axes.set_title('Audience Vote')
+    fig.subplots_adjust(bottom=0.2, top=0.8)
+    # Retrieves the data to be plotted.
+    answer = [x[0] for x in tips]
+    percentage = [x[1] for x in tips]
+    # Plots the data.
+    axes.bar(answer, percentage, align='center')
+    # Displays only the character instead of the whole answer on the plot.
+    axes.set_xticks(axes.get_xticks())
+    if len(axes.get_xticks()) == 4:
+        xticklabels = ["A", "B", "C", "D"]
+    else:
+        xticklabels = []
+        for a in answer:
+            if a in answers[0]:
+                xticklabels.append("A")
+            elif a in answers[1]:
+                xticklabels.append("B")
+            elif a in answers[2]:
+                xticklabels.append("C")
+            else:
+                xticklabels.append("D")
+    axes.set_xticklabels(xticklabels)
+    # Renders the plot into a png image in memory.
+    buffer = io.BytesIO()
+    FigureCanvasAgg(fig).print_png(buffer)
+    return base64.b64encode(buffer.getvalue())
+
+
+def page_layout(self, page_indicator, hidden=False):
     """
     This function gets passed the tkinter window and creates and places the
     different frames that divide the window into several parts. The frames and
     their position depend on the page it should create the layout for
-    (page_indicator). In the end it returns the created frames.
+    (page_indicator). In the end it returns the created frames. If hidden is
+    True the page is not displayed until show_page is called so that it can be
+    prepared in advance.
     """
     # This creates the main frame with the window being its parent and a
     # borderwidth of 0.
     main = tk.Frame(self,  bd=0)
-    # Then the main frame is sized (relative height & relative width) and
-    # positioned (relative x & relative y) relative to its parent.
-    main.place(relheight=1, relwidth=1, relx=0, rely=0)
+    if not hidden:
+        show_page(main)
 
     # This creates different smaller frames with the main frame being their
     # parent and borderwidth of 0. It then sizes (relative height & relative
     # width) and positions (relative x & relative y) these frames relative to
-    # their parent. Additionally it configures the rows and columns for some
-    # frames which influences how items can be placed within these frames.
+    # their parent.
     main_top = tk.Frame(main, bd=0)
-    main_top.place(relheight=5/6, relwidth=7/9, relx=0, rely=0)
+    main_top.place(relheight=5/6, relwidth=1, relx=0, rely=0)
     main_bottom = tk.Frame(main, bd=0)
-    main_bottom.place(relheight=1/6, relwidth=7/9, relx=0, rely=5/6)
-    sidebar_jokers = tk.Frame(main, bd=0)
-    sidebar_jokers.place(relheight=1/6, relwidth=2/9, relx=7/9, rely=0)
-    for num in range(2):
-        sidebar_jokers.grid_rowconfigure(num, weight=1)
-        sidebar_jokers.grid_columnconfigure(num, weight=1)
-    sidebar_winnings = tk.Frame(main, height=400, width=200, bd=0)
-    sidebar_winnings.place(relheight=5/6, relwidth=2/9, relx=7/9, rely=1/6)
-    for num in range(16):
-        sidebar_winnings.grid_rowconfigure(num, weight=1)
-    sidebar_winnings.grid_columnconfigure(0, weight=1)
+    main_bottom.place(relheight=1/6, relwidth=1, relx=0, rely=5/6)
 
     # Here the thickness and color of the highlight is set which can be
     # understood as a kind of a border that separates frames.
-    for frame in [main_top, main_bottom, sidebar_jokers, sidebar_winnings]:
+    for frame in [main_top, main_bottom]:
         frame["highlightbackground"] = "white"
         frame["highlightthickness"] = 1
 
@@ -117,23 +226,25 @@ def page_layout(self, page_indicator):
     # functions for the individual layouts are called and their return is
     # returned.
     if page_indicator == "start":
-        return page_start(main_top,
-                          main_bottom,
-                          sidebar_jokers,
-                          sidebar_winnings)
+        return page_start(main_top, main_bottom)
     elif page_indicator == "game":
-        return page_game(main_top,
-                         main_bottom,
-                         sidebar_jokers,
-                         sidebar_winnings)
+        return page_game(main_top, main_bottom)
     else:
-        return page_result(main_top,
-                           main_bottom,
-                           sidebar_jokers,
-                           sidebar_winnings)
+        return page_result(main_top, main_bottom)
 
 
-def page_start(main_top, main_bottom, sidebar_jokers, sidebar_winnings):
+def show_page(main):
+    """
+    This function displays the main frame of a page. The main frame is sized
+    (relative height & relative width) and positioned (relative x & relative
+    y) relative to its parent. It leaves space on the right for the sidebars
+    which are created only once by the Sidebar class and stay the same for
+    all pages.
+    """
+    main.place(relheight=1, relwidth=7/9, relx=0, rely=0)
+
+
+def page_start(main_top, main_bottom):
     """
     This function creates and places the frames for the starting page and
     returns them.
@@ -166,12 +277,10 @@ def page_start(main_top, main_bottom, sidebar_jokers, sidebar_winnings):
     return (main_top_1,
             main_top_2,
             main_top_3,
-            main_bottom,
-            sidebar_jokers,
-            sidebar_winnings)
+            main_bottom)
 
 
-def page_game(main_top, main_bottom, sidebar_jokers, sidebar_winnings):
+def page_game(main_top, main_bottom):
     """
     This function creates and places the frames for the game page and
     returns them.
@@ -212,8 +321,6 @@ def page_game(main_top, main_bottom, sidebar_jokers, sidebar_winnings):
 
     # All necessary frames are returned.
     return (main_top,
-            sidebar_jokers,
-            sidebar_winnings,
             main_top_1,
             main_graph_l,
             main_graph_2,
@@ -223,7 +330,7 @@ def page_game(main_top, main_bottom, sidebar_jokers, sidebar_winnings):
             main_bottom_2)
 
 
-def page_result(main_top, main_bottom, sidebar_jokers, sidebar_winnings):
+def page_result(main_top, main_bottom):
     """
     This function creates and places the frames for the result page and
     returns them.
@@ -244,11 +351,157 @@ def page_result(main_top, main_bottom, sidebar_jokers, sidebar_winnings):
     # All necessary frames are returned.
     return (main_top_1,
             main_top_2,
-            main_bottom,
-            sidebar_jokers,
-            sidebar_winnings)
+            main_bottom)
+
+
+class Sidebar():
+    """
+    This class creates the two sidebars that show the joker images and the
+    possible winnings. They are created only once for the tkinter window and
+    stay the same when switching pages. Afterwards only the labels whose
+    appearance changes with the game status are updated.
+    """
+    def __init__(self, window, images):
+        """
+        This method creates and places the sidebar frames and all labels they
+        contain. The labels are empty until the status of a game is shown for
+        the first time.
+        """
+        self.__images = images
+        # This creates the sidebar frames with the window being their parent
+        # and a borderwidth of 0. It then sizes (relative height & relative
+        # width) and positions (relative x & relative y) them relative to the
+        # window and configures their rows and columns.
+        self.jokers = tk.Frame(window, bd=0)
+        self.jokers.place(relheight=1/6, relwidth=2/9, relx=7/9, rely=0)
+        for num in range(2):
+            self.jokers.grid_rowconfigure(num, weight=1)
+            self.jokers.grid_columnconfigure(num, weight=1)
+        self.winnings = tk.Frame(window, height=400, width=200, bd=0)
+        self.winnings.place(relheight=5/6, relwidth=2/9, relx=7/9, rely=1/6)
+        for num in range(16):
+            self.winnings.grid_rowconfigure(num, weight=1)
+        self.winnings.grid_columnconfigure(0, weight=1)
+        # Here the thickness and color of the highlight is set which can be
+        # understood as a kind of a border that separates frames.
+        for frame in (self.jokers, self.winnings):
+            frame["highlightbackground"] = "white"
+            frame["highlightthickness"] = 1
+
+        # Creates one label for each joker and positions it. The dictionary
+        # maps the joker names used by the game logic to the label and the
+        # name of its image.
+        self.__joker_labels = {}
+        for name, image, position in (
+                ("50:50 Joker", "5050", {"row": 1, "column": 0}),
+                ("Audience Joker", "audience", {"row": 0, "columnspan": 2}),
+                ("Phone Joker", "phone", {"row": 1, "column": 1})):
+            label = tk.Label(self.jokers)
+            label.grid(**position)
+            self.__joker_labels[name] = (label, image)
+
+        # All winnings labels share the same font.
+        winnings_font = font.Font(family="Helvetica", size=14)
+        # Placeholder label to position the winnings labels properly.
+        tk.Label(
+            self.winnings, text=" "*30, borderwidth=2, font=winnings_font
+        ).grid(row=0, column=0)
+        # Creates one label for each winning amount. The highest amount is
+        # shown at the bottom.
+        self.__winnings_labels = []
+        for index in range(15):
+            label = tk.Label(self.winnings, borderwidth=2, font=winnings_font)
+            label.grid(row=index+1, column=0)
+            self.__winnings_labels.append(label)
+        # Stores the default text color to be able to reset a label.
+        self.__default_fg = self.__winnings_labels[0]["fg"]
+
+        # These variables track what is currently shown so that only the
+        # labels that actually change need to be updated.
+        self.__shown_winnings = None
+        self.__shown_jokers = None
+        self.__shown_round = None
+        self.__shown_safety_net = None
+        self.__shown_status = None
+        self.__shown_show_round = None
+
+    def refresh(self):
+        """
+        This method makes the next update show the joker images again, e.g.
+        after they were loaded.
+        """
+        self.__shown_jokers = None
+
+    def frames(self):
+        """
+        This method returns the sidebar frames so that they are not destroyed
+        when switching pages.
+        """
+        return (self.jokers, self.winnings)
+
+    def update(self, status, show_round=True):
+        """
+        This method updates the sidebars to show the given game status. The
+        round the player is playing for is only accentuated if show_round is
+        True.
+        """
+        # Nothing needs to be updated if the same status snapshot is shown the
+        # same way again because snapshots never change.
+        if status is self.__shown_status and \
+           show_round == self.__shown_show_round:
+            return
+        self.__shown_status = status
+        self.__shown_show_round = show_round
+
+        # The texts are only changed if the game uses a different ladder. Its
+        # labels are already formatted.
+        if status["ladder"] is not self.__shown_winnings:
+            self.__shown_winnings = status["ladder"]
+            for label, win in zip(self.__winnings_labels,
+                                  status["ladder"].labels):
+                # Ensures that the winnings are always centered and big enough
+                # to make borders around each label look good.
+                label["text"] = " " * ((30 - len(win))//2) + win + \
+                    " " * ((30 - len(win))//2)
+
+        # If a joker has already been used its crossed picture is shown.
+        # Otherwise its normal picture is shown.
+        jokers = tuple(status["jokers"])
+        if jokers != self.__shown_jokers:
+            self.__shown_jokers = jokers
+            for name, (label, image) in self.__joker_labels.items():
+                if name not in jokers:
+                    image += "_crossed"
+                # The images might not be loaded yet when the window opens.
+                label["image"] = self.__images.get(image, "")
+
+        # Accentuates for which winning the player is playing by removing the
+        # relief from the previous label and adding it to the current one.
+        c_round = status["round"] if show_round else None
+        if c_round != self.__shown_round:
+            if self.__shown_round is not None:
+                self.__winnings_labels[self.__shown_round-1]["relief"] = "flat"
+            if c_round is not None:
+                self.__winnings_labels[c_round-1]["relief"] = "ridge"
+            self.__shown_round = c_round
+
+        # Accentuates the safety net in the winnings that the player reached.
+        safety_net = None
+        if show_round:
+            secured_round = status["ladder"].secured_round(status["round"])
+            if secured_round is not None:
+                safety_net = secured_round - 1
+        if safety_net != self.__shown_safety_net:
+            if self.__shown_safety_net is not None:
+                self.__winnings_labels[self.__shown_safety_net]["fg"] = \
+                    self.__default_fg
+            if safety_net is not None:
+                self.__winnings_labels[safety_net]["fg"] = "green"
+            self.__shown_safety_net = safety_net
 
 
-# This ensures that importing doesn't automatically run this code.
+# This ensures that importing doesn't automatically run this code. Running
+# this file directly builds the cached sprite sheet ahead of time so that the
+# game itself does not need to process any images when it starts.
 if __name__ == '__main__':
-    pass
+    prepare_sprite_sheet()